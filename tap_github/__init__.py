@@ -1,14 +1,42 @@
+import argparse
 import json
 import sys
 import singer
 from tap_github.discover import discover as _discover
 from tap_github.client import GithubClient
 from tap_github.sync import sync as _sync
+from tap_github.plan import plan as _plan
+from tap_github.daemon import run_daemon as _run_daemon
+from tap_github.webhook import run_webhook as _run_webhook
 
 LOGGER = singer.get_logger()
 
 REQUIRED_CONFIG_KEYS = ['start_date', 'access_token', 'repository']
 
+# Modes of the tap in addition to the discover and sync modes of the Singer spec
+MODE_FLAGS = ['--plan', '--daemon', '--webhook']
+
+def parse_args():
+    """
+    Parse the Singer arguments and the tap specific mode flags.
+    """
+    mode_parser = argparse.ArgumentParser(add_help=False)
+    for flag in MODE_FLAGS:
+        mode_parser.add_argument(flag, action='store_true')
+    modes, singer_args = mode_parser.parse_known_args(sys.argv[1:])
+
+    # The Singer parser only reads `sys.argv`, hand it the remaining arguments and restore the original ones
+    argv = sys.argv
+    sys.argv = argv[:1] + singer_args
+    try:
+        args = singer.utils.parse_args(REQUIRED_CONFIG_KEYS)
+    finally:
+        sys.argv = argv
+    args.plan = modes.plan
+    args.daemon = modes.daemon
+    args.webhook = modes.webhook
+    return args
+
 def do_discover(client):
     """
     Call the discovery function.
@@ -17,12 +45,19 @@ def do_discover(client):
     # Dump catalog
     json.dump(catalog, sys.stdout, indent=2)
 
+def do_plan(client, config, state, catalog):
+    """
+    Call the plan function and dump the estimated cost of the sync.
+    """
+    report = _plan(client, config, state, catalog)
+    json.dump(report, sys.stdout, indent=2)
+
 @singer.utils.handle_top_exception(LOGGER)
 def main():
     """
-    Run discover mode or sync mode.
+    Run discover mode, plan mode, daemon mode, webhook mode or sync mode.
     """
-    args = singer.utils.parse_args(REQUIRED_CONFIG_KEYS)
+    args = parse_args()
 
     config = args.config
 
@@ -34,6 +69,15 @@ def main():
 
     if args.discover:
         do_discover(client)
+    elif args.plan:
+        catalog = args.properties if args.properties else _discover(client)
+        do_plan(client, config, state, catalog)
+    elif args.daemon:
+        catalog = args.properties if args.properties else _discover(client)
+        _run_daemon(client, config, state, catalog)
+    elif args.webhook:
+        catalog = args.properties if args.properties else _discover(client)
+        _run_webhook(client, config, state, catalog)
     else:
         catalog = args.properties if args.properties else _discover(client)
         _sync(client, config, state, catalog)
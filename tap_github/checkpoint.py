@@ -0,0 +1,96 @@
+import time
+import singer
+
+LOGGER = singer.get_logger()
+
+# Write the state on every update (default), after a number of records, after a number of seconds or at stream end only.
+CHECKPOINT_POLICIES = ['every_update', 'records', 'seconds', 'stream_end']
+DEFAULT_CHECKPOINT_RECORDS = 1000
+DEFAULT_CHECKPOINT_SECONDS = 60
+
+class StateCheckpointer:
+    """
+    Coalesce the state updates into fewer STATE messages according to the checkpoint policy.
+    The state is only written at the points where it was requested, so a coalesced state is as safe to resume from
+    as the state of every update. Forced writes (stream end, end of sync) are always written.
+    """
+    def __init__(self, policy='every_update', every_records=DEFAULT_CHECKPOINT_RECORDS, every_seconds=DEFAULT_CHECKPOINT_SECONDS):
+        if policy not in CHECKPOINT_POLICIES:
+            raise ValueError("Invalid state checkpoint policy '{}', expected one of {}.".format(policy, CHECKPOINT_POLICIES))
+        self.policy = policy
+        self.every_records = every_records
+        self.every_seconds = every_seconds
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the records and the time since the last written state.
+        """
+        self.records_since_checkpoint = 0
+        self.last_checkpoint_time = time.monotonic()
+        self.pending = False
+
+    def record_written(self, count=1):
+        """
+        Count the records written since the last state.
+        """
+        self.records_since_checkpoint += count
+
+    def is_due(self):
+        """
+        Check whether a requested state has to be written according to the policy.
+        """
+        if self.policy == 'every_update':
+            return True
+        if self.policy == 'records':
+            return self.records_since_checkpoint >= self.every_records
+        if self.policy == 'seconds':
+            return time.monotonic() - self.last_checkpoint_time >= self.every_seconds
+        return False
+
+    def write_state(self, state, force=False):
+        """
+        Write the state if it is forced or due, otherwise keep it pending for the next checkpoint.
+        """
+        if force or self.is_due():
+            singer.write_state(state)
+            self.reset()
+        else:
+            self.pending = True
+
+    def flush(self, state):
+        """
+        Write the state if an update is pending.
+        """
+        if self.pending:
+            self.write_state(state, force=True)
+
+CHECKPOINTER = StateCheckpointer()
+
+def configure(config):
+    """
+    Configure the state checkpoint policy from the config.
+    """
+    global CHECKPOINTER # pylint: disable=global-statement
+    CHECKPOINTER = StateCheckpointer(config.get('state_checkpoint_policy', 'every_update'),
+                                     int(config.get('state_checkpoint_records', DEFAULT_CHECKPOINT_RECORDS)),
+                                     float(config.get('state_checkpoint_seconds', DEFAULT_CHECKPOINT_SECONDS)))
+    LOGGER.info("Using the state checkpoint policy: %s", CHECKPOINTER.policy)
+
+def write_state(state, force=False):
+    """
+    Request a state checkpoint.
+    """
+    CHECKPOINTER.write_state(state, force)
+
+def record_written(count=1):
+    """
+    Count the written records for the checkpoint policy.
+    """
+    CHECKPOINTER.record_written(count)
+
+def flush(state):
+    """
+    Write the pending state checkpoint.
+    """
+    CHECKPOINTER.flush(state)
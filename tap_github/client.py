@@ -1,9 +1,12 @@
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 import backoff
 from simplejson import JSONDecodeError
 import singer
 from singer import metrics
+from tap_github.timestamps import parse_timestamp
 
 LOGGER = singer.get_logger()
 DEFAULT_SLEEP_SECONDS = 600
@@ -12,6 +15,9 @@ DEFAULT_DOMAIN = "https://api.github.com"
 # Set default timeout of 300 seconds
 REQUEST_TIMEOUT = 300
 
+# Default number of repositories whose access is verified concurrently
+DEFAULT_VERIFY_ACCESS_WORKERS = 10
+
 class GithubException(Exception):
     pass
 
@@ -54,6 +60,15 @@ class RateLimitExceeded(GithubException):
 class TooManyRequests(GithubException):
     pass
 
+class GraphQLError(GithubException):
+    pass
+
+class GraphQLResourceError(GraphQLError):
+    pass
+
+# Types of the GraphQL errors of a query too large for the limits of the API, retried with smaller pages
+GRAPHQL_RESOURCE_ERRORS = {'MAX_NODE_LIMIT_EXCEEDED', 'RESOURCE_LIMITS_EXCEEDED'}
+
 
 ERROR_CODE_EXCEPTION_MAPPING = {
     301: {
@@ -158,6 +173,43 @@ def rate_throttling(response, max_sleep_seconds):
         # API does include this key header if provided base URL is not a valid github custom domain.
         raise GithubException("The API call using the specified base url was unsuccessful. Please double-check the provided base URL.")
 
+def get_graphql_url(base_url):
+    """
+    Return the url of the GraphQL API of the GitHub instance of the REST API base url.
+    """
+    base_url = (base_url or DEFAULT_DOMAIN).rstrip('/')
+    if base_url.endswith('/api/v3'):
+        return base_url[:-len('/v3')] + '/graphql'
+    return base_url + '/graphql'
+
+def raise_for_graphql_errors(source, response_json):
+    """
+    Raise an exception for the errors of a GraphQL response, which is returned with the status code 200.
+    """
+    errors = response_json.get('errors')
+    if not errors:
+        return
+    error_types = {error.get('type') for error in errors}
+    message = "GraphQL error for {}: {}".format(source, "; ".join(error.get('message', 'Unknown Error') for error in errors))
+    if 'RATE_LIMITED' in error_types:
+        raise RateLimitExceeded(message) from None
+    if error_types & GRAPHQL_RESOURCE_ERRORS:
+        raise GraphQLResourceError(message) from None
+    raise GraphQLError(message) from None
+
+def raise_for_access_failures(failures):
+    """
+    Raise a single exception reporting every repository whose access could not be verified.
+    """
+    if len(failures) == 1:
+        raise list(failures.values())[0]
+
+    exception_types = {type(err) for err in failures.values()}
+    exc = exception_types.pop() if len(exception_types) == 1 else GithubException
+    message = "Access verification failed for {} repositories: {}".format(
+        len(failures), "; ".join("{}: {}".format(repo, failures[repo]) for repo in sorted(failures)))
+    raise exc(message) from None
+
 class GithubClient:
     """
     The client class used for making REST calls to the Github API.
@@ -169,6 +221,24 @@ class GithubClient:
         self.max_sleep_seconds = self.config.get('max_sleep_seconds', DEFAULT_SLEEP_SECONDS)
         self.set_auth_in_session()
         self.not_accessible_repos = set()
+        # Guards the counters updated by the requests of concurrent threads.
+        self.lock = threading.Lock()
+        # Number of requests made by the client, used to record the cost of each stream.
+        self.request_count = 0
+        # Remaining requests and reset time of the rate limit from the responses.
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = None
+        self.graphql_url = get_graphql_url(self.base_url)
+        # Cost, remaining points and reset time of the GraphQL rate limit from the last query.
+        self.graphql_rate_limit = None
+        self.verified_repos = set()
+        self.verify_access_workers = int(self.config.get('verify_access_workers') or DEFAULT_VERIFY_ACCESS_WORKERS)
+        # Size the connection pool so that concurrent verification does not discard connections.
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(self.verify_access_workers, 10))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # Repositories expanded from the config, cached so that discovery and sync share them in a single run.
+        self._extracted_repos = None
 
     def get_request_timeout(self):
         """
@@ -191,6 +261,23 @@ class GithubClient:
         access_token = self.config['access_token']
         self.session.headers.update({'authorization': 'token ' + access_token})
 
+    def count_request(self):
+        """
+        Count a request of the client.
+        """
+        with self.lock:
+            self.request_count += 1
+
+    def update_rate_limit(self, remaining, reset):
+        """
+        Keep the lowest remaining requests of the current rate limit window, the responses of concurrent
+        requests may arrive out of order.
+        """
+        with self.lock:
+            if self.rate_limit_remaining is None or reset != self.rate_limit_reset or remaining < self.rate_limit_remaining:
+                self.rate_limit_remaining = remaining
+                self.rate_limit_reset = reset
+
     # pylint: disable=dangerous-default-value
     # During 'Timeout' error there is also possibility of 'ConnectionError',
     # hence added backoff for 'ConnectionError' too.
@@ -200,18 +287,65 @@ class GithubClient:
         Call rest API and return the response in case of status code 200.
         """
         with metrics.http_request_timer(source) as timer:
-            self.session.headers.update(headers)
-            resp = self.session.request(method='get', url=url, timeout=self.get_request_timeout())
+            self.count_request()
+            # The headers of the stream are sent with the request only, the session is shared by the threads.
+            request_headers = {'headers': headers} if headers else {}
+            resp = self.session.request(method='get', url=url, timeout=self.get_request_timeout(), **request_headers)
             if resp.status_code != 200:
                 LOGGER.info(f'Found a non 200 response: {url}, {resp.status_code}')
                 raise_for_error(resp, source, stream, self, should_skip_404)
             timer.tags[metrics.Tag.http_status_code] = resp.status_code
             rate_throttling(resp, self.max_sleep_seconds)
+            self.update_rate_limit(int(resp.headers['X-RateLimit-Remaining']), resp.headers.get('X-RateLimit-Reset'))
             if resp.status_code == 404 or resp.status_code == 410:
                 # Return an empty response body since we're not raising a NotFoundException
                 resp._content = b'{}' # pylint: disable=protected-access
             return resp
 
+    @backoff.on_exception(backoff.expo, (requests.Timeout, requests.ConnectionError, Server5xxError, TooManyRequests), max_tries=5, factor=2)
+    def authed_graphql(self, source, query, variables=None):
+        """
+        Post a GraphQL query and return its data. The query is expected to select the `rateLimit` of the GraphQL API,
+        whose points are a separate budget from the requests of the REST API.
+        """
+        with metrics.http_request_timer(source) as timer:
+            self.count_request()
+            resp = self.session.request(method='post', url=self.graphql_url, json={'query': query, 'variables': variables or {}},
+                                        timeout=self.get_request_timeout())
+            if resp.status_code != 200:
+                LOGGER.info(f'Found a non 200 response: {self.graphql_url}, {resp.status_code}')
+                raise_for_error(resp, source, source, self, False)
+            timer.tags[metrics.Tag.http_status_code] = resp.status_code
+            response_json = resp.json()
+            raise_for_graphql_errors(source, response_json)
+            data = response_json.get('data') or {}
+            if data.get('rateLimit'):
+                self.graphql_rate_limit = data['rateLimit']
+            return data
+
+    def wait_for_graphql_points(self, cost):
+        """
+        Sleep until the GraphQL rate limit resets when its remaining points do not cover the cost of the next query.
+        """
+        rate_limit = self.graphql_rate_limit
+        if not rate_limit or rate_limit.get('remaining', cost) >= cost:
+            return
+        seconds_to_sleep = max(calculate_seconds(parse_timestamp(rate_limit['resetAt']).timestamp()), 0)
+        if seconds_to_sleep > self.max_sleep_seconds:
+            message = "GraphQL API rate limit exceeded, please try after {} seconds.".format(seconds_to_sleep)
+            raise RateLimitExceeded(message) from None
+
+        LOGGER.info("GraphQL API rate limit exceeded. Tap will retry the data collection after %s seconds.", seconds_to_sleep)
+        time.sleep(seconds_to_sleep)
+        self.graphql_rate_limit = None
+
+    def get_if_modified(self, source, url, etag, stream=""):
+        """
+        Get a page with the ETag of its previous response, a `NotModifiedError` is raised when it did not change.
+        An unchanged page answered with a 304 does not count against the rate limit.
+        """
+        return self.authed_get(source, url, {'If-None-Match': etag} if etag else {}, stream)
+
     def authed_get_all_pages(self, source, url, headers={}, stream="", should_skip_404 = True):
         """
         Fetch all pages of records and return them.
@@ -228,30 +362,62 @@ class GithubClient:
             # Break the loop if all pages are fetched.
                 break
 
+    def get_rate_limit(self):
+        """
+        Return the limit, the remaining requests and the reset time of the REST API rate limit.
+        Requesting the rate limit does not count against it.
+        """
+        response = self.authed_get('rate_limit', '{}/rate_limit'.format(self.base_url), should_skip_404 = False)
+        return response.json().get('resources', {}).get('core', {})
+
     def verify_repo_access(self, url_for_repo, repo, should_skip_404 = True):
         """
         Call rest API to verify that the user has sufficient permissions to access this repository.
         """
         try:
-            self.authed_get("verifying repository access", url_for_repo, should_skip_404 = should_skip_404)
+            return self.authed_get("verifying repository access", url_for_repo, should_skip_404 = should_skip_404)
         except NotFoundException:
             # Throwing user-friendly error message as it checks token access
             message = "HTTP-error-code: 404, Error: Please check the repository name \'{}\' or you do not have sufficient permissions to access this repository.".format(repo)
             raise NotFoundException(message) from None
 
+    def verify_repos_access(self, repositories, should_skip_404 = True):
+        """
+        Verify the access for the given repositories concurrently and raise a single exception for all the failures.
+        """
+        repositories = [repo for repo in repositories if repo not in self.verified_repos]
+        if not repositories:
+            return
+
+        failures = {}
+        with ThreadPoolExecutor(max_workers=self.verify_access_workers) as executor:
+            futures = {}
+            for repo in repositories:
+                url_for_repo = "{}/repos/{}/commits".format(self.base_url, repo)
+                LOGGER.info("Verifying access of repository: %s", repo)
+                futures[executor.submit(self.verify_repo_access, url_for_repo, repo, should_skip_404)] = repo
+
+            for future in as_completed(futures):
+                repo = futures[future]
+                try:
+                    response = future.result()
+                    # A skipped 404 is not a successful verification, check the repository again when asked for it.
+                    if getattr(response, 'status_code', None) == 200:
+                        self.verified_repos.add(repo)
+                except GithubException as err:
+                    failures[repo] = err
+
+        if failures:
+            raise_for_access_failures(failures)
+
     def verify_access_for_repo(self):
         """
         For all the repositories mentioned in the config, check the access for each repos.
         """
         repositories, org = self.extract_repos_from_config() # pylint: disable=unused-variable
 
-        for repo in repositories:
-
-            url_for_repo = "{}/repos/{}/commits".format(self.base_url, repo)
-            LOGGER.info("Verifying access of repository: %s", repo)
-
-            # Verifying for Repo access
-            self.verify_repo_access(url_for_repo, repo, False)
+        # Verifying for Repo access
+        self.verify_repos_access(repositories, False)
 
     def extract_orgs_from_config(self):
         """
@@ -262,11 +428,16 @@ class GithubClient:
 
         return set(orgs_paths)
 
-    def extract_repos_from_config(self):
+    def extract_repos_from_config(self, refresh = False):
         """
         Extracts all repositories from the config and calls get_all_repos()
         for organizations using the wildcard 'org/*' format.
+        The result is cached, so the organizations are expanded only once per run unless a refresh is asked.
         """
+        if self._extracted_repos is not None and not refresh:
+            repo_paths, orgs = self._extracted_repos
+            return list(repo_paths), set(orgs)
+
         repo_paths = list(filter(None, self.config['repository'].split(' ')))
 
         unique_repos = set()
@@ -309,6 +480,7 @@ class GithubClient:
             # Update repo_paths
             repo_paths.extend(all_repos)
 
+        self._extracted_repos = (list(repo_paths), set(orgs))
         return repo_paths, set(orgs)
 
     def get_all_repos(self, organizations: list):
@@ -331,16 +503,10 @@ class GithubClient:
                     org_repos = response.json()
                     LOGGER.info("Collected repos for organization: %s", org)
 
-                    for repo in org_repos:
-                        repo_full_name = repo.get('full_name')
-                        LOGGER.info("Verifying access of repository: %s", repo_full_name)
-
-                        self.verify_repo_access(
-                            '{}/repos/{}/commits'.format(self.base_url,repo_full_name),
-                            repo
-                        )
+                    org_repo_names = [repo.get('full_name') for repo in org_repos]
+                    self.verify_repos_access(org_repo_names)
 
-                        repos.append(repo_full_name)
+                    repos.extend(org_repo_names)
             except NotFoundException:
                 # Throwing user-friendly error message as it checks token access
                 message = "HTTP-error-code: 404, Error: Please check the organization name \'{}\' or you do not have sufficient permissions to access this organization.".format(org)
@@ -0,0 +1,155 @@
+import heapq
+import signal
+import threading
+import time
+import requests
+import singer
+from tap_github.client import RateLimitExceeded, Server5xxError
+from tap_github.sync import (STREAM_TO_SYNC_FOR_ORGS, do_sync, get_repository_streams, get_selected_streams, get_stream_to_sync,
+                             is_top_level_stream, translate_state, update_currently_syncing_repo)
+from tap_github import checkpoint, dedupe, sha_index, transform
+
+LOGGER = singer.get_logger()
+
+# Seconds between two polls of a (repository, stream) unit
+DEFAULT_POLL_INTERVAL = 300
+# Seconds between two expansions of the repositories from the config
+DEFAULT_REPO_REFRESH_INTERVAL = 60 * 60
+# Errors after which a unit is polled again at its next interval instead of stopping the daemon
+RETRYABLE_ERRORS = (Server5xxError, RateLimitExceeded, requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+class Daemon:
+    """
+    Poll the selected streams of all the repositories continuously in a single process.
+    The client, its session and the expanded repositories, the catalog and the sent schemas are kept between the polls,
+    each (repository, stream) unit is synced from its bookmarks on its own interval and the state is checkpointed after each unit.
+    """
+    def __init__(self, client, config, state, catalog):
+        self.client = client
+        self.config = config
+        self.state = state
+        self.catalog = catalog
+        self.start_date = config['start_date']
+        self.selected_stream_ids = get_selected_streams(catalog)
+        self.streams_to_sync = get_stream_to_sync(catalog)
+        # The streams synced from their repository endpoint are polled as units of their own.
+        self.repository_streams = get_repository_streams(config, self.streams_to_sync)
+        self.child_streams = {stream_id for stream_id in self.streams_to_sync if not is_top_level_stream(stream_id, self.repository_streams)}
+        self.poll_interval = float(config.get('daemon_poll_interval', DEFAULT_POLL_INTERVAL))
+        self.stream_intervals = config.get('daemon_stream_intervals', {})
+        self.repo_refresh_interval = float(config.get('daemon_repo_refresh_interval', DEFAULT_REPO_REFRESH_INTERVAL))
+        self.schedule = []
+        self.units = set()
+        self.next_repo_refresh = 0
+        self.stop_event = threading.Event()
+
+    def get_interval(self, stream_id):
+        """
+        Return the poll interval of a stream.
+        """
+        return float(self.stream_intervals.get(stream_id, self.poll_interval))
+
+    def schedule_unit(self, due_time, repo_path, stream_id):
+        """
+        Schedule the next poll of a unit.
+        """
+        heapq.heappush(self.schedule, (due_time, repo_path, stream_id))
+
+    def refresh_units(self):
+        """
+        Expand the repositories from the config and schedule the units of the new repositories immediately.
+        The units of the removed repositories are dropped when they are due.
+        """
+        repositories, organizations = self.client.extract_repos_from_config(refresh = bool(self.units))
+        # Resume the unit interrupted by the previous run first.
+        interrupted = (self.state.get('currently_syncing_repo'), singer.get_currently_syncing(self.state))
+        self.state = translate_state(self.state, self.catalog, repositories)
+        top_level_streams = [stream_id for stream_id in sorted(self.streams_to_sync) if is_top_level_stream(stream_id, self.repository_streams)]
+
+        units = {(orgs, stream_id) for orgs in organizations for stream_id in top_level_streams if stream_id in STREAM_TO_SYNC_FOR_ORGS}
+        units.update((repo, stream_id) for repo in repositories for stream_id in top_level_streams if stream_id not in STREAM_TO_SYNC_FOR_ORGS)
+
+        now = time.monotonic()
+        for repo_path, stream_id in sorted(units - self.units):
+            self.schedule_unit(now - 1 if (repo_path, stream_id) == interrupted else now, repo_path, stream_id)
+        self.units = units
+        self.next_repo_refresh = now + self.repo_refresh_interval
+        LOGGER.info("Polling %d units.", len(self.units))
+
+    def sync_unit(self, repo_path, stream_id):
+        """
+        Sync a stream and its selected children for a repository or an organization from the bookmarks.
+        """
+        LOGGER.info("Polling %s for %s.", stream_id, repo_path)
+        update_currently_syncing_repo(self.state, repo_path)
+        do_sync(self.catalog, {stream_id} | self.child_streams, self.selected_stream_ids, self.client,
+                self.start_date, self.state, repo_path, self.config)
+        update_currently_syncing_repo(self.state, None)
+        checkpoint.flush(self.state)
+
+        if self.client.not_accessible_repos:
+            LOGGER.warning("Please check the repository name '%s' or you do not have sufficient permissions to access this repository for following streams %s.",
+                           repo_path, ", ".join(self.client.not_accessible_repos))
+            self.client.not_accessible_repos = set()
+
+    def wait(self, timeout):
+        """
+        Wait until the next unit is due or the daemon is stopped.
+        """
+        self.stop_event.wait(max(0, timeout))
+
+    def stop(self, *_):
+        """
+        Stop the daemon after the unit being synced.
+        """
+        LOGGER.info("Stopping the daemon.")
+        self.stop_event.set()
+
+    def run(self, max_polls = None):
+        """
+        Poll the units when they are due until the daemon is stopped or `max_polls` units are polled.
+        """
+        checkpoint.configure(self.config)
+        transform.configure(self.config)
+        self.refresh_units()
+        sha_index.configure(self.config, self.state)
+        dedupe.configure(self.config, self.state)
+        checkpoint.write_state(self.state, force=True)
+
+        polls = 0
+        while not self.stop_event.is_set() and (max_polls is None or polls < max_polls):
+            if time.monotonic() >= self.next_repo_refresh:
+                self.refresh_units()
+            if not self.schedule:
+                self.wait(self.next_repo_refresh - time.monotonic())
+                continue
+
+            due_time, repo_path, stream_id = self.schedule[0]
+            if due_time > time.monotonic():
+                self.wait(min(due_time, self.next_repo_refresh) - time.monotonic())
+                continue
+            heapq.heappop(self.schedule)
+            if (repo_path, stream_id) not in self.units:
+                continue
+
+            try:
+                self.sync_unit(repo_path, stream_id)
+            except RETRYABLE_ERRORS as err:
+                # The bookmarks written so far let the next poll resume the unit.
+                LOGGER.warning("Polling %s for %s failed, retrying at the next interval: %s", stream_id, repo_path, err)
+                checkpoint.write_state(self.state, force=True)
+            polls += 1
+            self.schedule_unit(time.monotonic() + self.get_interval(stream_id), repo_path, stream_id)
+
+        checkpoint.flush(self.state)
+        sha_index.close()
+        dedupe.close()
+
+def run_daemon(client, config, state, catalog):
+    """
+    Run the daemon until it receives SIGTERM or SIGINT.
+    """
+    daemon = Daemon(client, config, state, catalog)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run()
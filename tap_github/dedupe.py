@@ -0,0 +1,128 @@
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+import singer
+from tap_github.timestamps import parse_timestamp
+
+LOGGER = singer.get_logger()
+
+# Number of record keys whose digest is kept in memory
+DEFAULT_DEDUPE_SIZE = 10000
+# Number of changed digests between two commits of the persisted digests
+COMMIT_EVERY = 1000
+
+def get_digest(record):
+    """
+    Return the digest of the attributes of a record.
+    """
+    return hashlib.blake2b(json.dumps(record, sort_keys=True, default=str).encode('utf-8'), digest_size=16).hexdigest()
+
+def get_start_bookmarks(state):
+    """
+    Return the `since` bookmark of each stream of each repository the run starts with.
+    """
+    return {(repo, stream_id): bookmark.get('since')
+            for repo, bookmarks in (state or {}).get('bookmarks', {}).items() if isinstance(bookmarks, dict)
+            for stream_id, bookmark in bookmarks.items() if isinstance(bookmark, dict) and bookmark.get('since')}
+
+class RecordDeduplicator:
+    """
+    Drop the records whose key was already written with the same attributes. The digests of the most recently
+    written keys are kept in a bounded LRU cache, and in a sqlite file to deduplicate across the runs when a path is set.
+    A key evicted from the cache without a file is written again when it reappears.
+
+    A persisted digest is stored with the repository and the parent bookmark its record was written under. It is only
+    trusted once the bookmark the run starts with moved past it, as the target may not have persisted the records
+    written after the last state it confirmed.
+    """
+    def __init__(self, max_size=DEFAULT_DEDUPE_SIZE, path=None, start_bookmarks=None):
+        self.max_size = max_size
+        self.start_bookmarks = start_bookmarks or {}
+        self.digests = OrderedDict()
+        self.pending = 0
+        self.dropped = 0
+        self.connection = None
+        if path:
+            self.connection = sqlite3.connect(path)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS record_digests "
+                                    "(stream_id TEXT NOT NULL, key TEXT NOT NULL, digest TEXT NOT NULL, repo TEXT, bookmark TEXT, "
+                                    "PRIMARY KEY (stream_id, key))")
+
+    def is_confirmed(self, stream_id, repo, bookmark):
+        """
+        Check whether a record written under a bookmark is before the bookmark the run of its repository starts with.
+        """
+        start_bookmark = self.start_bookmarks.get((repo, stream_id))
+        return bool(bookmark and start_bookmark) and parse_timestamp(bookmark) < parse_timestamp(start_bookmark)
+
+    def get_stored_digest(self, stream_id, key):
+        """
+        Return the digest of a key from the cache of the run or the confirmed persisted digests.
+        """
+        if (stream_id, key) in self.digests:
+            self.digests.move_to_end((stream_id, key))
+            return self.digests[(stream_id, key)]
+        if self.connection:
+            row = self.connection.execute("SELECT digest, repo, bookmark FROM record_digests WHERE stream_id = ? AND key = ?",
+                                          (stream_id, key)).fetchone()
+            if row and self.is_confirmed(stream_id, row[1], row[2]):
+                return row[0]
+        return None
+
+    def should_write(self, stream_id, key_properties, record, repo=None, bookmark=None):
+        """
+        Check whether the key of a record is new or its attributes changed and remember its digest with the repository
+        and the parent bookmark the record is written under.
+        """
+        key = json.dumps([record.get(key_property) for key_property in key_properties], default=str)
+        digest = get_digest(record)
+        if self.get_stored_digest(stream_id, key) == digest:
+            self.dropped += 1
+            return False
+
+        self.digests[(stream_id, key)] = digest
+        self.digests.move_to_end((stream_id, key))
+        if len(self.digests) > self.max_size:
+            self.digests.popitem(last=False)
+        if self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO record_digests (stream_id, key, digest, repo, bookmark) VALUES (?, ?, ?, ?, ?)",
+                                    (stream_id, key, digest, repo, bookmark))
+            self.pending += 1
+            if self.pending >= COMMIT_EVERY:
+                self.connection.commit()
+                self.pending = 0
+        return True
+
+    def close(self):
+        if self.dropped:
+            LOGGER.info("Dropped %d records already written with the same attributes.", self.dropped)
+            self.dropped = 0
+        if self.connection:
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+DEDUPLICATOR = RecordDeduplicator()
+
+def configure(config, state=None):
+    """
+    Start the deduplication of a run from the config and the state it starts with, `record_dedupe_size` 0 disables it.
+    """
+    global DEDUPLICATOR # pylint: disable=global-statement
+    close()
+    max_size = int(config.get('record_dedupe_size', DEFAULT_DEDUPE_SIZE))
+    DEDUPLICATOR = RecordDeduplicator(max_size, config.get('record_digest_path'), get_start_bookmarks(state)) if max_size > 0 else None
+
+def should_write(stream_id, key_properties, record, repo=None, bookmark=None):
+    """
+    Check whether a record of a deduplicated stream has to be written.
+    """
+    return DEDUPLICATOR is None or DEDUPLICATOR.should_write(stream_id, key_properties, record, repo, bookmark)
+
+def close():
+    """
+    Commit the persisted digests and log the dropped records.
+    """
+    if DEDUPLICATOR is not None:
+        DEDUPLICATOR.close()
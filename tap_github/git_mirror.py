@@ -0,0 +1,184 @@
+import base64
+import os
+import subprocess
+from urllib.parse import quote
+import singer
+from tap_github.client import DEFAULT_DOMAIN, GithubException
+from tap_github.timestamps import normalize_timestamp
+
+LOGGER = singer.get_logger()
+
+# Fields of a commit in the `git log` format, separated by the unit separator
+LOG_FIELDS = ['sha', 'parents', 'tree', 'author_name', 'author_email', 'author_date',
+              'committer_name', 'committer_email', 'committer_date', 'message']
+LOG_FORMAT = '%x1e' + '%x1f'.join(['%H', '%P', '%T', '%an', '%ae', '%aI', '%cn', '%ce', '%cI', '%B']) + '%x1f'
+# Status of the raw diff entries and the status of the files of the API
+FILE_STATUS = {'A': 'added', 'D': 'removed', 'M': 'modified', 'R': 'renamed', 'C': 'copied', 'T': 'changed'}
+NULL_SHA = '0' * 40
+# Size of the chunks read from the output of `git log`
+READ_SIZE = 1 << 16
+
+class GitMirrorError(GithubException):
+    pass
+
+def get_web_url(base_url):
+    """
+    Return the url of the web pages of the GitHub instance of the API base url.
+    """
+    base_url = (base_url or DEFAULT_DOMAIN).rstrip('/')
+    if base_url == DEFAULT_DOMAIN:
+        return 'https://github.com'
+    return base_url[:-len('/api/v3')] if base_url.endswith('/api/v3') else base_url
+
+def parse_diff(tokens):
+    """
+    Parse the NUL separated `--raw` and `--numstat` entries of a commit into the files of the API.
+    """
+    files = {}
+    tokens = iter(tokens)
+    for token in tokens:
+        token = token.lstrip('\n')
+        if token.startswith(':'):
+            # :old_mode new_mode old_sha new_sha status, followed by the path and the new path of the renames and copies
+            _, _, old_sha, new_sha, status = token[1:].split(' ')
+            filename = next(tokens)
+            file = {'filename': filename, 'status': FILE_STATUS.get(status[0], 'changed'),
+                    'sha': old_sha if new_sha == NULL_SHA else new_sha, 'additions': 0, 'deletions': 0, 'changes': 0}
+            if status[0] in 'RC':
+                file['previous_filename'] = filename
+                file['filename'] = next(tokens)
+            files[file['filename']] = file
+        elif '\t' in token:
+            # additions deletions path, with an empty path followed by the old and the new paths for the renames and copies
+            additions, deletions, filename = token.split('\t', 2)
+            if not filename:
+                next(tokens)
+                filename = next(tokens)
+            if filename in files and additions != '-':
+                # The binary files have no line counts.
+                files[filename]['additions'] = int(additions)
+                files[filename]['deletions'] = int(deletions)
+                files[filename]['changes'] = int(additions) + int(deletions)
+    return list(files.values())
+
+class GitMirror:
+    """
+    A bare mirror of a repository in the cache directory, updated with incremental fetches,
+    from which the commits and their files are read without API calls.
+    """
+    def __init__(self, cache_dir, repo_path, base_url=DEFAULT_DOMAIN, clone_url=None, access_token=None):
+        self.repo_path = repo_path
+        self.path = os.path.join(cache_dir, repo_path + '.git')
+        self.base_url = (base_url or DEFAULT_DOMAIN).rstrip('/')
+        self.web_url = get_web_url(base_url)
+        self.clone_url = (clone_url or self.web_url + '/{repo}.git').format(repo=repo_path)
+        self.access_token = access_token
+
+    def git(self, *args):
+        """
+        Return the arguments of a git command with the token sent as a header, so that it is not saved in the mirror.
+        """
+        command = ['git']
+        if self.access_token and self.clone_url.startswith(('https://', 'http://')):
+            credentials = base64.b64encode('x-access-token:{}'.format(self.access_token).encode('utf-8')).decode('ascii')
+            command += ['-c', 'http.extraHeader=Authorization: Basic {}'.format(credentials)]
+        return command + list(args)
+
+    def run(self, *args):
+        """
+        Run a git command and raise a `GitMirrorError` with its output when it fails.
+        """
+        result = subprocess.run(self.git(*args), stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+        if result.returncode != 0:
+            raise GitMirrorError("git {} failed for {}: {}".format(args[0], self.repo_path, result.stderr.decode('utf-8', 'replace').strip()))
+        return result.stdout
+
+    def update(self):
+        """
+        Clone the mirror of the repository or fetch the new objects into it.
+        """
+        if os.path.isdir(self.path):
+            LOGGER.info("Fetching the git mirror of %s.", self.repo_path)
+            self.run('--git-dir', self.path, 'fetch', '--prune', '--quiet', 'origin')
+        else:
+            LOGGER.info("Cloning the git mirror of %s into %s.", self.repo_path, self.path)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.run('clone', '--mirror', '--quiet', self.clone_url, self.path)
+
+    def get_commit_record(self, fields):
+        """
+        Build a commit of the API from the fields of `git log`.
+        """
+        sha = fields['sha']
+        api_url = '{}/repos/{}'.format(self.base_url, self.repo_path)
+        html_url = '{}/{}'.format(self.web_url, self.repo_path)
+        return {
+            'sha': sha,
+            'url': '{}/commits/{}'.format(api_url, sha),
+            'html_url': '{}/commit/{}'.format(html_url, sha),
+            'comments_url': '{}/commits/{}/comments'.format(api_url, sha),
+            'commit': {
+                'url': '{}/git/commits/{}'.format(api_url, sha),
+                'author': {'name': fields['author_name'], 'email': fields['author_email'],
+                           'date': normalize_timestamp(fields['author_date'])},
+                'committer': {'name': fields['committer_name'], 'email': fields['committer_email'],
+                              'date': normalize_timestamp(fields['committer_date'])},
+                'message': fields['message'].rstrip('\n'),
+                'tree': {'sha': fields['tree'], 'url': '{}/git/trees/{}'.format(api_url, fields['tree'])},
+            },
+            # The GitHub accounts of the author and the committer are only known to the API.
+            'author': None,
+            'committer': None,
+            'parents': [{'sha': parent, 'url': '{}/commits/{}'.format(api_url, parent), 'html_url': '{}/commit/{}'.format(html_url, parent)}
+                        for parent in fields['parents'].split()],
+        }
+
+    def get_file_record(self, sha, file):
+        """
+        Add the urls of the API to a file of a commit.
+        """
+        filename = quote(file['filename'])
+        file['blob_url'] = '{}/{}/blob/{}/{}'.format(self.web_url, self.repo_path, sha, filename)
+        file['raw_url'] = '{}/{}/raw/{}/{}'.format(self.web_url, self.repo_path, sha, filename)
+        file['contents_url'] = '{}/repos/{}/contents/{}?ref={}'.format(self.base_url, self.repo_path, filename, sha)
+        return file
+
+    def parse_commit(self, chunk):
+        """
+        Parse the `git log` output of a commit into the commit record and its files.
+        """
+        *values, diff = chunk.decode('utf-8', 'replace').split('\x1f')
+        fields = dict(zip(LOG_FIELDS, values))
+        files = [self.get_file_record(fields['sha'], file) for file in parse_diff(diff.split('\0'))]
+        return self.get_commit_record(fields), files
+
+    def get_commits(self, since=None):
+        """
+        Yield the commits of the default branch committed since a timestamp, the oldest first, with their files.
+        The merges are compared with their first parent, as in the API.
+        """
+        args = ['--git-dir', self.path, 'log', '-z', '--reverse', '--raw', '--numstat', '-M', '--no-abbrev',
+                '--diff-merges=first-parent', '--format=' + LOG_FORMAT]
+        if since:
+            args.append('--since=' + since)
+        args.append('HEAD')
+        process = subprocess.Popen(self.git(*args), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            buffer = b''
+            for data in iter(lambda: process.stdout.read(READ_SIZE), b''):
+                *chunks, buffer = (buffer + data).split(b'\x1e')
+                for chunk in chunks:
+                    if chunk:
+                        yield self.parse_commit(chunk)
+            stderr = process.stderr.read()
+            if process.wait() != 0:
+                raise GitMirrorError("git log failed for {}: {}".format(self.repo_path, stderr.decode('utf-8', 'replace').strip()))
+            if buffer:
+                yield self.parse_commit(buffer)
+        finally:
+            # Stop git when the commits are not all read.
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
@@ -0,0 +1,563 @@
+import math
+from urllib.parse import quote
+import singer
+from tap_github.client import GraphQLResourceError, Server5xxError
+from tap_github.timestamps import normalize_timestamp
+
+LOGGER = singer.get_logger()
+
+# Number of pull requests and of issues of a page, halved when a query exceeds the limits of the API
+DEFAULT_GRAPHQL_PAGE_SIZE = 25
+DEFAULT_ISSUES_PAGE_SIZE = 100
+# Number of nodes of the connections nested in a page, the next nodes are fetched by a query per connection
+NESTED_PAGE_SIZE = 50
+# Number of comments of the nested review threads, and of the nodes of the queries of the next nodes
+THREAD_COMMENTS_PAGE_SIZE = 20
+NEXT_NODES_PAGE_SIZE = 100
+
+RATE_LIMIT = "rateLimit { cost remaining resetAt }"
+PAGE_INFO = "pageInfo { hasNextPage endCursor }"
+ACTOR = "{ __typename login url avatarUrl ... on Node { id } ... on User { databaseId } ... on Bot { databaseId } " \
+        "... on Organization { databaseId } ... on Mannequin { databaseId } }"
+USER_FIELDS = "__typename login url avatarUrl id databaseId"
+USER = "{ " + USER_FIELDS + " }"
+OWNER = "{ __typename login url avatarUrl id ... on User { databaseId } ... on Organization { databaseId } }"
+REPOSITORY = "{ id databaseId name nameWithOwner url owner " + OWNER + " }"
+
+PULL_REQUEST = """
+id databaseId number state title body url locked isDraft activeLockReason authorAssociation
+createdAt updatedAt closedAt mergedAt mergeCommit { oid }
+headRefName headRefOid headRepositoryOwner """ + OWNER + """ headRepository """ + REPOSITORY + """
+baseRefName baseRefOid baseRepository """ + REPOSITORY + """
+author """ + ACTOR + """
+assignees(first: 10) { nodes """ + USER + """ }
+labels(first: 20) { nodes { id name color description isDefault url } }
+milestone { id number title description state dueOn createdAt updatedAt closedAt url creator """ + ACTOR + """ }
+reviewRequests(first: 10) { nodes { requestedReviewer { __typename ... on User """ + USER + """
+  ... on Team { id databaseId name slug description privacy url } } } }
+autoMergeRequest { mergeMethod commitHeadline commitBody enabledBy """ + ACTOR + """ }
+"""
+REVIEW = "id databaseId author " + ACTOR + " authorAssociation body state url submittedAt commit { oid }"
+REVIEW_COMMENT = "id databaseId author " + ACTOR + """ authorAssociation body url createdAt updatedAt path diffHunk
+position originalPosition line originalLine startLine originalStartLine commit { oid } originalCommit { oid }
+replyTo { databaseId } pullRequestReview { databaseId }"""
+REVIEW_THREAD = "id diffSide startDiffSide comments(first: {}) {{ totalCount {} nodes {{ {} }} }}".format(
+    THREAD_COMMENTS_PAGE_SIZE, PAGE_INFO, REVIEW_COMMENT)
+GIT_ACTOR = "{ name email date user " + USER + " }"
+PR_COMMIT = "commit { id oid url message tree { oid } author " + GIT_ACTOR + " committer " + GIT_ACTOR + \
+            " parents(first: 10) { nodes { oid } } }"
+
+# Privacy of the teams of the GraphQL API and of the REST API
+TEAM_PRIVACY = {'VISIBLE': 'closed', 'SECRET': 'secret'}
+
+# Connections of the pull requests read by each child stream, with the fields of their nodes
+PULL_REQUEST_CONNECTIONS = {
+    'reviews': ('reviews', REVIEW),
+    'review_comments': ('reviewThreads', REVIEW_THREAD),
+    'pr_commits': ('commits', PR_COMMIT),
+}
+
+PULL_REQUESTS_QUERY = """
+query($owner: String!, $name: String!, $pageSize: Int!, $cursor: String) {{
+  {rate_limit}
+  repository(owner: $owner, name: $name) {{
+    pullRequests(first: $pageSize, after: $cursor, orderBy: {{field: UPDATED_AT, direction: DESC}}) {{
+      {page_info}
+      nodes {{ {fields} }}
+    }}
+  }}
+}}
+"""
+
+ISSUE = """
+id databaseId number state stateReason title body url locked activeLockReason authorAssociation
+createdAt updatedAt closedAt
+author """ + ACTOR + """
+milestone { id number title description state dueOn createdAt updatedAt closedAt url creator """ + ACTOR + """ }
+comments { totalCount }
+assignees(first: """ + str(NESTED_PAGE_SIZE) + ") { totalCount " + PAGE_INFO + " nodes " + USER + """ }
+"""
+# Connections of the issues read by each child stream, with the fields of their nodes
+ISSUE_CONNECTIONS = {
+    'issue_labels': ('labels', 'name'),
+}
+
+# The issues of the GraphQL API do not include the pull requests.
+ISSUES_QUERY = """
+query($owner: String!, $name: String!, $pageSize: Int!, $cursor: String, $since: DateTime) {{
+  {rate_limit}
+  repository(owner: $owner, name: $name) {{
+    issues(first: $pageSize, after: $cursor, orderBy: {{field: UPDATED_AT, direction: ASC}}, filterBy: {{since: $since}}) {{
+      {page_info}
+      nodes {{ {fields} }}
+    }}
+  }}
+}}
+"""
+
+NEXT_NODES_QUERY = """
+query($id: ID!, $pageSize: Int!, $cursor: String) {{
+  {rate_limit}
+  node(id: $id) {{
+    ... on {type_name} {{
+      {connection}(first: $pageSize, after: $cursor) {{ {page_info} nodes {{ {fields} }} }}
+    }}
+  }}
+}}
+"""
+
+def get_connection(connection, fields, page_size=NESTED_PAGE_SIZE):
+    """
+    Return the selection of a nested connection with its page info and total count.
+    """
+    return "{}(first: {}) {{ totalCount {} nodes {{ {} }} }}".format(connection, page_size, PAGE_INFO, fields)
+
+def get_user(actor, base_url):
+    """
+    Map an actor of the GraphQL API to a user of the REST API.
+    """
+    if not actor:
+        return None
+    return {
+        'login': actor.get('login'),
+        'id': actor.get('databaseId'),
+        'node_id': actor.get('id'),
+        'avatar_url': actor.get('avatarUrl'),
+        'html_url': actor.get('url'),
+        'url': '{}/users/{}'.format(base_url, actor.get('login')),
+        'type': actor.get('__typename'),
+    }
+
+def get_repository(repository, base_url):
+    """
+    Map a repository of the head or the base of a pull request, None when the repository was deleted.
+    """
+    if not repository:
+        return None
+    return {
+        'id': repository.get('databaseId'),
+        'node_id': repository.get('id'),
+        'name': repository.get('name'),
+        'full_name': repository.get('nameWithOwner'),
+        'html_url': repository.get('url'),
+        'url': '{}/repos/{}'.format(base_url, repository.get('nameWithOwner')),
+        'owner': get_user(repository.get('owner'), base_url),
+    }
+
+def get_lower(value):
+    return value.lower() if value else value
+
+def get_timestamp(value):
+    return normalize_timestamp(value) if value else value
+
+def get_pull_request(node, repo_path, base_url):
+    """
+    Map a pull request of the GraphQL API to a pull request of the REST API.
+    """
+    api_url = '{}/repos/{}'.format(base_url, repo_path)
+    url = '{}/pulls/{}'.format(api_url, node['number'])
+    html_url = node.get('url')
+    head_owner = node.get('headRepositoryOwner') or {}
+    base_repository = node.get('baseRepository') or {}
+    base_owner = base_repository.get('owner') or {}
+    assignees = [get_user(actor, base_url) for actor in (node.get('assignees') or {}).get('nodes', [])]
+    requested_reviewers = [request.get('requestedReviewer') or {} for request in (node.get('reviewRequests') or {}).get('nodes', [])]
+    milestone = node.get('milestone')
+    auto_merge = node.get('autoMergeRequest')
+    return {
+        'id': node.get('databaseId'),
+        'node_id': node.get('id'),
+        'number': node['number'],
+        # The merged pull requests are closed in the REST API.
+        'state': 'open' if node.get('state') == 'OPEN' else 'closed',
+        'title': node.get('title'),
+        'body': node.get('body'),
+        'locked': node.get('locked'),
+        'draft': node.get('isDraft'),
+        'active_lock_reason': get_lower(node.get('activeLockReason')),
+        'author_association': node.get('authorAssociation'),
+        'created_at': get_timestamp(node.get('createdAt')),
+        'updated_at': get_timestamp(node.get('updatedAt')),
+        'closed_at': get_timestamp(node.get('closedAt')),
+        'merged_at': get_timestamp(node.get('mergedAt')),
+        'merge_commit_sha': (node.get('mergeCommit') or {}).get('oid'),
+        'user': get_user(node.get('author'), base_url),
+        'assignee': assignees[0] if assignees else None,
+        'assignees': assignees,
+        'requested_reviewers': [get_user(reviewer, base_url) for reviewer in requested_reviewers if reviewer.get('__typename') == 'User'],
+        'requested_teams': [{'id': team.get('databaseId'), 'node_id': team.get('id'), 'name': team.get('name'), 'slug': team.get('slug'),
+                             'description': team.get('description'), 'privacy': TEAM_PRIVACY.get(team.get('privacy')), 'html_url': team.get('url')}
+                            for team in requested_reviewers if team.get('__typename') == 'Team'],
+        'labels': [{'node_id': label.get('id'), 'name': label.get('name'), 'color': label.get('color'), 'description': label.get('description'),
+                    'default': label.get('isDefault'), 'url': '{}/labels/{}'.format(api_url, quote(label.get('name') or ''))}
+                   for label in (node.get('labels') or {}).get('nodes', [])],
+        'milestone': get_milestone(milestone, api_url, base_url),
+        'auto_merge': {
+            'enabled_by': get_user(auto_merge.get('enabledBy'), base_url),
+            'merge_method': get_lower(auto_merge.get('mergeMethod')),
+            'commit_title': auto_merge.get('commitHeadline'),
+            'commit_message': auto_merge.get('commitBody'),
+        } if auto_merge else None,
+        'head': {
+            'label': '{}:{}'.format(head_owner.get('login'), node.get('headRefName')),
+            'ref': node.get('headRefName'),
+            'sha': node.get('headRefOid'),
+            'user': get_user(node.get('headRepositoryOwner'), base_url),
+            'repo': get_repository(node.get('headRepository'), base_url),
+        },
+        'base': {
+            'label': '{}:{}'.format(base_owner.get('login'), node.get('baseRefName')),
+            'ref': node.get('baseRefName'),
+            'sha': node.get('baseRefOid'),
+            'user': get_user(base_repository.get('owner'), base_url),
+            'repo': get_repository(node.get('baseRepository'), base_url),
+        },
+        'url': url,
+        'html_url': html_url,
+        'diff_url': html_url + '.diff' if html_url else None,
+        'patch_url': html_url + '.patch' if html_url else None,
+        'issue_url': '{}/issues/{}'.format(api_url, node['number']),
+        'commits_url': url + '/commits',
+        'review_comments_url': url + '/comments',
+        'comments_url': '{}/issues/{}/comments'.format(api_url, node['number']),
+        'statuses_url': '{}/statuses/{}'.format(api_url, node.get('headRefOid')),
+        '_links': {
+            'self': {'href': url},
+            'html': {'href': html_url},
+            'issue': {'href': '{}/issues/{}'.format(api_url, node['number'])},
+            'comments': {'href': '{}/issues/{}/comments'.format(api_url, node['number'])},
+            'review_comments': {'href': url + '/comments'},
+            'review_comment': {'href': api_url + '/pulls/comments{/number}'},
+            'commits': {'href': url + '/commits'},
+            'statuses': {'href': '{}/statuses/{}'.format(api_url, node.get('headRefOid'))},
+        },
+    }
+
+def get_milestone(milestone, api_url, base_url):
+    """
+    Map a milestone of the GraphQL API to a milestone of the REST API, whose id is not in the GraphQL API.
+    """
+    if not milestone:
+        return None
+    return {
+        'node_id': milestone.get('id'),
+        'number': milestone.get('number'),
+        'title': milestone.get('title'),
+        'description': milestone.get('description'),
+        'state': get_lower(milestone.get('state')),
+        'creator': get_user(milestone.get('creator'), base_url),
+        'created_at': get_timestamp(milestone.get('createdAt')),
+        'updated_at': get_timestamp(milestone.get('updatedAt')),
+        'closed_at': get_timestamp(milestone.get('closedAt')),
+        'due_on': get_timestamp(milestone.get('dueOn')),
+        'html_url': milestone.get('url'),
+        'url': '{}/milestones/{}'.format(api_url, milestone.get('number')),
+        'labels_url': '{}/milestones/{}/labels'.format(api_url, milestone.get('number')),
+    }
+
+def get_issue(node, repo_path, base_url):
+    """
+    Map an issue of the GraphQL API to an issue of the REST API, without its labels and assignees.
+    """
+    api_url = '{}/repos/{}'.format(base_url, repo_path)
+    url = '{}/issues/{}'.format(api_url, node['number'])
+    return {
+        'id': node.get('databaseId'),
+        'node_id': node.get('id'),
+        'number': node['number'],
+        'state': get_lower(node.get('state')),
+        'state_reason': get_lower(node.get('stateReason')),
+        'title': node.get('title'),
+        'body': node.get('body'),
+        'locked': node.get('locked'),
+        'active_lock_reason': get_lower(node.get('activeLockReason')),
+        'author_association': node.get('authorAssociation'),
+        'comments': (node.get('comments') or {}).get('totalCount'),
+        'created_at': get_timestamp(node.get('createdAt')),
+        'updated_at': get_timestamp(node.get('updatedAt')),
+        'closed_at': get_timestamp(node.get('closedAt')),
+        'user': get_user(node.get('author'), base_url),
+        'milestone': get_milestone(node.get('milestone'), api_url, base_url),
+        'url': url,
+        'html_url': node.get('url'),
+        'repository_url': api_url,
+        'labels_url': url + '/labels{/name}',
+        'comments_url': url + '/comments',
+        'events_url': url + '/events',
+        'timeline_url': url + '/timeline',
+    }
+
+def get_review(node, pull_request, base_url):
+    """
+    Map a review of the GraphQL API to a review of the REST API.
+    """
+    return {
+        'id': node.get('databaseId'),
+        'node_id': node.get('id'),
+        'user': get_user(node.get('author'), base_url),
+        'body': node.get('body'),
+        'state': node.get('state'),
+        'commit_id': (node.get('commit') or {}).get('oid'),
+        'author_association': node.get('authorAssociation'),
+        'submitted_at': get_timestamp(node.get('submittedAt')),
+        'html_url': node.get('url'),
+        'pull_request_url': pull_request['url'],
+        '_links': {'html': {'href': node.get('url')}, 'pull_request': {'href': pull_request['url']}},
+    }
+
+def get_review_comment(node, thread, pull_request, base_url, repo_path):
+    """
+    Map a review comment of the GraphQL API, with the sides of its thread, to a review comment of the REST API.
+    """
+    url = '{}/repos/{}/pulls/comments/{}'.format(base_url, repo_path, node.get('databaseId'))
+    return {
+        'id': node.get('databaseId'),
+        'node_id': node.get('id'),
+        'pull_request_review_id': (node.get('pullRequestReview') or {}).get('databaseId'),
+        'user': get_user(node.get('author'), base_url),
+        'body': node.get('body'),
+        'author_association': node.get('authorAssociation'),
+        'created_at': get_timestamp(node.get('createdAt')),
+        'updated_at': get_timestamp(node.get('updatedAt')),
+        'path': node.get('path'),
+        'diff_hunk': node.get('diffHunk'),
+        'position': node.get('position'),
+        'original_position': node.get('originalPosition'),
+        'line': node.get('line'),
+        'original_line': node.get('originalLine'),
+        'start_line': node.get('startLine'),
+        'original_start_line': node.get('originalStartLine'),
+        'side': thread.get('diffSide'),
+        'start_side': thread.get('startDiffSide'),
+        'commit_id': (node.get('commit') or {}).get('oid'),
+        'original_commit_id': (node.get('originalCommit') or {}).get('oid'),
+        'in_reply_to_id': (node.get('replyTo') or {}).get('databaseId'),
+        'url': url,
+        'html_url': node.get('url'),
+        'pull_request_url': pull_request['url'],
+        '_links': {'self': {'href': url}, 'html': {'href': node.get('url')}, 'pull_request': {'href': pull_request['url']}},
+    }
+
+def get_git_actor(git_actor):
+    return {'name': git_actor.get('name'), 'email': git_actor.get('email'), 'date': get_timestamp(git_actor.get('date'))}
+
+def get_pr_commit(node, base_url, repo_path):
+    """
+    Map a commit of a pull request of the GraphQL API to a commit of the REST API.
+    """
+    api_url = '{}/repos/{}'.format(base_url, repo_path)
+    commit = node['commit']
+    html_url = commit['url'].rsplit('/commit/', 1)[0] if commit.get('url') else None
+    sha = commit['oid']
+    author = commit.get('author') or {}
+    committer = commit.get('committer') or {}
+    return {
+        'sha': sha,
+        'node_id': commit.get('id'),
+        'url': '{}/commits/{}'.format(api_url, sha),
+        'html_url': commit.get('url'),
+        'comments_url': '{}/commits/{}/comments'.format(api_url, sha),
+        'commit': {
+            'url': '{}/git/commits/{}'.format(api_url, sha),
+            'author': get_git_actor(author),
+            'committer': get_git_actor(committer),
+            'message': commit.get('message'),
+            'tree': {'sha': commit['tree']['oid'], 'url': '{}/git/trees/{}'.format(api_url, commit['tree']['oid'])} if commit.get('tree') else None,
+        },
+        'author': get_user(author.get('user'), base_url),
+        'committer': get_user(committer.get('user'), base_url),
+        'parents': [{'sha': parent['oid'], 'url': '{}/commits/{}'.format(api_url, parent['oid']),
+                     'html_url': '{}/commit/{}'.format(html_url, parent['oid']) if html_url else None}
+                    for parent in (commit.get('parents') or {}).get('nodes', [])],
+    }
+
+class GraphQLQuery:
+    """
+    Page the nodes of a connection of a repository from the GraphQL API. The nodes of a connection nested in a page
+    beyond its first page are fetched by a query per connection. The cost of each query is paid from the points of
+    the GraphQL rate limit, the page is halved when a query exceeds the limits of the API.
+    """
+    source = None
+    connection = None
+
+    def __init__(self, client, repo_path, page_size=DEFAULT_GRAPHQL_PAGE_SIZE):
+        self.client = client
+        self.repo_path = repo_path
+        self.page_size = page_size
+        self.last_cost = None
+
+    def get_query(self):
+        raise NotImplementedError()
+
+    def get_cost(self, page_size):
+        raise NotImplementedError()
+
+    def get_variables(self):
+        """
+        Return the variables of the query other than the repository and the page.
+        """
+        return {}
+
+    def get_records(self, node):
+        raise NotImplementedError()
+
+    def execute(self, query, variables, cost):
+        """
+        Run a query once the rate limit has the points of its cost, the cost of the previous query when known.
+        """
+        self.client.wait_for_graphql_points(self.last_cost or cost)
+        data = self.client.authed_graphql(self.source, query, variables)
+        self.last_cost = (data.get('rateLimit') or {}).get('cost', self.last_cost)
+        return data
+
+    def get_pages(self, cursor=None):
+        """
+        Yield the records of the nodes of each page, and the cursor of the next page or None.
+        """
+        owner, name = self.repo_path.split('/', 1)
+        query = self.get_query()
+        while True:
+            variables = {'owner': owner, 'name': name, 'pageSize': self.page_size, 'cursor': cursor, **self.get_variables()}
+            try:
+                data = self.execute(query, variables, self.get_cost(self.page_size))
+            except (GraphQLResourceError, Server5xxError):
+                if self.page_size == 1:
+                    raise
+                self.page_size = max(1, self.page_size // 2)
+                LOGGER.warning("The %s query of %s exceeded the limits of the API, retrying with pages of %d.", self.source, self.repo_path, self.page_size)
+                continue
+
+            connection = ((data.get('repository') or {}).get(self.connection)) or {}
+            page_info = connection.get('pageInfo') or {}
+            yield [self.get_records(node) for node in connection.get('nodes', [])], \
+                page_info.get('endCursor') if page_info.get('hasNextPage') else None
+            if not page_info.get('hasNextPage'):
+                break
+            cursor = page_info['endCursor']
+
+    def get_nodes(self, node_id, type_name, connection, fields, first_page):
+        """
+        Return the nodes of a nested connection, fetching the pages after the first one.
+        """
+        nodes = list(first_page.get('nodes', []))
+        page_info = first_page.get('pageInfo') or {}
+        query = NEXT_NODES_QUERY.format(rate_limit=RATE_LIMIT, type_name=type_name, connection=connection, page_info=PAGE_INFO, fields=fields)
+        while page_info.get('hasNextPage'):
+            data = self.execute(query, {'id': node_id, 'pageSize': NEXT_NODES_PAGE_SIZE, 'cursor': page_info['endCursor']}, 1)
+            page = (data.get('node') or {}).get(connection) or {}
+            nodes.extend(page.get('nodes', []))
+            page_info = page.get('pageInfo') or {}
+        return nodes
+
+class PullRequestQuery(GraphQLQuery):
+    """
+    Page the pull requests of a repository, the most recently updated first, with the reviews, the review comments
+    and the commits of the selected children nested in the same query.
+    """
+    source = 'pull_requests'
+    connection = 'pullRequests'
+
+    def __init__(self, client, repo_path, children, page_size=DEFAULT_GRAPHQL_PAGE_SIZE):
+        super().__init__(client, repo_path, page_size)
+        self.children = [child for child in PULL_REQUEST_CONNECTIONS if child in children]
+
+    def get_query(self):
+        connections = [get_connection(*PULL_REQUEST_CONNECTIONS[child]) for child in self.children]
+        return PULL_REQUESTS_QUERY.format(rate_limit=RATE_LIMIT, page_info=PAGE_INFO, fields=' '.join([PULL_REQUEST] + connections))
+
+    def get_cost(self, page_size):
+        """
+        Estimate the points of a page from the number of connections it requests, a hundred requests costing a point.
+        """
+        requests = 1 + page_size * (4 + len(self.children))
+        if 'review_comments' in self.children:
+            requests += page_size * NESTED_PAGE_SIZE
+        return max(1, math.ceil(requests / 100))
+
+    def get_records(self, node):
+        """
+        Return the pull request of a node and the records of its children. The pull request also gets the counts of the
+        single pull request of the REST API.
+        """
+        base_url = self.client.base_url
+        pull_request = get_pull_request(node, self.repo_path, base_url)
+        child_records = {}
+        if 'reviews' in self.children:
+            reviews = [get_review(review, pull_request, base_url) for review in self.get_nodes(node['id'], 'PullRequest', 'reviews', REVIEW, node['reviews'])]
+            child_records['reviews'] = reviews
+        if 'review_comments' in self.children:
+            child_records['review_comments'] = []
+            for thread in self.get_nodes(node['id'], 'PullRequest', 'reviewThreads', REVIEW_THREAD, node['reviewThreads']):
+                comments = self.get_nodes(thread['id'], 'PullRequestReviewThread', 'comments', REVIEW_COMMENT, thread['comments'])
+                child_records['review_comments'].extend(get_review_comment(comment, thread, pull_request, base_url, self.repo_path) for comment in comments)
+            pull_request['review_comments'] = len(child_records['review_comments'])
+        if 'pr_commits' in self.children:
+            child_records['pr_commits'] = [get_pr_commit(commit, base_url, self.repo_path)
+                                           for commit in self.get_nodes(node['id'], 'PullRequest', 'commits', PR_COMMIT, node['commits'])]
+            pull_request['commits'] = node['commits'].get('totalCount')
+        return pull_request, child_records
+
+class IssueQuery(GraphQLQuery):
+    """
+    Page the issues of a repository updated since a time, the least recently updated first, with their assignees and
+    the labels of the selected children nested in the same query. The labels are mapped by name to the labels of the repository of the REST API,
+    whose ids are not in the GraphQL API. The labels are listed again once when a name is missing, a label still missing
+    is skipped.
+    """
+    source = 'issues'
+    connection = 'issues'
+
+    def __init__(self, client, repo_path, since, children, page_size=DEFAULT_ISSUES_PAGE_SIZE):
+        super().__init__(client, repo_path, page_size)
+        self.since = since
+        self.children = [child for child in ISSUE_CONNECTIONS if child in children]
+        self.labels = None
+        self.labels_refreshed = False
+
+    def get_query(self):
+        connections = [get_connection(*ISSUE_CONNECTIONS[child]) for child in self.children]
+        return ISSUES_QUERY.format(rate_limit=RATE_LIMIT, page_info=PAGE_INFO, fields=' '.join([ISSUE] + connections))
+
+    def get_cost(self, page_size):
+        """
+        Estimate the points of a page from the number of connections it requests, a hundred requests costing a point.
+        """
+        return max(1, math.ceil((1 + page_size * (3 + len(self.children))) / 100))
+
+    def get_variables(self):
+        return {'since': self.since}
+
+    def get_labels(self, refresh=False):
+        """
+        Return the labels of the repository of the REST API by name, requested once unless refreshed.
+        """
+        if self.labels is None or refresh:
+            self.labels = {}
+            url = '{}/repos/{}/labels?per_page=100'.format(self.client.base_url, self.repo_path)
+            for response in self.client.authed_get_all_pages('issue_labels', url, stream='issue_labels'):
+                for label in response.json() or []:
+                    self.labels[label['name']] = label
+        return self.labels
+
+    def get_records(self, node):
+        """
+        Return the issue of a node with the labels and the assignees read by its children.
+        """
+        base_url = self.client.base_url
+        issue = get_issue(node, self.repo_path, base_url)
+        if 'issue_labels' in self.children:
+            labels = self.get_labels()
+            names = [label['name'] for label in self.get_nodes(node['id'], 'Issue', 'labels', 'name', node['labels'])]
+            if not self.labels_refreshed and any(name not in labels for name in names):
+                # The label was created after the labels were listed.
+                self.labels_refreshed = True
+                labels = self.get_labels(refresh=True)
+            missing = [name for name in names if name not in labels]
+            if missing:
+                LOGGER.warning("Skipping the labels %s of the issue %s of %s, they are not in the labels of the repository.",
+                               missing, issue.get('number'), self.repo_path)
+            issue['labels'] = [dict(labels[name]) for name in names if name in labels]
+        issue['assignees'] = [get_user(assignee, base_url)
+                              for assignee in self.get_nodes(node['id'], 'Issue', 'assignees', USER_FIELDS, node['assignees'])]
+        issue['assignee'] = issue['assignees'][0] if issue['assignees'] else None
+        return issue
@@ -0,0 +1,188 @@
+import math
+import time
+from datetime import datetime
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+import singer
+from tap_github.streams import (REPOSITORY_STREAMS, STREAMS, DATE_FORMAT, DATE_RANGE_WINDOW, IncrementalDateStream, IncrementalOrderedStream,
+                                IncrementalStream, get_bookmark, get_child_full_url, get_date_ranges)
+from tap_github.sync import (STREAM_TO_SYNC_FOR_ORGS, get_repository_streams, get_selected_streams, get_stream_to_sync,
+                             is_top_level_stream, translate_state)
+
+LOGGER = singer.get_logger()
+
+# Number of records in a page when the url does not set `per_page`
+DEFAULT_PAGE_SIZE = 30
+# Seconds in a rate limit window of the REST API
+RATE_LIMIT_WINDOW = 60 * 60
+
+def get_probe_url(url):
+    """
+    Return the url of the first page with a single record per page, so the `last` link gives the number of records.
+    """
+    parsed_url = urlparse(url)
+    query = [(key, value) for key, value in parse_qsl(parsed_url.query, keep_blank_values=True) if key != 'per_page']
+    query.append(('per_page', '1'))
+    return urlunparse(parsed_url._replace(query=urlencode(query)))
+
+def get_page_size(url):
+    """
+    Return the number of records per page requested by the url.
+    """
+    per_page = dict(parse_qsl(urlparse(url).query)).get('per_page')
+    return int(per_page) if per_page and per_page.isdigit() else DEFAULT_PAGE_SIZE
+
+def get_record_count(response, result_path):
+    """
+    Return the number of records of a probe response and the first record.
+    """
+    records = response.json()
+    if isinstance(records, dict) and result_path:
+        if 'total_count' in records:
+            return records['total_count'], (records.get(result_path) or [None])[0]
+        records = records.get(result_path, [])
+    if not isinstance(records, list):
+        # Single record endpoints return one record.
+        return (1, records) if records else (0, None)
+
+    if 'last' in response.links:
+        last_page = dict(parse_qsl(urlparse(response.links['last']['url']).query)).get('page', '1')
+        return int(last_page), records[0] if records else None
+    return len(records), records[0] if records else None
+
+class Planner:
+    """
+    Estimate the number of requests a sync needs from cheap probes of the first page of each stream.
+    """
+    def __init__(self, client, config, state, catalog):
+        self.client = client
+        self.config = config
+        self.state = state
+        self.catalog = catalog
+        self.start_date = config['start_date']
+        self.selected_stream_ids = get_selected_streams(catalog)
+        self.streams_to_sync = get_stream_to_sync(catalog)
+        self.repository_streams = get_repository_streams(config, self.streams_to_sync)
+        self.probe_requests = 0
+        self.probe_seconds = 0
+
+    def probe(self, stream_obj, url):
+        """
+        Request the first page with a single record and return the number of records and the first record.
+        """
+        start_time = time.monotonic()
+        response = self.client.authed_get(stream_obj.tap_stream_id, get_probe_url(url), stream_obj.headers, stream_obj.tap_stream_id)
+        self.probe_seconds += time.monotonic() - start_time
+        self.probe_requests += 1
+        return get_record_count(response, stream_obj.result_path)
+
+    def get_stream_url(self, stream_obj, repo_path):
+        """
+        Build the url of the stream from the bookmarks in the state and return it with the number of date windows.
+        """
+        current_time = datetime.today().strftime(DATE_FORMAT)
+        stream_id = stream_obj.tap_stream_id
+        if isinstance(stream_obj, IncrementalDateStream):
+            min_bookmark = stream_obj.get_min_bookmark(stream_id, self.selected_stream_ids, current_time, repo_path, self.start_date, self.state)
+            windows = len(list(get_date_ranges(min_bookmark, current_time, self.config.get('date_range_window', DATE_RANGE_WINDOW))))
+            return stream_obj.build_url(self.client.base_url, repo_path, {'from': min_bookmark, 'until': current_time}), windows
+        if isinstance(stream_obj, IncrementalStream):
+            min_bookmark = stream_obj.get_min_bookmark(stream_id, self.selected_stream_ids, current_time, repo_path, self.start_date, self.state)
+            return stream_obj.build_url(self.client.base_url, repo_path, min_bookmark), 1
+        if isinstance(stream_obj, IncrementalOrderedStream):
+            bookmark = get_bookmark(self.state, repo_path, stream_id, "since", self.start_date)
+            return stream_obj.build_url(self.client.base_url, repo_path, bookmark), 1
+        return stream_obj.build_url(self.client.base_url, repo_path, None), 1
+
+    def estimate_children(self, stream_obj, repo_path, record_count, sample_record, top_parent_id=None):
+        """
+        Estimate the requests of the child streams from a sample parent record.
+        """
+        child_requests = {}
+        for child in stream_obj.children:
+            if child not in self.streams_to_sync or child in self.repository_streams:
+                # The streams synced from their repository endpoint are estimated on their own.
+                continue
+            child_obj = STREAMS[child]()
+            child_id = tuple((sample_record or {}).get(key) for key in child_obj.id_keys)
+            child_record_count, child_sample = record_count, sample_record
+            requests = 0
+            if not child_obj.no_path and record_count and sample_record and all(child_id):
+                # The nested children are built from the id of the top level parent and the id of their parent, as in `get_child_records`.
+                child_url = get_child_full_url(self.client.base_url, child_obj, repo_path, top_parent_id or child_id, child_id)
+                sample_count, child_sample = self.probe(child_obj, child_url)
+                # One request per parent record and more for the parents with more than one page of children.
+                requests = record_count * max(1, math.ceil(sample_count / get_page_size(child_url)))
+                child_record_count = record_count * sample_count
+            elif not child_obj.no_path:
+                requests = record_count
+            child_requests[child] = requests
+            child_requests.update(self.estimate_children(child_obj, repo_path, child_record_count, child_sample, top_parent_id or child_id))
+        return child_requests
+
+    def estimate_stream(self, stream_id, repo_path):
+        """
+        Estimate the number of records and requests of a stream and its children for a repository or an organization.
+        """
+        stream_obj = REPOSITORY_STREAMS[stream_id]() if stream_id in self.repository_streams else STREAMS[stream_id]()
+        url, windows = self.get_stream_url(stream_obj, repo_path)
+        record_count, sample_record = self.probe(stream_obj, url)
+        requests = max(windows, math.ceil(record_count / get_page_size(url)))
+        child_requests = self.estimate_children(stream_obj, repo_path, record_count, sample_record)
+        return {
+            'records': record_count,
+            'requests': requests + sum(child_requests.values()),
+            'child_requests': child_requests
+        }
+
+    def plan(self):
+        """
+        Estimate the cost of the sync for all the repositories and organizations and return the report.
+        """
+        repositories, organizations = self.client.extract_repos_from_config()
+        self.state = translate_state(self.state, self.catalog, repositories)
+
+        top_level_streams = [stream_id for stream_id in sorted(self.streams_to_sync) if is_top_level_stream(stream_id, self.repository_streams)]
+        org_streams = [stream_id for stream_id in top_level_streams if stream_id in STREAM_TO_SYNC_FOR_ORGS]
+        repo_streams = [stream_id for stream_id in top_level_streams if stream_id not in STREAM_TO_SYNC_FOR_ORGS]
+
+        streams_cost = {}
+        for repo_path, stream_ids in [(org, org_streams) for org in sorted(organizations)] + [(repo, repo_streams) for repo in sorted(repositories)]:
+            for stream_id in stream_ids:
+                LOGGER.info("Estimating the cost of %s for %s", stream_id, repo_path)
+                streams_cost.setdefault(repo_path, {})[stream_id] = self.estimate_stream(stream_id, repo_path)
+
+        total_requests = sum(cost['requests'] for repo_cost in streams_cost.values() for cost in repo_cost.values())
+        rate_limit = self.client.get_rate_limit()
+        return {
+            'repositories': streams_cost,
+            'total_requests': total_requests,
+            'probe_requests': self.probe_requests,
+            'rate_limit': rate_limit,
+            'fits_in_remaining_quota': total_requests <= rate_limit.get('remaining', 0),
+            'estimated_duration_seconds': self.estimate_duration(total_requests, rate_limit)
+        }
+
+    def estimate_duration(self, total_requests, rate_limit):
+        """
+        Estimate the duration of the sync from the latency of the probes and the waits for the rate limit resets.
+        """
+        average_latency = self.probe_seconds / self.probe_requests if self.probe_requests else 0
+        duration = total_requests * average_latency
+        remaining, limit = rate_limit.get('remaining', 0), rate_limit.get('limit', 0)
+        if total_requests > remaining and limit:
+            # Wait for the current window to reset and for one window per `limit` requests after that.
+            windows = math.ceil((total_requests - remaining) / limit)
+            duration += max(0, rate_limit.get('reset', time.time()) - time.time()) + RATE_LIMIT_WINDOW * (windows - 1)
+        return round(duration)
+
+def plan(client, config, state, catalog):
+    """
+    Estimate the number of requests and the duration of a sync without syncing any records.
+    """
+    report = Planner(client, config, state, catalog).plan()
+    for repo_path, repo_cost in report['repositories'].items():
+        for stream_id, cost in repo_cost.items():
+            LOGGER.info("%s %s: %d records, %d requests", repo_path, stream_id, cost['records'], cost['requests'])
+    LOGGER.info("Estimated %d requests (%d remaining of %d), %d seconds.", report['total_requests'],
+                report['rate_limit'].get('remaining', 0), report['rate_limit'].get('limit', 0), report['estimated_duration_seconds'])
+    return report
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import sqlite3
+import singer
+from tap_github.dedupe import get_start_bookmarks
+from tap_github.timestamps import parse_timestamp
+
+LOGGER = singer.get_logger()
+
+# Bits and hash functions of the Bloom filter, about 1% of false positives for a million SHAs
+DEFAULT_BLOOM_BITS = 10 * 1000 * 1000
+DEFAULT_BLOOM_HASHES = 7
+# `skip` does not fetch the details of a known SHA again, `replay` writes the stored records of the SHA instead
+SHA_INDEX_MODES = ['skip', 'replay']
+# Number of added SHAs between two commits of the store
+COMMIT_EVERY = 1000
+
+class BloomFilter:
+    """
+    A Bloom filter of strings, with positions derived from two halves of a BLAKE2 digest.
+    """
+    def __init__(self, size=DEFAULT_BLOOM_BITS, hashes=DEFAULT_BLOOM_HASHES, bits=None):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bytearray(bits) if bits is not None else bytearray((size + 7) // 8)
+
+    def get_positions(self, key):
+        """
+        Return the bit positions of a key.
+        """
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self.get_positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.get_positions(key))
+
+class ShaIndex:
+    """
+    A persistent index of the commit SHAs whose child records were already extracted, shared by the repositories
+    and the runs. The Bloom filter answers the lookups of the new SHAs in memory, the sqlite store is only queried
+    for the probable hits and holds the records written for each SHA in the `replay` mode.
+
+    A SHA is stored with the repository and the parent bookmark its records were written under. In the `skip` mode a
+    SHA of a previous run is only skipped once the bookmark the run starts with moved past it, as the target may not
+    have persisted the records written after the last state it confirmed.
+    """
+    def __init__(self, path, mode='skip', bloom_bits=DEFAULT_BLOOM_BITS, bloom_hashes=DEFAULT_BLOOM_HASHES, start_bookmarks=None):
+        if mode not in SHA_INDEX_MODES:
+            raise ValueError("Invalid SHA index mode '{}', expected one of {}.".format(mode, SHA_INDEX_MODES))
+        self.mode = mode
+        self.start_bookmarks = start_bookmarks or {}
+        # The SHAs added by this run, their records were written by the run itself
+        self.added = set()
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS commit_details "
+                                "(stream_id TEXT NOT NULL, sha TEXT NOT NULL, records TEXT, repo TEXT, bookmark TEXT, "
+                                "PRIMARY KEY (stream_id, sha))")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS bloom_filter "
+                                "(id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER, hashes INTEGER, bits BLOB)")
+        self.pending = 0
+        self.bloom = self.load_bloom(bloom_bits, bloom_hashes)
+
+    @staticmethod
+    def get_key(stream_id, sha):
+        return '{}:{}'.format(stream_id, sha)
+
+    def load_bloom(self, size, hashes):
+        """
+        Load the saved Bloom filter, or rebuild it from the store when it was saved with another size or not saved.
+        """
+        row = self.connection.execute("SELECT size, hashes, bits FROM bloom_filter WHERE id = 0").fetchone()
+        if row and row[0] == size and row[1] == hashes:
+            return BloomFilter(size, hashes, row[2])
+        bloom = BloomFilter(size, hashes)
+        for stream_id, sha in self.connection.execute("SELECT stream_id, sha FROM commit_details"):
+            bloom.add(self.get_key(stream_id, sha))
+        return bloom
+
+    def is_confirmed(self, stream_id, repo, bookmark):
+        """
+        Check whether a SHA indexed under a bookmark is before the bookmark the run of its repository starts with.
+        """
+        start_bookmark = self.start_bookmarks.get((repo, stream_id))
+        return bool(bookmark and start_bookmark) and parse_timestamp(bookmark) < parse_timestamp(start_bookmark)
+
+    def get(self, stream_id, sha):
+        """
+        Return the records of a SHA extracted before, an empty list in the `skip` mode, or None for a new SHA.
+        """
+        key = self.get_key(stream_id, sha)
+        if key not in self.bloom:
+            return None
+        row = self.connection.execute("SELECT records, repo, bookmark FROM commit_details WHERE stream_id = ? AND sha = ?",
+                                      (stream_id, sha)).fetchone()
+        if row is None:
+            return None
+        if self.mode == 'skip':
+            # The SHAs of a previous run whose records may not be persisted by the target are fetched again.
+            return [] if key in self.added or self.is_confirmed(stream_id, row[1], row[2]) else None
+        # The SHAs indexed in the `skip` mode have no records to replay and are fetched again.
+        return json.loads(row[0]) if row[0] is not None else None
+
+    def add(self, stream_id, sha, records, repo=None, bookmark=None):
+        """
+        Record the child records extracted for a SHA with the repository and the parent bookmark they were written
+        under, the records are only stored in the `replay` mode.
+        """
+        self.connection.execute("INSERT OR REPLACE INTO commit_details (stream_id, sha, records, repo, bookmark) VALUES (?, ?, ?, ?, ?)",
+                                (stream_id, sha, json.dumps(records) if self.mode == 'replay' else None, repo, bookmark))
+        key = self.get_key(stream_id, sha)
+        self.bloom.add(key)
+        self.added.add(key)
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        """
+        Save the Bloom filter and commit the added SHAs.
+        """
+        self.connection.execute("INSERT OR REPLACE INTO bloom_filter (id, size, hashes, bits) VALUES (0, ?, ?, ?)",
+                                (self.bloom.size, self.bloom.hashes, bytes(self.bloom.bits)))
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+SHA_INDEX = None
+
+def configure(config, state=None):
+    """
+    Open the SHA index of the config for a run starting with the state, the child streams of the commits are not
+    deduplicated without a `sha_index_path`.
+    """
+    global SHA_INDEX # pylint: disable=global-statement
+    close()
+    if config.get('sha_index_path'):
+        SHA_INDEX = ShaIndex(config['sha_index_path'], config.get('sha_index_mode', 'skip'), start_bookmarks=get_start_bookmarks(state))
+        LOGGER.info("Deduplicating the commit details with the SHA index %s in the %s mode.", config['sha_index_path'], SHA_INDEX.mode)
+
+def get_sha_index():
+    """
+    Return the configured SHA index or None.
+    """
+    return SHA_INDEX
+
+def close():
+    """
+    Commit and close the configured SHA index.
+    """
+    global SHA_INDEX # pylint: disable=global-statement
+    if SHA_INDEX is not None:
+        SHA_INDEX.close()
+        SHA_INDEX = None
@@ -1,11 +1,33 @@
+import bisect
+import copy
+import hashlib
+import json
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 import singer
-from singer import (metrics, bookmarks, metadata)
+from singer import (metrics, bookmarks)
+from tap_github import checkpoint, dedupe
+from tap_github.client import NotModifiedError
+from tap_github.sha_index import get_sha_index
+from tap_github.git_mirror import GitMirror
+from tap_github.graphql import DEFAULT_GRAPHQL_PAGE_SIZE, DEFAULT_ISSUES_PAGE_SIZE, IssueQuery, PullRequestQuery
+from tap_github.transform import get_transform_plan, project, transform_record
+from tap_github.timestamps import BookmarkTime, format_timestamp, parse_timestamp
 
 LOGGER = singer.get_logger()
 DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
 PER_PAGE_NUMBER = 100
 DATE_RANGE_WINDOW = 7
+# Bounds of the adaptive date windows
+DATE_RANGE_MIN_WINDOW = timedelta(hours=1)
+DATE_RANGE_MAX_WINDOW = timedelta(days=365)
+# Number of records the adaptive date windows are sized for
+DATE_RANGE_TARGET_RECORDS = 500
+# Maximum age in seconds of a page cursor that can be resumed
+PAGE_CURSOR_MAX_AGE = 24 * 60 * 60
+# Seconds between two polls of the events when the API sends no `X-Poll-Interval`
+EVENTS_POLL_INTERVAL = 60
 
 def get_bookmark(state, repo, stream_name, bookmark_key, start_date, is_incremental = True):
     """
@@ -17,22 +39,252 @@ def get_bookmark(state, repo, stream_name, bookmark_key, start_date, is_incremen
             return repo_stream_dict.get(bookmark_key)
     return start_date
 
+def write_record(stream_id, record, time_extracted):
+    """
+    Write the record and count it for the state checkpoint policy.
+    """
+    singer.write_record(stream_id, record, time_extracted=time_extracted)
+    checkpoint.record_written()
+
+def get_stream_bookmarks(state, repo, stream_ids):
+    """
+    Return a snapshot of the bookmarks of the given streams for a repository.
+    """
+    return {stream_id: copy.deepcopy(bookmarks.get_bookmark(state, repo, stream_id)) for stream_id in stream_ids}
+
+def restore_stream_bookmarks(state, repo, stream_bookmarks):
+    """
+    Restore the bookmarks of the streams from a snapshot, removing the bookmarks that did not exist in the snapshot.
+    """
+    for stream_id, bookmark in stream_bookmarks.items():
+        if bookmark is None:
+            state.get('bookmarks', {}).get(repo, {}).pop(stream_id, None)
+        else:
+            singer.write_bookmark(state, repo, stream_id, copy.deepcopy(bookmark))
+
+def clear_page_cursor(state, repo, stream_id):
+    """
+    Remove the page cursor of the stream from the state.
+    """
+    cursor = state.get('page_cursor')
+    if cursor and cursor.get('repo') == repo and cursor.get('stream') == stream_id:
+        del state['page_cursor']
+
+def write_page_cursor(state, repo, stream_id, start_url, next_url, bookmark, stream_bookmarks):
+    """
+    Save the next page to fetch for the stream with the bookmarks it was started with, so an interrupted sync
+    can resume from this page instead of the first one.
+    """
+    state['page_cursor'] = {
+        'repo': repo,
+        'stream': stream_id,
+        'start_url': start_url,
+        'next_url': next_url,
+        'bookmark': bookmark,
+        'bookmarks': stream_bookmarks,
+        'updated_at': singer.utils.now().strftime(DATE_FORMAT)
+    }
+
+def get_page_cursor(state, repo, stream_id, max_age=PAGE_CURSOR_MAX_AGE):
+    """
+    Return the page cursor saved for the stream by an interrupted sync. The bookmarks the interrupted sync started
+    with are restored in the state, so discarding a stale cursor falls back to a full sync from those bookmarks.
+    """
+    cursor = state.get('page_cursor')
+    if not cursor or cursor.get('repo') != repo or cursor.get('stream') != stream_id:
+        return None
+
+    restore_stream_bookmarks(state, repo, cursor.get('bookmarks', {}))
+
+    cursor_age = (singer.utils.now() - singer.utils.strptime_to_utc(cursor['updated_at'])).total_seconds()
+    if cursor_age > max_age:
+        LOGGER.info("Discarding the page cursor of %s for %s as it is %d seconds old.", stream_id, repo, cursor_age)
+        clear_page_cursor(state, repo, stream_id)
+        return None
+
+    return cursor
+
+def get_resume_url(cursor, start_url):
+    """
+    Return the url of the page to resume the stream from if the cursor was saved for the same first page url.
+    """
+    if not cursor:
+        return None
+    if cursor.get('start_url') != start_url:
+        LOGGER.info("Discarding the page cursor of %s as its url %s does not match %s.", cursor['stream'], cursor.get('start_url'), start_url)
+        return None
+    LOGGER.info("Resuming %s from the page %s.", cursor['stream'], cursor['next_url'])
+    return cursor['next_url']
+
+def move_to_repository(record, repo_path, url_fields):
+    """
+    Move a record extracted for another repository to the repository, with the urls of its url fields.
+    """
+    source_repo = record.get('_sdc_repository')
+    record['_sdc_repository'] = repo_path
+    if not source_repo or source_repo == repo_path:
+        return
+    pattern = re.compile('/{}/'.format(re.escape(source_repo)), re.IGNORECASE)
+    for field in url_fields:
+        if isinstance(record.get(field), str):
+            record[field] = pattern.sub('/{}/'.format(repo_path), record[field], count=1)
+
+def get_fingerprint(record, field_paths):
+    """
+    Return a short digest of the values of the fields of a parent record that change with its children,
+    or None when none of the fields is known.
+    """
+    values = []
+    for field_path in field_paths:
+        value = record
+        for field in field_path:
+            value = value.get(field) if isinstance(value, dict) else None
+        values.append(value)
+    if all(value is None for value in values):
+        return None
+    return hashlib.blake2b(json.dumps(values, default=str).encode('utf-8'), digest_size=5).hexdigest()
+
+def get_child_fingerprint(state, repo, parent_key, child_stream):
+    """
+    Return the fingerprint of the parent record saved when the records of a child stream were last fetched.
+    """
+    return state.get('child_fingerprints', {}).get(repo, {}).get(parent_key, {}).get(child_stream)
+
+def write_child_fingerprint(state, repo, parent_key, child_stream, fingerprint, updated_at):
+    """
+    Save the fingerprint of the parent record after the records of a child stream are fetched, with the replication
+    value of the parent record.
+    """
+    fingerprints = state.setdefault('child_fingerprints', {}).setdefault(repo, {}).setdefault(parent_key, {})
+    fingerprints[child_stream] = fingerprint
+    fingerprints['updated_at'] = updated_at
+
+def prune_child_fingerprints(state, repo, bookmark):
+    """
+    Drop the fingerprints of the parent records last updated before the bookmark a sync started with. Only the parent
+    records updated since are kept, so the state does not grow with every parent record.
+    """
+    fingerprints = state.get('child_fingerprints', {}).get(repo)
+    if not fingerprints:
+        return
+    bookmark_time = BookmarkTime(bookmark)
+    for parent_key in [parent_key for parent_key, entry in fingerprints.items()
+                       if not entry.get('updated_at') or bookmark_time.is_after(entry['updated_at'])]:
+        del fingerprints[parent_key]
+    if not fingerprints:
+        del state['child_fingerprints'][repo]
+
 def get_date_ranges(start_date, end_date, date_range_window=DATE_RANGE_WINDOW):
     """
     Return a list of date ranges to be used for the API calls.
     """
-    start_date = datetime.strptime(start_date, DATE_FORMAT)
-    end_date = datetime.strptime(end_date, DATE_FORMAT)
+    start_date = parse_timestamp(start_date)
+    end_date = parse_timestamp(end_date)
     while start_date < end_date:
         temp_end_date=start_date + timedelta(days=date_range_window)
-        date_ranges=(start_date.strftime(DATE_FORMAT),temp_end_date.strftime(DATE_FORMAT))
+        date_ranges=(format_timestamp(start_date),format_timestamp(temp_end_date))
         start_date = temp_end_date
         yield date_ranges
 
+class DateWindows:
+    """
+    Iterate the date windows from a start to an end timestamp. In the adaptive mode the window is doubled after
+    a sparse window and halved after a dense one. A window reaching the result cap of the API is bisected
+    and its halves are iterated before the next windows.
+    """
+    def __init__(self, start_date, end_date, date_range_window=DATE_RANGE_WINDOW, adaptive=False, target_records=DATE_RANGE_TARGET_RECORDS):
+        self.start = parse_timestamp(start_date)
+        self.end = parse_timestamp(end_date)
+        self.window = timedelta(days=date_range_window)
+        self.adaptive = adaptive
+        self.target_records = target_records
+        # Halves of the bisected windows, the next one last
+        self.pending = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.pending:
+            start, end = self.pending.pop()
+        elif self.start < self.end:
+            start, end = self.start, min(self.start + self.window, self.end)
+            self.start = end
+        else:
+            raise StopIteration
+        return format_timestamp(start), format_timestamp(end)
+
+    @staticmethod
+    def get_middle(start_date, end_date):
+        """
+        Return the start, the middle and the end of a window, to the second.
+        """
+        start, end = parse_timestamp(start_date), parse_timestamp(end_date)
+        return start, start + timedelta(seconds=(end - start).total_seconds() // 2), end
+
+    def can_bisect(self, start_date, end_date):
+        """
+        Check whether a window is long enough to be split.
+        """
+        start, middle, _ = self.get_middle(start_date, end_date)
+        return middle > start
+
+    def bisect(self, start_date, end_date):
+        """
+        Split a window into two halves iterated next, return False if the window cannot be split anymore.
+        """
+        start, middle, end = self.get_middle(start_date, end_date)
+        if middle <= start:
+            return False
+        self.pending.append((middle, end))
+        self.pending.append((start, middle))
+        if self.adaptive:
+            # The windows after the bisected one start from the size of its halves.
+            self.window = max(min(self.window, middle - start), DATE_RANGE_MIN_WINDOW)
+        return True
+
+    def update(self, record_count):
+        """
+        Resize the next windows from the number of records of the last window.
+        """
+        if not self.adaptive:
+            return
+        if record_count > self.target_records:
+            self.window = max(self.window / 2, DATE_RANGE_MIN_WINDOW)
+        elif record_count < self.target_records / 4:
+            self.window = min(self.window * 2, DATE_RANGE_MAX_WINDOW)
+
+class RecordOrder:
+    """
+    Follow the replication key values of a stream declared as sorted, across its pages. The pages are only cut
+    at the bookmark while the values come in the declared order.
+    """
+    def __init__(self, stream_id, replication_key, direction):
+        self.stream_id = stream_id
+        self.replication_key = replication_key
+        self.direction = direction
+        self.last_value = None
+        self.in_order = direction is not None
+
+    def check(self, value):
+        """
+        Check a value against the previous one and return whether the declared order still holds.
+        """
+        if self.in_order and self.last_value is not None and value != self.last_value:
+            if (value > self.last_value) == (self.direction == 'desc'):
+                LOGGER.warning("The %s records are not in the %s order of %s, %s follows %s. Reading all the pages.",
+                               self.stream_id, self.direction, self.replication_key, value, self.last_value)
+                self.in_order = False
+        self.last_value = value
+        return self.in_order
+
 def get_schema(catalog, stream_id):
     """
     Return catalog of the specified stream.
     """
+    graph = STREAM_GRAPH
+    if graph is not None and graph.catalog is catalog:
+        return graph.get_catalog_entry(stream_id)
     stream_catalog = [cat for cat in catalog if cat['tap_stream_id'] == stream_id ][0]
     return stream_catalog
 
@@ -88,9 +340,21 @@ class Stream:
     parent = None
     inherit_parent_fields = []
     inherit_array_parent_fields = ""
+    # Fields of the parent record read by `add_fields_at_1st_level`
+    parent_fields = []
     custom_column_name = ""
     no_path = False
     result_path = ""
+    # Whether the records of the stream are the details of the parent commit, deduplicated by its SHA
+    sha_indexed = False
+    # Fields of the SHA indexed records holding urls of the repository they were extracted for
+    repository_url_fields = []
+    # Whether a record is only written when its key is new or its attributes changed
+    deduplicated = False
+    # Field paths of the parent record whose values change whenever the records of the stream change
+    fingerprint_fields = []
+    # Order of the records of the API by their replication key, `desc` for the newest first or `asc`, None when unordered
+    sort_direction = None
 
     def build_url(self, base_url, repo_path, bookmark):
         """
@@ -123,35 +387,51 @@ class Stream:
         LOGGER.info("Final url is: %s", full_url)
         return full_url
 
+    def get_descendants(self):
+        """
+        Return the stream ids of all the children and nested children of the stream.
+        """
+        descendants = []
+        for child in self.children:
+            descendants.append(child)
+            descendants.extend(STREAMS[child]().get_descendants())
+        return descendants
+
+    def get_required_fields(self):
+        """
+        Return the fields of the records kept by the projection even when they are not selected: the keys,
+        the replication key and the fields of the record read by the children.
+        """
+        required_fields = {'_sdc_repository', *self.key_properties}
+        if self.replication_keys:
+            required_fields.add(self.replication_keys)
+        for child in self.children:
+            child_class = STREAMS[child]
+            required_fields.update(child_class.id_keys)
+            required_fields.update(field for _, field in child_class.inherit_parent_fields)
+            required_fields.update(child_class.parent_fields)
+            if child_class.inherit_array_parent_fields:
+                required_fields.add(child_class.inherit_array_parent_fields)
+            required_fields.update(field_path[0] for field_path in child_class.fingerprint_fields)
+        return frozenset(required_fields)
+
     def get_min_bookmark(self, stream, selected_streams, bookmark, repo_path, start_date, state):
         """
         Get the minimum bookmark from the parent and its corresponding child bookmarks.
         """
-
-        stream_obj = STREAMS[stream]()
         min_bookmark = bookmark
-        if stream in selected_streams:
-            # Get minimum of stream's bookmark(start date in case of no bookmark) and min_bookmark
-            min_bookmark = min(min_bookmark, get_bookmark(state, repo_path, stream, "since", start_date))
+        for stream_id in get_selected_family(stream, selected_streams):
+            # Get minimum of stream's bookmark(start date in case of no bookmark) and min_bookmark for the stream and all its children.
+            min_bookmark = min(min_bookmark, get_bookmark(state, repo_path, stream_id, "since", start_date))
             LOGGER.debug("New minimum bookmark is %s", min_bookmark)
 
-        for child in stream_obj.children:
-            # Iterate through all children and return minimum bookmark among all.
-            min_bookmark = min(min_bookmark, self.get_min_bookmark(child, selected_streams, min_bookmark, repo_path, start_date, state))
-
         return min_bookmark
 
     def write_bookmarks(self, stream, selected_streams, bookmark_value, repo_path, state):
         """Write the bookmark in the state corresponding to the stream."""
-        stream_obj = STREAMS[stream]()
-
-        # If the stream is selected, write the bookmark.
-        if stream in selected_streams:
-            singer.write_bookmark(state, repo_path, stream_obj.tap_stream_id, {"since": bookmark_value})
-
-        # For the each child, write the bookmark if it is selected.
-        for child in stream_obj.children:
-            self.write_bookmarks(child, selected_streams, bookmark_value, repo_path, state)
+        # Write the bookmark of the stream and of each child if it is selected.
+        for stream_id in get_selected_family(stream, selected_streams):
+            singer.write_bookmark(state, repo_path, stream_id, {"since": bookmark_value})
 
     # pylint: disable=no-self-use
     def get_child_records(self,
@@ -170,7 +450,8 @@ class Stream:
         """
         Retrieve and write all the child records for each updated parent based on the parent record and its ids.
         """
-        child_object = STREAMS[child_stream]()
+        graph = get_stream_graph(catalog, selected_stream_ids)
+        child_object = graph[child_stream].stream
 
         is_stream_incremental = child_object.replication_method == "INCREMENTAL" and child_object.replication_keys
         child_bookmark_value = get_bookmark(state, repo_path, child_object.tap_stream_id, "since", start_date, is_stream_incremental)
@@ -178,8 +459,35 @@ class Stream:
         if not parent_id:
             parent_id = grand_parent_id
 
+        fingerprint = get_fingerprint(parent_record, child_object.fingerprint_fields) if child_object.fingerprint_fields else None
+        parent_key = '-'.join(str(value) for value in parent_id) if fingerprint else None
+        if fingerprint and get_child_fingerprint(state, repo_path, parent_key, child_stream) == fingerprint:
+            # The records of the child cannot have changed since they were last fetched.
+            LOGGER.debug("Skipping %s of %s as its fingerprint did not change.", child_stream, parent_key)
+            return
+
         child_full_url = get_child_full_url(client.base_url, child_object, repo_path, parent_id, grand_parent_id)
+        if child_full_url and is_stream_incremental and child_object.since_filter_param:
+            # Only list the child records updated since the bookmark of the child.
+            child_full_url = '{}?since={}{}'.format(child_full_url, child_bookmark_value, child_object.since_filter_param)
         stream_catalog = get_schema(catalog, child_object.tap_stream_id)
+        projection = get_transform_plan(stream_catalog).get_projection(graph[child_stream].required_fields)
+
+        sha_index = get_sha_index() if child_object.sha_indexed else None
+        sha = parent_record.get('sha') if sha_index else None
+        indexed_records = None
+        if sha:
+            indexed_records = sha_index.get(child_object.tap_stream_id, sha)
+            if indexed_records is not None:
+                # The details of the commit were extracted for another repository or by a previous run.
+                if child_object.tap_stream_id in selected_stream_ids:
+                    extraction_time = singer.utils.now()
+                    for rec in indexed_records:
+                        move_to_repository(rec, repo_path, child_object.repository_url_fields)
+                        write_record(child_object.tap_stream_id, rec, extraction_time)
+                return
+            indexed_records = []
+
         with metrics.record_counter(child_object.tap_stream_id) as counter:
             if child_full_url is not None:
                 for response in client.authed_get_all_pages(
@@ -198,20 +506,20 @@ class Stream:
                             for column, field in child_object.inherit_parent_fields:
                                 record[column] = parent_record.get(field)
                             child_object.add_fields_at_1st_level(record = record, parent_record = parent_record)
+                            record = project(record, projection)
 
-                            with singer.Transformer() as transformer:
-
-                                rec = transformer.transform(record, stream_catalog['schema'], metadata=metadata.to_map(stream_catalog['metadata']))
+                            rec = transform_record(stream_catalog, record)
 
-                                if child_object.tap_stream_id in selected_stream_ids and record.get(child_object.replication_keys, start_date) >= child_bookmark_value:
-                                    singer.write_record(child_object.tap_stream_id, rec, time_extracted=extraction_time)
-                                    counter.increment()
+                            if child_object.tap_stream_id in selected_stream_ids and record.get(child_object.replication_keys, start_date) >= child_bookmark_value:
+                                write_record(child_object.tap_stream_id, rec, extraction_time)
+                                counter.increment()
+                                if indexed_records is not None: indexed_records.append(rec)
 
                             # Loop thru each child and nested child in the parent and fetch all the child records.
                             for nested_child in child_object.children:
                                 if nested_child in stream_to_sync:
                                     # Collect id of child record to pass in the API of its sub-child.
-                                    child_id = tuple(record.get(key) for key in STREAMS[nested_child]().id_keys)
+                                    child_id = graph[nested_child].get_id(record)
                                     # Here, grand_parent_id is the id of 1st level parent(main parent) which is required to
                                     # pass in the API of the current child's sub-child.
                                     child_object.get_child_records(client, catalog, nested_child, child_id, repo_path, state, start_date, bookmark_dttm, stream_to_sync, selected_stream_ids, grand_parent_id, record)
@@ -222,13 +530,16 @@ class Stream:
                         for column, field in child_object.inherit_parent_fields:
                             records[column] = parent_record.get(field)
                         child_object.add_fields_at_1st_level(record = records, parent_record = parent_record)
+                        records = project(records, projection)
 
-                        with singer.Transformer() as transformer:
+                        rec = transform_record(stream_catalog, records)
+                        if child_object.tap_stream_id in selected_stream_ids and records.get(child_object.replication_keys, start_date) >= child_bookmark_value :
 
-                            rec = transformer.transform(records, stream_catalog['schema'], metadata=metadata.to_map(stream_catalog['metadata']))
-                            if child_object.tap_stream_id in selected_stream_ids and records.get(child_object.replication_keys, start_date) >= child_bookmark_value :
-
-                                singer.write_record(child_object.tap_stream_id, rec, time_extracted=extraction_time)
+                            write_record(child_object.tap_stream_id, rec, extraction_time)
+                            if indexed_records is not None: indexed_records.append(rec)
+                if sha:
+                    # Index the SHA only once all its records are written.
+                    sha_index.add(child_object.tap_stream_id, sha, indexed_records, repo_path, bookmark_dttm)
             elif child_object.no_path:
                 records = []
                 extraction_time = singer.utils.now()
@@ -243,24 +554,27 @@ class Stream:
                     for column, field in child_object.inherit_parent_fields:
                         record[column] = parent_record.get(field)
                     child_object.add_fields_at_1st_level(record = record, parent_record = parent_record)
-                    with singer.Transformer() as transformer:
+                    record = project(record, projection)
+                    rec = transform_record(stream_catalog, record)
 
-                        rec = transformer.transform(record, stream_catalog['schema'], metadata=metadata.to_map(stream_catalog['metadata']))
-
-                        if child_object.tap_stream_id in selected_stream_ids:
-                            singer.write_record(child_object.tap_stream_id, rec, time_extracted=extraction_time)
-                            counter.increment()
+                    if child_object.tap_stream_id in selected_stream_ids and \
+                            (not child_object.deduplicated or dedupe.should_write(child_object.tap_stream_id, child_object.key_properties, rec, repo_path, bookmark_dttm)):
+                        write_record(child_object.tap_stream_id, rec, extraction_time)
+                        counter.increment()
 
                     # Loop thru each child and nested child in the parent and fetch all the child records.
                     for nested_child in child_object.children:
                         if nested_child in stream_to_sync:
                             # Collect id of child record to pass in the API of its sub-child.
-                            child_id = tuple(record.get(key) for key in STREAMS[nested_child]().id_keys)
-                            if STREAMS[nested_child]().id_keys and not all(child_id): continue
+                            child_id = graph[nested_child].get_id(record)
+                            if graph[nested_child].id_keys and not all(child_id): continue
                             # Here, grand_parent_id is the id of 1st level parent(main parent) which is required to
                             # pass in the API of the current child's sub-child.
                             child_object.get_child_records(client, catalog, nested_child, child_id, repo_path, state, start_date, bookmark_dttm, stream_to_sync, selected_stream_ids, grand_parent_id, record)
 
+        if fingerprint:
+            write_child_fingerprint(state, repo_path, parent_key, child_stream, fingerprint, bookmark_dttm)
+
     # pylint: disable=unnecessary-pass
     def add_fields_at_1st_level(self, record, parent_record = None):
         """
@@ -296,11 +610,19 @@ class FullTableStream(Stream):
         # build full url
         full_url = self.build_url(client.base_url, repo_path, None)
 
+        # Resume from the page where an interrupted sync of the stream stopped.
+        cursor = get_page_cursor(state, repo_path, self.tap_stream_id, float(config.get('page_cursor_max_age', PAGE_CURSOR_MAX_AGE)))
+        page_url = get_resume_url(cursor, full_url) or full_url
+
         stream_catalog = get_schema(catalog, self.tap_stream_id)
+        graph = get_stream_graph(catalog, selected_stream_ids)
+
+        projection = get_transform_plan(stream_catalog).get_projection(graph[self.tap_stream_id].required_fields)
+
         with metrics.record_counter(self.tap_stream_id) as counter:
             for response in client.authed_get_all_pages(
                     self.tap_stream_id,
-                    full_url,
+                    page_url,
                     self.headers,
                     stream = self.tap_stream_id
             ):
@@ -312,20 +634,20 @@ class FullTableStream(Stream):
 
                     record['_sdc_repository'] = repo_path
                     self.add_fields_at_1st_level(record = record, parent_record = None)
+                    record = project(record, projection)
 
-                    with singer.Transformer() as transformer:
-                        rec = transformer.transform(record, stream_catalog['schema'], metadata=metadata.to_map(stream_catalog['metadata']))
-                        if self.tap_stream_id in selected_stream_ids:
+                    rec = transform_record(stream_catalog, record)
+                    if self.tap_stream_id in selected_stream_ids:
 
-                            singer.write_record(self.tap_stream_id, rec, time_extracted=extraction_time)
+                        write_record(self.tap_stream_id, rec, extraction_time)
 
-                            counter.increment()
+                        counter.increment()
 
                     for child in self.children:
                         if child in stream_to_sync:
 
-                            parent_id = tuple(record.get(key) for key in STREAMS[child]().id_keys)
-                            if STREAMS[child]().id_keys and not all(parent_id):
+                            parent_id = graph[child].get_id(record)
+                            if graph[child].id_keys and not all(parent_id):
                                 pass
                             else:
                                 # Sync child stream, if it is selected or its nested child is selected.
@@ -340,6 +662,13 @@ class FullTableStream(Stream):
                                                     stream_to_sync,
                                                     selected_stream_ids,
                                                     parent_record = record)
+
+                if 'next' in response.links:
+                    # Save the next page at the page boundary, all the records of this page are written.
+                    write_page_cursor(state, repo_path, self.tap_stream_id, full_url, response.links['next']['url'], None, {})
+                    checkpoint.write_state(state)
+
+        clear_page_cursor(state, repo_path, self.tap_stream_id)
         return state
 
 class IncrementalStream(Stream):
@@ -357,7 +686,8 @@ class IncrementalStream(Stream):
         """
         A common function sync incremental streams. Sync an incremental stream for which records are not
         in descending order. For, incremental streams iterate all records, write only newly updated records and
-        write the latest bookmark value.
+        write the latest bookmark value. The pages of a stream declared in descending order stop after the page
+        reaching the bookmark, unless its records were found out of order.
         """
 
         parent_bookmark_value = get_bookmark(state, repo_path, self.tap_stream_id, "since", start_date)
@@ -370,14 +700,15 @@ class IncrementalStream(Stream):
         full_url = self.build_url(client.base_url, repo_path, min_bookmark_value)
 
         stream_catalog = get_schema(catalog, self.tap_stream_id)
+        graph = get_stream_graph(catalog, selected_stream_ids)
+
+        projection = get_transform_plan(stream_catalog).get_projection(graph[self.tap_stream_id].required_fields)
+        bookmark_time = BookmarkTime(min_bookmark_value)
+        record_order = RecordOrder(self.tap_stream_id, self.replication_keys, self.sort_direction)
+        reached_bookmark = False
 
         with metrics.record_counter(self.tap_stream_id) as counter:
-            for response in client.authed_get_all_pages(
-                    self.tap_stream_id,
-                    full_url,
-                    self.headers,
-                    stream = self.tap_stream_id
-            ):
+            for response in self.get_pages(client, full_url):
                 records = response.json()
                 if self.result_path: records = records.get(self.result_path,[])
                 extraction_time = singer.utils.now()
@@ -385,52 +716,67 @@ class IncrementalStream(Stream):
                 for record in records:
                     record['_sdc_repository'] = repo_path
                     self.add_fields_at_1st_level(record = record, parent_record = None)
+                    record = project(record, projection)
 
-                    with singer.Transformer() as transformer:
-                        if record.get(self.replication_keys):
-                            if record[self.replication_keys] >= max_bookmark_value:
-                                # Update max_bookmark_value
-                                max_bookmark_value = record[self.replication_keys]
-
-                            bookmark_dttm = record[self.replication_keys]
-
-                            # Keep only records whose bookmark is after the last_datetime
-                            if bookmark_dttm >= min_bookmark_value:
-                                if self.tap_stream_id in selected_stream_ids and bookmark_dttm >= parent_bookmark_value:
-                                    rec = transformer.transform(record, stream_catalog['schema'], metadata=metadata.to_map(stream_catalog['metadata']))
-
-                                    singer.write_record(self.tap_stream_id, rec, time_extracted=extraction_time)
-                                    counter.increment()
-
-                                for child in self.children:
-                                    if child in stream_to_sync:
-
-                                        parent_id = tuple(record.get(key) for key in STREAMS[child]().id_keys)
-                                        if STREAMS[child]().id_keys and not all(parent_id):
-                                            pass
-                                        else:
-                                            # Sync child stream, if it is selected or its nested child is selected.
-                                            self.get_child_records(client,
-                                                                catalog,
-                                                                child,
-                                                                parent_id,
-                                                                repo_path,
-                                                                state,
-                                                                start_date,
-                                                                record.get(self.replication_keys),
-                                                                stream_to_sync,
-                                                                selected_stream_ids,
-                                                                parent_record = record)
-                        else:
-                            LOGGER.warning("Skipping this record for %s stream with %s = %s as it is missing replication key %s.",
-                                        self.tap_stream_id, self.key_properties, record[self.key_properties], self.replication_keys)
+                    if record.get(self.replication_keys):
+                        record_order.check(record[self.replication_keys])
+                        reached_bookmark = reached_bookmark or bookmark_time.is_after(record[self.replication_keys])
+                        if record[self.replication_keys] >= max_bookmark_value:
+                            # Update max_bookmark_value
+                            max_bookmark_value = record[self.replication_keys]
+
+                        bookmark_dttm = record[self.replication_keys]
+
+                        # Keep only records whose bookmark is after the last_datetime
+                        if bookmark_dttm >= min_bookmark_value:
+                            if self.tap_stream_id in selected_stream_ids and bookmark_dttm >= parent_bookmark_value:
+                                rec = transform_record(stream_catalog, record)
+
+                                write_record(self.tap_stream_id, rec, extraction_time)
+                                counter.increment()
+
+                            for child in self.children:
+                                if child in stream_to_sync:
+
+                                    parent_id = graph[child].get_id(record)
+                                    if graph[child].id_keys and not all(parent_id):
+                                        pass
+                                    else:
+                                        # Sync child stream, if it is selected or its nested child is selected.
+                                        self.get_child_records(client,
+                                                            catalog,
+                                                            child,
+                                                            parent_id,
+                                                            repo_path,
+                                                            state,
+                                                            start_date,
+                                                            record.get(self.replication_keys),
+                                                            stream_to_sync,
+                                                            selected_stream_ids,
+                                                            parent_record = record)
+                    else:
+                        LOGGER.warning("Skipping this record for %s stream with %s = %s as it is missing replication key %s.",
+                                    self.tap_stream_id, self.key_properties, record[self.key_properties], self.replication_keys)
+
+                if self.sort_direction == 'desc' and reached_bookmark and record_order.in_order:
+                    # The next pages only have records older than the bookmark.
+                    break
 
             # Write bookmark for incremental stream.
             self.write_bookmarks(self.tap_stream_id, selected_stream_ids, max_bookmark_value, repo_path, state)
 
         return state
+
+    def get_pages(self, client, full_url):
+        """
+        Return the pages of the records from the full url.
+        """
+        return client.authed_get_all_pages(self.tap_stream_id, full_url, self.headers, stream = self.tap_stream_id)
     
 class IncrementalDateStream(Stream):
+    # Maximum number of results the API returns for a date window query, None when the results are not capped
+    result_cap = None
+
     def sync_endpoint(self,
                       client,
                       state,
@@ -454,75 +800,203 @@ class IncrementalDateStream(Stream):
 
         max_bookmark_value = min_bookmark_value
         LOGGER.info(f'Starting stream with bookmark {min_bookmark_value} and current time {current_time}')
-        for start_date, end_date in get_date_ranges(min_bookmark_value, current_time, config.get('date_range_window', DATE_RANGE_WINDOW)):
+        date_windows = DateWindows(min_bookmark_value, current_time, config.get('date_range_window', DATE_RANGE_WINDOW),
+                                   str(config.get('date_range_adaptive', False)).lower() == 'true',
+                                   int(config.get('date_range_target_records', DATE_RANGE_TARGET_RECORDS)))
+        workers = int(config.get('date_window_workers') or 1)
+        if workers > 1:
+            return self.sync_windows_concurrently(client, state, catalog, repo_path, selected_stream_ids, stream_to_sync, date_windows,
+                                                  min_bookmark_value, parent_bookmark_value, workers,
+                                                  config.get('date_window_emit_order', 'window'))
+
+        for start_date, end_date in date_windows:
             # build full url
             full_url = self.build_url(client.base_url, repo_path, {'from': start_date, 'until': end_date})
 
-            stream_catalog = get_schema(catalog, self.tap_stream_id)
-
+            record_count = 0
+            bisected = False
             with metrics.record_counter(self.tap_stream_id) as counter:
-                for response in client.authed_get_all_pages(
+                for page, response in enumerate(client.authed_get_all_pages(
                         self.tap_stream_id,
                         full_url,
                         self.headers,
                         stream = self.tap_stream_id
-                ):
+                )):
                     records = response.json()
+                    if page == 0 and self.is_capped(records) and date_windows.bisect(start_date, end_date):
+                        # The API returns only the first results of the window, sync its halves instead.
+                        LOGGER.info("Splitting the window %s..%s of %s reaching the result cap of %d.",
+                                    start_date, end_date, self.tap_stream_id, self.result_cap)
+                        bisected = True
+                        break
                     if self.result_path: records = records.get(self.result_path,[])
-                    extraction_time = singer.utils.now()
-                    # Loop through all records
-                    for record in records:
-                        record['_sdc_repository'] = repo_path
-                        self.add_fields_at_1st_level(record = record, parent_record = None)
-
-                        with singer.Transformer() as transformer:
-                            if record.get(self.replication_keys):
-                                if record[self.replication_keys] >= max_bookmark_value:
-                                    # Update max_bookmark_value
-                                    max_bookmark_value = record[self.replication_keys]
-
-                                bookmark_dttm = record[self.replication_keys]
-
-                                # Keep only records whose bookmark is after the last_datetime
-                                if bookmark_dttm >= min_bookmark_value:
-                                    if self.tap_stream_id in selected_stream_ids and bookmark_dttm >= parent_bookmark_value:
-                                        rec = transformer.transform(record, stream_catalog['schema'], metadata=metadata.to_map(stream_catalog['metadata']))
-
-                                        singer.write_record(self.tap_stream_id, rec, time_extracted=extraction_time)
-                                        counter.increment()
-
-                                    for child in self.children:
-                                        if child in stream_to_sync:
-
-                                            parent_id = tuple(record.get(key) for key in STREAMS[child]().id_keys)
-                                            if STREAMS[child]().id_keys and not all(parent_id):
-                                                pass
-                                            else:
-                                                # Sync child stream, if it is selected or its nested child is selected.
-                                                self.get_child_records(client,
-                                                                    catalog,
-                                                                    child,
-                                                                    parent_id,
-                                                                    repo_path,
-                                                                    state,
-                                                                    start_date,
-                                                                    record.get(self.replication_keys),
-                                                                    stream_to_sync,
-                                                                    selected_stream_ids,
-                                                                    parent_record = record)
-                                    # Write bookmark for incremental stream.
-                                    self.write_bookmarks(self.tap_stream_id, selected_stream_ids, max_bookmark_value, repo_path, state)
-                            else:
-                                LOGGER.warning("Skipping this record for %s stream with %s = %s as it is missing replication key %s.",
-                                            self.tap_stream_id, self.key_properties, record[self.key_properties], self.replication_keys)
+                    record_count += len(records)
+                    max_bookmark_value = self.sync_window_records(client, state, catalog, repo_path, start_date, selected_stream_ids,
+                                                                  stream_to_sync, records, min_bookmark_value, parent_bookmark_value,
+                                                                  max_bookmark_value, counter)
+                if bisected:
+                    continue
+                date_windows.update(record_count)
                 if max_bookmark_value < start_date: max_bookmark_value = start_date
                 # Write bookmark for incremental stream.
                 self.write_bookmarks(self.tap_stream_id, selected_stream_ids, max_bookmark_value, repo_path, state)
-                singer.write_state(state) 
+                checkpoint.write_state(state)
 
         return state
 
+    def sync_window_records(self, client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync,
+                            records, min_bookmark_value, parent_bookmark_value, max_bookmark_value, counter, write_bookmarks = True):
+        """
+        Write the records of a date window with their children and return the maximum bookmark value.
+        The bookmarks are written after each record only when the windows are synced in order.
+        """
+        stream_catalog = get_schema(catalog, self.tap_stream_id)
+        graph = get_stream_graph(catalog, selected_stream_ids)
+        projection = get_transform_plan(stream_catalog).get_projection(graph[self.tap_stream_id].required_fields)
+        extraction_time = singer.utils.now()
+        # Loop through all records
+        for record in records:
+            record['_sdc_repository'] = repo_path
+            self.add_fields_at_1st_level(record = record, parent_record = None)
+            record = project(record, projection)
+
+            if record.get(self.replication_keys):
+                if record[self.replication_keys] >= max_bookmark_value:
+                    # Update max_bookmark_value
+                    max_bookmark_value = record[self.replication_keys]
+
+                bookmark_dttm = record[self.replication_keys]
+
+                # Keep only records whose bookmark is after the last_datetime
+                if bookmark_dttm >= min_bookmark_value:
+                    if self.tap_stream_id in selected_stream_ids and bookmark_dttm >= parent_bookmark_value:
+                        rec = transform_record(stream_catalog, record)
+
+                        write_record(self.tap_stream_id, rec, extraction_time)
+                        counter.increment()
+
+                    for child in self.children:
+                        if child in stream_to_sync:
+
+                            parent_id = graph[child].get_id(record)
+                            if graph[child].id_keys and not all(parent_id):
+                                pass
+                            else:
+                                # Sync child stream, if it is selected or its nested child is selected.
+                                self.get_child_records(client,
+                                                    catalog,
+                                                    child,
+                                                    parent_id,
+                                                    repo_path,
+                                                    state,
+                                                    start_date,
+                                                    record.get(self.replication_keys),
+                                                    stream_to_sync,
+                                                    selected_stream_ids,
+                                                    parent_record = record)
+                    if write_bookmarks:
+                        # Write bookmark for incremental stream.
+                        self.write_bookmarks(self.tap_stream_id, selected_stream_ids, max_bookmark_value, repo_path, state)
+            else:
+                LOGGER.warning("Skipping this record for %s stream with %s = %s as it is missing replication key %s.",
+                            self.tap_stream_id, self.key_properties, record[self.key_properties], self.replication_keys)
+        return max_bookmark_value
+
+    def fetch_window(self, client, repo_path, start_date, end_date, can_split):
+        """
+        Fetch all the records of a date window, return None when the window reaches the result cap and can be split.
+        """
+        full_url = self.build_url(client.base_url, repo_path, {'from': start_date, 'until': end_date})
+        window_records = []
+        for page, response in enumerate(client.authed_get_all_pages(self.tap_stream_id, full_url, self.headers, stream = self.tap_stream_id)):
+            records = response.json()
+            if page == 0 and can_split and self.is_capped(records):
+                return None
+            if self.result_path: records = records.get(self.result_path,[])
+            window_records.extend(records)
+        return window_records
+
+    def sync_windows_concurrently(self, client, state, catalog, repo_path, selected_stream_ids, stream_to_sync, date_windows,
+                                  min_bookmark_value, parent_bookmark_value, workers, emit_order):
+        """
+        Fetch the date windows in worker threads and write their records in the main thread, in the order of the windows
+        or as the windows complete with the `completion` emit order. The bookmark only advances over the longest prefix
+        of completed windows, so an interrupted sync resumes from the first window that is not completed.
+        """
+        max_bookmark_value = min_bookmark_value
+        # Windows fetched or being fetched and not committed yet, in the order of their start
+        windows = []
+        # Records of the completed windows in the window order, the maximum bookmark value of the others
+        completed = {}
+        futures = {}
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=workers) as executor, metrics.record_counter(self.tap_stream_id) as counter:
+            while True:
+                # Bound the completed windows waiting for an earlier window.
+                while not exhausted and len(futures) < workers and len(windows) < 2 * workers:
+                    window = next(date_windows, None)
+                    if window is None:
+                        exhausted = True
+                        break
+                    bisect.insort(windows, window)
+                    futures[executor.submit(self.fetch_window, client, repo_path, *window, date_windows.can_bisect(*window))] = window
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                error = None
+                for future in sorted(done, key=futures.get):
+                    window = futures.pop(future)
+                    if future.exception():
+                        # Commit the windows completed before the failed one first.
+                        error = error or future.exception()
+                        continue
+                    records = future.result()
+                    if records is None:
+                        LOGGER.info("Splitting the window %s..%s of %s reaching the result cap of %d.",
+                                    window[0], window[1], self.tap_stream_id, self.result_cap)
+                        windows.remove(window)
+                        date_windows.bisect(*window)
+                        # Queue the halves at once, so that the later windows are not committed before them.
+                        for half in (next(date_windows), next(date_windows)):
+                            bisect.insort(windows, half)
+                            futures[executor.submit(self.fetch_window, client, repo_path, *half, date_windows.can_bisect(*half))] = half
+                        continue
+                    date_windows.update(len(records))
+                    if emit_order == 'completion':
+                        records = self.sync_window_records(client, state, catalog, repo_path, window[0], selected_stream_ids, stream_to_sync,
+                                                           records, min_bookmark_value, parent_bookmark_value, window[0], counter,
+                                                           write_bookmarks = False)
+                    completed[window] = records
+
+                # Commit the longest prefix of completed windows.
+                while windows and windows[0] in completed:
+                    window = windows.pop(0)
+                    window_result = completed.pop(window)
+                    if emit_order == 'completion':
+                        max_bookmark_value = max(max_bookmark_value, window_result)
+                    else:
+                        max_bookmark_value = self.sync_window_records(client, state, catalog, repo_path, window[0], selected_stream_ids,
+                                                                      stream_to_sync, window_result, min_bookmark_value,
+                                                                      parent_bookmark_value, max_bookmark_value, counter)
+                    if max_bookmark_value < window[0]: max_bookmark_value = window[0]
+                    # Write bookmark for incremental stream.
+                    self.write_bookmarks(self.tap_stream_id, selected_stream_ids, max_bookmark_value, repo_path, state)
+                    checkpoint.write_state(state)
+                if error:
+                    raise error
+
+        return state
+
+    def is_capped(self, response_json):
+        """
+        Check whether the response of a window reports at least as many results as the API returns for a query.
+        """
+        return bool(self.result_cap) and isinstance(response_json, dict) and response_json.get('total_count', 0) >= self.result_cap
+
 class IncrementalOrderedStream(Stream):
+    # The ordered streams are listed the most recently updated first unless they request `direction=asc`
+    sort_direction = 'desc'
 
     def sync_endpoint(self,
                       client,
@@ -535,26 +1009,48 @@ class IncrementalOrderedStream(Stream):
                       config,
                       ):
         """
-        A sync function for streams that have records in the descending order of replication key value. For such streams,
-        iterate only the latest records.
+        A sync function for streams that have records in the order of replication key value. For such streams,
+        iterate only the latest records. A descending stream stops at the first record updated before the bookmark,
+        an ascending stream is listed from its bookmark with `since` and moves the bookmark to the last record seen
+        after each page, so an interrupted sync resumes from it. Once the records are found out of the declared order,
+        all the pages are read. The bookmarks of the children only move at the end, as the children of the next
+        records may have been updated before the records already seen.
         """
+        # An ascending stream resumes from its bookmark rather than from a saved page whose records may have moved.
+        resume_from_since = self.sort_direction == 'asc' and bool(self.since_filter_param)
+        # The bookmarks of an interrupted sync are restored before they are read.
+        cursor = None if resume_from_since else \
+            get_page_cursor(state, repo_path, self.tap_stream_id, float(config.get('page_cursor_max_age', PAGE_CURSOR_MAX_AGE)))
+        stream_bookmarks = get_stream_bookmarks(state, repo_path, [self.tap_stream_id] + self.get_descendants())
+
         bookmark_value = get_bookmark(state, repo_path, self.tap_stream_id, "since", start_date)
         current_time = datetime.today().strftime(DATE_FORMAT)
 
         min_bookmark_value = self.get_min_bookmark(self.tap_stream_id, selected_stream_ids, current_time, repo_path, start_date, state)
-        bookmark_time = singer.utils.strptime_to_utc(min_bookmark_value)
+        bookmark_time = BookmarkTime(min_bookmark_value)
 
         # Build full url
         full_url = self.build_url(client.base_url, repo_path, bookmark_value)
         synced_all_records = False
         stream_catalog = get_schema(catalog, self.tap_stream_id)
+        graph = get_stream_graph(catalog, selected_stream_ids)
+        projection = get_transform_plan(stream_catalog).get_projection(graph[self.tap_stream_id].required_fields)
 
         parent_bookmark_value = bookmark_value
-        record_counter = 0
+        record_order = RecordOrder(self.tap_stream_id, self.replication_keys, self.sort_direction)
+
+        # Resume from the page where an interrupted sync of the stream stopped.
+        page_url = get_resume_url(cursor, full_url)
+        if page_url:
+            # Keep the bookmark computed from the records of the interrupted sync.
+            bookmark_value = cursor['bookmark']
+        else:
+            page_url = full_url
+
         with metrics.record_counter(self.tap_stream_id) as counter:
             for response in client.authed_get_all_pages(
                     self.tap_stream_id,
-                    full_url,
+                    page_url,
                     stream = self.tap_stream_id
             ):
                 records = response.json()
@@ -563,34 +1059,34 @@ class IncrementalOrderedStream(Stream):
                 for record in records:
                     record['_sdc_repository'] = repo_path
                     self.add_fields_at_1st_level(record = record, parent_record = None)
+                    record = project(record, projection)
 
                     updated_at = record.get(self.replication_keys)
 
-                    if record_counter == 0 and updated_at > bookmark_value:
-                        # Consider replication key value of 1st record as bookmark value.
-                        # Because all records are in descending order of replication key value
-                        bookmark_value = updated_at
-                    record_counter = record_counter + 1
-
                     if updated_at:
-                        if bookmark_time and singer.utils.strptime_to_utc(updated_at) < bookmark_time:
-                            # Skip all records from now onwards because the bookmark value of the current record is less than
-                            # last saved bookmark value and all records from now onwards will have bookmark value less than last
-                            # saved bookmark value.
-                            synced_all_records = True
-                            break
+                        record_order.check(updated_at)
+                        # The first record of a descending stream and the last record of an ascending one hold the bookmark.
+                        bookmark_value = max(bookmark_value, updated_at)
+
+                        if bookmark_time.is_after(updated_at):
+                            if self.sort_direction == 'desc' and record_order.in_order:
+                                # Skip all records from now onwards because the bookmark value of the current record is less than
+                                # last saved bookmark value and all records from now onwards will have bookmark value less than last
+                                # saved bookmark value.
+                                synced_all_records = True
+                                break
+                            continue
 
                         if self.tap_stream_id in selected_stream_ids and updated_at >= parent_bookmark_value:
 
                             # Transform and write record
-                            with singer.Transformer() as transformer:
-                                rec = transformer.transform(record, stream_catalog['schema'], metadata=metadata.to_map(stream_catalog['metadata']))
-                                singer.write_record(self.tap_stream_id, rec, time_extracted=extraction_time)
-                                counter.increment()
+                            rec = transform_record(stream_catalog, record)
+                            write_record(self.tap_stream_id, rec, extraction_time)
+                            counter.increment()
 
                         for child in self.children:
                             if child in stream_to_sync:
-                                parent_id = tuple(record.get(key) for key in STREAMS[child]().id_keys)
+                                parent_id = graph[child].get_id(record)
                                 LOGGER.info(f"Syncing child {child}")
 
                                 # Sync child stream, if it is selected or its nested child is selected.
@@ -605,8 +1101,6 @@ class IncrementalOrderedStream(Stream):
                                                     stream_to_sync,
                                                     selected_stream_ids,
                                                     parent_record = record)
-                        # Write bookmark for incremental stream.
-                        self.write_bookmarks(self.tap_stream_id, selected_stream_ids, bookmark_value, repo_path, state)
                     else:
                         LOGGER.warning("Skipping this record for %s stream with %s = %s as it is missing replication key %s.",
                                     self.tap_stream_id, self.key_properties, record[self.key_properties], self.replication_keys)
@@ -614,9 +1108,20 @@ class IncrementalOrderedStream(Stream):
                 if synced_all_records:
                     break
 
+                if 'next' in response.links:
+                    if not resume_from_since:
+                        # Save the next page at the page boundary, all the records of this page are written.
+                        write_page_cursor(state, repo_path, self.tap_stream_id, full_url, response.links['next']['url'], bookmark_value, stream_bookmarks)
+                    elif record_order.in_order and self.tap_stream_id in selected_stream_ids:
+                        # All the records up to the last one seen are written, the children keep the bookmark they started with.
+                        singer.write_bookmark(state, repo_path, self.tap_stream_id, {"since": bookmark_value})
+                    checkpoint.write_state(state)
+
             # Write bookmark for incremental stream.
             self.write_bookmarks(self.tap_stream_id, selected_stream_ids, bookmark_value, repo_path, state)
 
+        prune_child_fingerprints(state, repo_path, min_bookmark_value)
+        clear_page_cursor(state, repo_path, self.tap_stream_id)
         return state
 
 class Reviews(IncrementalStream):
@@ -632,6 +1137,7 @@ class Reviews(IncrementalStream):
     use_repository = True
     id_keys = ['number']
     parent = 'pull_requests'
+    parent_fields = ['id']
 
     def add_fields_at_1st_level(self, record, parent_record = None):
         """
@@ -647,11 +1153,13 @@ class ReviewComments(IncrementalOrderedStream):
     replication_method = "INCREMENTAL"
     replication_keys = "updated_at"
     key_properties = ["id"]
-    additional_filters = f"sort=updated_at&direction=asc&per_page{PER_PAGE_NUMBER}"
+    since_filter_param = f"&sort=updated&direction=asc&per_page={PER_PAGE_NUMBER}"
     path = "pulls/{}/comments"
+    sort_direction = 'asc'
     use_repository = True
     id_keys = ['number']
     parent = 'pull_requests'
+    parent_fields = ['id']
 
     def add_fields_at_1st_level(self, record, parent_record = None):
         """
@@ -672,6 +1180,9 @@ class PRCommits(IncrementalStream):
     use_repository = True
     id_keys = ['number']
     parent = 'pull_requests'
+    parent_fields = ['number', 'id']
+    # A push or a force push moves the head of the pull request.
+    fingerprint_fields = [['head', 'sha'], ['commits']]
 
     def add_fields_at_1st_level(self, record, parent_record = None):
         """
@@ -691,12 +1202,182 @@ class PullRequests(IncrementalOrderedStream):
     replication_method = "INCREMENTAL"
     replication_keys = "updated_at"
     key_properties = ["id"]
-    additional_filters = f"state=all&sort=updated&direction=asc&per_page{PER_PAGE_NUMBER}"
+    additional_filters = f"state=all&sort=updated&direction=desc&per_page{PER_PAGE_NUMBER}"
     path = "pulls"
     children = ['reviews', 'review_comments', 'pr_commits']
     has_children = True
     pk_child_fields = ["number"]
 
+    def sync_endpoint(self,
+                      client,
+                      state,
+                      catalog,
+                      repo_path,
+                      start_date,
+                      selected_stream_ids,
+                      stream_to_sync,
+                      config,
+                      ):
+        """
+        Sync the pull requests and their children from the GraphQL API with the `pull_requests_backend` `graphql`,
+        otherwise from the REST API.
+        """
+        # Only the pull requests of the repository being synced are indexed for its review comments.
+        PULL_REQUEST_IDS.clear()
+        if config.get('pull_requests_backend', 'rest') != 'graphql':
+            return super().sync_endpoint(client = client, state = state, catalog = catalog, repo_path = repo_path, start_date = start_date,
+                                         selected_stream_ids = selected_stream_ids, stream_to_sync = stream_to_sync, config = config)
+
+        cursor = get_page_cursor(state, repo_path, self.tap_stream_id, float(config.get('page_cursor_max_age', PAGE_CURSOR_MAX_AGE)))
+        stream_bookmarks = get_stream_bookmarks(state, repo_path, [self.tap_stream_id] + self.get_descendants())
+
+        bookmark_value = get_bookmark(state, repo_path, self.tap_stream_id, "since", start_date)
+        parent_bookmark_value = bookmark_value
+        current_time = datetime.today().strftime(DATE_FORMAT)
+        min_bookmark_value = self.get_min_bookmark(self.tap_stream_id, selected_stream_ids, current_time, repo_path, start_date, state)
+        bookmark_time = BookmarkTime(min_bookmark_value)
+
+        stream_catalog = get_schema(catalog, self.tap_stream_id)
+        graph = get_stream_graph(catalog, selected_stream_ids)
+        projection = get_transform_plan(stream_catalog).get_projection(graph[self.tap_stream_id].required_fields)
+        children = [child for child in self.children if child in stream_to_sync]
+        query = PullRequestQuery(client, repo_path, children, int(config.get('graphql_page_size') or DEFAULT_GRAPHQL_PAGE_SIZE))
+
+        # The pages are listed the most recently updated first, the cursor of the next page is saved as its url.
+        start_url = '{}?repository={}&orderBy=UPDATED_AT'.format(client.graphql_url, repo_path)
+        page_cursor = get_resume_url(cursor, start_url)
+        if page_cursor:
+            bookmark_value = cursor['bookmark']
+
+        with metrics.record_counter(self.tap_stream_id) as counter:
+            for pull_requests, next_cursor in query.get_pages(page_cursor):
+                extraction_time = singer.utils.now()
+                synced_all_records = False
+                for record, child_records in pull_requests:
+                    record['_sdc_repository'] = repo_path
+                    self.add_fields_at_1st_level(record = record, parent_record = None)
+                    record = project(record, projection)
+
+                    updated_at = record.get(self.replication_keys)
+                    if bookmark_time.is_after(updated_at):
+                        # The next pull requests were all updated before the bookmark.
+                        synced_all_records = True
+                        break
+                    bookmark_value = max(bookmark_value, updated_at)
+
+                    if self.tap_stream_id in selected_stream_ids and updated_at >= parent_bookmark_value:
+                        write_record(self.tap_stream_id, transform_record(stream_catalog, record), extraction_time)
+                        counter.increment()
+
+                    for child in children:
+                        self.write_nested_records(catalog, child, repo_path, state, start_date, selected_stream_ids, record, child_records[child])
+
+                if synced_all_records:
+                    break
+                if next_cursor:
+                    write_page_cursor(state, repo_path, self.tap_stream_id, start_url, next_cursor, bookmark_value, stream_bookmarks)
+                    checkpoint.write_state(state)
+
+            # The bookmark only moves once all the pull requests updated since the previous one are written.
+            self.write_bookmarks(self.tap_stream_id, selected_stream_ids, bookmark_value, repo_path, state)
+
+        clear_page_cursor(state, repo_path, self.tap_stream_id)
+        return state
+
+    def write_nested_records(self, catalog, child_stream, repo_path, state, start_date, selected_stream_ids, parent_record, records):
+        """
+        Write the records of a child stream read from the connections nested in a pull request of the GraphQL API.
+        """
+        if child_stream not in selected_stream_ids:
+            return
+        graph = get_stream_graph(catalog, selected_stream_ids)
+        child_object = graph[child_stream].stream
+        child_bookmark_value = get_bookmark(state, repo_path, child_stream, "since", start_date)
+        stream_catalog = get_schema(catalog, child_stream)
+        projection = get_transform_plan(stream_catalog).get_projection(graph[child_stream].required_fields)
+        extraction_time = singer.utils.now()
+        with metrics.record_counter(child_stream) as counter:
+            for record in records:
+                record['_sdc_repository'] = repo_path
+                for column, field in child_object.inherit_parent_fields:
+                    record[column] = parent_record.get(field)
+                child_object.add_fields_at_1st_level(record = record, parent_record = parent_record)
+                record = project(record, projection)
+                if (record.get(child_object.replication_keys) or start_date) >= child_bookmark_value:
+                    write_record(child_stream, transform_record(stream_catalog, record), extraction_time)
+                    counter.increment()
+
+    def add_fields_at_1st_level(self, record, parent_record = None):
+        """
+        Index the id of the pull request by its number for the review comments of the repository.
+        """
+        if not record: return
+        PULL_REQUEST_IDS[(record.get('_sdc_repository'), record.get('number'))] = record.get('id')
+
+class RepositoryReviewComments(ReviewComments):
+    '''
+    https://docs.github.com/en/rest/pulls/comments#list-review-comments-in-a-repository
+    The review comments of all the pull requests, synced as a top level stream with the `review_comments_mode` `repository`.
+    '''
+    path = "pulls/comments"
+    parent = None
+    id_keys = []
+    additional_filters = ""
+    since_filter_param = f"&sort=updated&direction=asc&per_page={PER_PAGE_NUMBER}"
+
+    def sync_endpoint(self,
+                      client,
+                      state,
+                      catalog,
+                      repo_path,
+                      start_date,
+                      selected_stream_ids,
+                      stream_to_sync,
+                      config,
+                      ):
+        """
+        Keep the client to look up the ids of the pull requests missing from the index, and drop the index of the repository
+        once its review comments are synced.
+        """
+        self.client = client
+        self.listed_pull_requests = False
+        try:
+            return super().sync_endpoint(client = client, state = state, catalog = catalog, repo_path = repo_path, start_date = start_date,
+                                         selected_stream_ids = selected_stream_ids, stream_to_sync = stream_to_sync, config = config)
+        finally:
+            PULL_REQUEST_IDS.clear()
+
+    def list_pull_requests(self, repo_path):
+        """
+        Index the ids of all the pull requests of the repository from their listing.
+        """
+        url = '{}/repos/{}/pulls?state=all&per_page={}'.format(self.client.base_url, repo_path, PER_PAGE_NUMBER)
+        for response in self.client.authed_get_all_pages(self.tap_stream_id, url, stream = self.tap_stream_id):
+            for pull_request in response.json():
+                PULL_REQUEST_IDS[(repo_path, pull_request.get('number'))] = pull_request.get('id')
+        self.listed_pull_requests = True
+
+    def get_pull_request_id(self, repo_path, pull_request_url):
+        """
+        Return the id of the pull request of a comment from the index. The pull requests not synced in the run are listed
+        once, and a pull request opened since the listing is requested on its own.
+        """
+        number = int(pull_request_url.rstrip('/').rsplit('/', 1)[-1])
+        if (repo_path, number) not in PULL_REQUEST_IDS and not self.listed_pull_requests:
+            self.list_pull_requests(repo_path)
+        if (repo_path, number) not in PULL_REQUEST_IDS:
+            response = self.client.authed_get(self.tap_stream_id, '{}/repos/{}/pulls/{}'.format(self.client.base_url, repo_path, number))
+            PULL_REQUEST_IDS[(repo_path, number)] = response.json().get('id') if response is not None else None
+        return PULL_REQUEST_IDS[(repo_path, number)]
+
+    def add_fields_at_1st_level(self, record, parent_record = None):
+        """
+        Add fields in the record explicitly at the 1st level of JSON.
+        """
+        if not record: return
+        if record.get('pull_request_url'):
+            record['pr_id'] = self.get_pull_request_id(record['_sdc_repository'], record['pull_request_url'])
+
 class ProjectCards(IncrementalStream):
     '''
     https://docs.github.com/en/rest/reference/projects#list-project-cards
@@ -751,6 +1432,7 @@ class TeamMemberships(FullTableStream):
     path = "orgs/{}/teams/{}/memberships/{}"
     use_organization = True
     parent = 'team_members'
+    parent_fields = ['login']
     id_keys = ["login"]
 
     def add_fields_at_1st_level(self, record, parent_record = None):
@@ -773,6 +1455,7 @@ class TeamMembers(FullTableStream):
     children= ["team_memberships"]
     has_children = True
     parent = 'teams'
+    parent_fields = ['slug']
     pk_child_fields = ['login']
 
 
@@ -809,6 +1492,68 @@ class Commits(IncrementalDateStream):
     has_children = True
     since_filter_param_custom = "since={from}&until={until}&per_page=30"
 
+    def sync_endpoint(self,
+                      client,
+                      state,
+                      catalog,
+                      repo_path,
+                      start_date,
+                      selected_stream_ids,
+                      stream_to_sync,
+                      config,
+                      ):
+        """
+        Sync the commits from a git mirror of the repository when a `cache_dir` is configured, otherwise from the API.
+        """
+        if not config.get('cache_dir'):
+            return super().sync_endpoint(client, state, catalog, repo_path, start_date, selected_stream_ids, stream_to_sync, config)
+
+        parent_bookmark_value = get_bookmark(state, repo_path, self.tap_stream_id, "since", start_date)
+        current_time = datetime.today().strftime(DATE_FORMAT)
+        min_bookmark_value = self.get_min_bookmark(self.tap_stream_id, selected_stream_ids, current_time, repo_path, start_date, state)
+        max_bookmark_value = min_bookmark_value
+
+        mirror = GitMirror(config['cache_dir'], repo_path, client.base_url, config.get('git_clone_url'), config.get('access_token'))
+        mirror.update()
+        LOGGER.info("Starting stream from the git mirror with bookmark %s", min_bookmark_value)
+        # The files are written from the mirror, the other children of the API are still requested. The emails need the
+        # GitHub accounts of the commit, which are not in the mirror.
+        if "commit_users_emails" in selected_stream_ids:
+            LOGGER.warning("Skipping commit_users_emails of %s, the GitHub accounts of the commits are not in the git mirror.", repo_path)
+        api_children = [child for child in stream_to_sync if child not in ("commit_files", "commit_users_emails")]
+        with metrics.record_counter(self.tap_stream_id) as counter:
+            for record, files in mirror.get_commits(min_bookmark_value):
+                max_bookmark_value = self.sync_window_records(client, state, catalog, repo_path, start_date, selected_stream_ids,
+                                                              api_children, [record], min_bookmark_value, parent_bookmark_value,
+                                                              max_bookmark_value, counter)
+                if "commit_files" in stream_to_sync and (record.get(self.replication_keys) or '') >= min_bookmark_value:
+                    self.write_mirror_files(catalog, repo_path, selected_stream_ids, record, files)
+                checkpoint.write_state(state)
+
+        self.write_bookmarks(self.tap_stream_id, selected_stream_ids, max_bookmark_value, repo_path, state)
+        checkpoint.write_state(state)
+        return state
+
+    def write_mirror_files(self, catalog, repo_path, selected_stream_ids, record, files):
+        """
+        Write the files of a commit read from the git mirror as the records of `commit_files`.
+        """
+        if "commit_files" not in selected_stream_ids:
+            return
+        graph = get_stream_graph(catalog, selected_stream_ids)
+        child_object = graph["commit_files"].stream
+        stream_catalog = get_schema(catalog, child_object.tap_stream_id)
+        projection = get_transform_plan(stream_catalog).get_projection(graph["commit_files"].required_fields)
+        extraction_time = singer.utils.now()
+        with metrics.record_counter(child_object.tap_stream_id) as counter:
+            for file in files:
+                file['_sdc_repository'] = repo_path
+                for column, field in child_object.inherit_parent_fields:
+                    file[column] = record.get(field)
+                file = project(file, projection)
+                write_record(child_object.tap_stream_id, transform_record(stream_catalog, file), extraction_time)
+                counter.increment()
+
     def add_fields_at_1st_level(self, record, parent_record = None):
         """
         Add fields in the record explicitly at the 1st level of JSON.
@@ -837,6 +1582,8 @@ class CommitFiles(IncrementalStream):
     inherit_parent_fields = [("commit_sha","sha"), ("_sdc_repository","_sdc_repository")]
     parent = 'commits'
     result_path = "files"
+    sha_indexed = True
+    repository_url_fields = ['blob_url', 'raw_url', 'contents_url']
 
 class CommitParents(FullTableStream):
     '''
@@ -883,6 +1630,8 @@ class UserEmail(IncrementalStream):
     no_path = True
     inherit_parent_fields = [("email","author_email"),("id","author_id"),("name","author_name"),("username","author_login")]    
     parent = 'commits'
+    # Each commit repeats the attributes of its author.
+    deduplicated = True
 
 class Comments(IncrementalOrderedStream):
     '''
@@ -894,6 +1643,7 @@ class Comments(IncrementalOrderedStream):
     key_properties = ["id"]
     since_filter_param = f"&sort=updated&direction=asc&per_page={PER_PAGE_NUMBER}"
     path = "issues/comments"
+    sort_direction = 'asc'
 
 class Issues(IncrementalOrderedStream):
     '''
@@ -905,9 +1655,62 @@ class Issues(IncrementalOrderedStream):
     key_properties = ["id"]
     since_filter_param = f"&state=all&sort=updated&direction=asc&per_page={PER_PAGE_NUMBER}"
     path = "issues"
+    sort_direction = 'asc'
     children = ["issue_assignees","issue_labels"]
     has_children = True
 
+    def sync_endpoint(self,
+                      client,
+                      state,
+                      catalog,
+                      repo_path,
+                      start_date,
+                      selected_stream_ids,
+                      stream_to_sync,
+                      config,
+                      ):
+        """
+        Sync the issues and their labels and assignees from the GraphQL API with the `issues_backend` `graphql`,
+        otherwise from the REST API, which also lists the pull requests.
+        """
+        if config.get('issues_backend', 'rest') != 'graphql':
+            return super().sync_endpoint(client = client, state = state, catalog = catalog, repo_path = repo_path, start_date = start_date,
+                                         selected_stream_ids = selected_stream_ids, stream_to_sync = stream_to_sync, config = config)
+
+        parent_bookmark_value = get_bookmark(state, repo_path, self.tap_stream_id, "since", start_date)
+        current_time = datetime.today().strftime(DATE_FORMAT)
+        min_bookmark_value = self.get_min_bookmark(self.tap_stream_id, selected_stream_ids, current_time, repo_path, start_date, state)
+        bookmark_value = parent_bookmark_value
+
+        stream_catalog = get_schema(catalog, self.tap_stream_id)
+        graph = get_stream_graph(catalog, selected_stream_ids)
+        projection = get_transform_plan(stream_catalog).get_projection(graph[self.tap_stream_id].required_fields)
+        children = [child for child in self.children if child in stream_to_sync]
+        query = IssueQuery(client, repo_path, min_bookmark_value, children, int(config.get('graphql_page_size') or DEFAULT_ISSUES_PAGE_SIZE))
+
+        with metrics.record_counter(self.tap_stream_id) as counter:
+            # The pages are listed the least recently updated first, so the bookmark moves after each page.
+            for issues, _ in query.get_pages():
+                extraction_time = singer.utils.now()
+                for record in issues:
+                    record['_sdc_repository'] = repo_path
+                    record = project(record, projection)
+                    updated_at = record.get(self.replication_keys)
+                    bookmark_value = max(bookmark_value, updated_at)
+
+                    if self.tap_stream_id in selected_stream_ids and updated_at >= parent_bookmark_value:
+                        write_record(self.tap_stream_id, transform_record(stream_catalog, record), extraction_time)
+                        counter.increment()
+
+                    for child in children:
+                        self.get_child_records(client, catalog, child, graph[child].get_id(record), repo_path, state, start_date,
+                                               updated_at, stream_to_sync, selected_stream_ids, parent_record = record)
+
+                self.write_bookmarks(self.tap_stream_id, selected_stream_ids, bookmark_value, repo_path, state)
+                checkpoint.write_state(state)
+
+        return state
+
 class IssueAssignees(IncrementalOrderedStream):
     '''
     Child of "issues" - https://docs.github.com/en/rest/issues/issues#list-repository-issues
@@ -1023,6 +1826,69 @@ class Events(IncrementalStream):
     key_properties = ["id"]
     additional_filters = f"per_page{PER_PAGE_NUMBER}"
     path = "events"
+    sort_direction = "desc"
+
+    def sync_endpoint(self,
+                      client,
+                      state,
+                      catalog,
+                      repo_path,
+                      start_date,
+                      selected_stream_ids,
+                      stream_to_sync,
+                      config,
+                      ):
+        """
+        Poll the events of the repository, listed the newest first. The events are not requested again before the
+        `X-Poll-Interval` of the last poll, an unchanged feed is answered with a 304 for the ETag of its first page,
+        and the pages stop after the first event created before the bookmark while the events are in order.
+        """
+        feed = state.get('event_feeds', {}).get(repo_path, {})
+        if feed.get('next_poll_at') and singer.utils.now() < parse_timestamp(feed['next_poll_at']):
+            LOGGER.info("Skipping the events of %s until %s, the poll interval of the API.", repo_path, feed['next_poll_at'])
+            return state
+
+        full_url = self.build_url(client.base_url, repo_path, None)
+        try:
+            self.first_page = client.get_if_modified(self.tap_stream_id, full_url, feed.get('etag'), self.tap_stream_id)
+        except NotModifiedError:
+            LOGGER.info("The events of %s did not change since the last poll.", repo_path)
+            self.write_feed(state, repo_path, feed.get('etag'), feed.get('poll_interval', EVENTS_POLL_INTERVAL))
+            return state
+        etag = self.first_page.headers.get('ETag')
+        poll_interval = int(self.first_page.headers.get('X-Poll-Interval') or EVENTS_POLL_INTERVAL)
+
+        state = super().sync_endpoint(client = client, state = state, catalog = catalog, repo_path = repo_path, start_date = start_date,
+                                      selected_stream_ids = selected_stream_ids, stream_to_sync = stream_to_sync, config = config)
+        self.write_feed(state, repo_path, etag, poll_interval)
+        return state
+
+    def build_url(self, base_url, repo_path, bookmark):
+        """
+        Build the url of the first page of the events.
+        """
+        return '{}/repos/{}/{}?per_page={}'.format(base_url, repo_path, self.path, PER_PAGE_NUMBER)
+
+    def get_pages(self, client, full_url):
+        """
+        Yield the first page requested with the ETag of the last poll, then follow its next pages.
+        """
+        response = self.first_page
+        yield response
+        while 'next' in response.links:
+            response = client.authed_get(self.tap_stream_id, response.links['next']['url'], stream = self.tap_stream_id)
+            yield response
+
+    @staticmethod
+    def write_feed(state, repo_path, etag, poll_interval):
+        """
+        Save the ETag of the first page of the events and the time of the next poll allowed by the API.
+        """
+        state.setdefault('event_feeds', {})[repo_path] = {
+            'etag': etag,
+            'poll_interval': poll_interval,
+            'next_poll_at': format_timestamp(singer.utils.now() + timedelta(seconds=poll_interval)),
+        }
 
 class CommitComments(IncrementalStream):
     '''
@@ -1195,6 +2061,8 @@ class WorkflowRuns(IncrementalDateStream):
     path = "actions/runs"
     result_path = "workflow_runs"
     since_filter_param_custom = "per_page=100&created={from}..{until}"
+    # The `created` queries return at most 1000 runs.
+    result_cap = 1000
     children = ["workflow_run_pull_requests"]
     has_children = True
 
@@ -1269,3 +2137,104 @@ STREAMS = {
     "workflow_runs": WorkflowRuns,
     "workflow_run_pull_requests": WorkflowPullRequests
 }
+
+# Streams synced from their repository endpoint instead of once per parent record
+REPOSITORY_STREAMS = {
+    "review_comments": RepositoryReviewComments
+}
+
+# Ids of the pull requests of the repository being synced by repository and number
+PULL_REQUEST_IDS = {}
+
+def get_id_extractor(id_keys):
+    """
+    Return a function extracting the tuple of the `id_keys` values of a record.
+    """
+    if len(id_keys) == 1:
+        key = id_keys[0]
+        return lambda record: (record.get(key),)
+    return lambda record: tuple(record.get(key) for key in id_keys)
+
+class StreamDescriptor:
+    """
+    The immutable description of a stream in the stream graph: its stream object, its children, the stream with
+    all its descendants in depth first order, its id extractor, the fields required by the projection
+    and the selected streams among them.
+    """
+    __slots__ = ('tap_stream_id', 'stream', 'parent', 'children', 'family', 'id_keys', 'get_id', 'required_fields', 'selected', 'selected_family')
+
+    def __init__(self, stream_id, family, selected_stream_ids):
+        stream_obj = STREAMS[stream_id]()
+        values = {
+            'tap_stream_id': stream_id,
+            'stream': stream_obj,
+            'parent': stream_obj.parent,
+            'children': tuple(stream_obj.children),
+            'family': family,
+            'id_keys': tuple(stream_obj.id_keys),
+            'get_id': get_id_extractor(tuple(stream_obj.id_keys)),
+            'required_fields': stream_obj.get_required_fields(),
+            'selected': stream_id in selected_stream_ids,
+            'selected_family': tuple(family_id for family_id in family if family_id in selected_stream_ids)
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("The stream descriptor of '{}' is immutable.".format(self.tap_stream_id))
+
+class StreamGraph:
+    """
+    The index of the streams built once per sync for the catalog and the selected streams,
+    so the hot paths look the streams, their children and their catalog entries up in O(1).
+    """
+    __slots__ = ('catalog', 'selected_stream_ids', 'descriptors', '_catalog_entries')
+
+    def __init__(self, catalog, selected_stream_ids):
+        self.catalog = catalog
+        self.selected_stream_ids = selected_stream_ids
+        selected = set(selected_stream_ids)
+        self.descriptors = {stream_id: StreamDescriptor(stream_id, STREAM_FAMILIES[stream_id], selected) for stream_id in STREAMS}
+        self._catalog_entries = None
+
+    def __getitem__(self, stream_id):
+        return self.descriptors[stream_id]
+
+    def get_catalog_entry(self, stream_id):
+        """
+        Return the catalog entry of a stream, the catalog is indexed on the first lookup.
+        """
+        if self._catalog_entries is None:
+            self._catalog_entries = {}
+            for stream_catalog in self.catalog:
+                self._catalog_entries.setdefault(stream_catalog['tap_stream_id'], stream_catalog)
+        return self._catalog_entries[stream_id]
+
+def get_stream_family(stream_id):
+    """
+    Return the stream and all its descendants in depth first order.
+    """
+    return (stream_id,) + tuple(STREAMS[stream_id]().get_descendants())
+
+# The family of each stream, which does not depend on the catalog
+STREAM_FAMILIES = {stream_id: get_stream_family(stream_id) for stream_id in STREAMS}
+STREAM_GRAPH = None
+
+def get_stream_graph(catalog, selected_stream_ids):
+    """
+    Return the stream graph of the catalog and the selected streams, built on the first call of the sync.
+    """
+    global STREAM_GRAPH # pylint: disable=global-statement
+    graph = STREAM_GRAPH
+    if graph is None or graph.catalog is not catalog or graph.selected_stream_ids is not selected_stream_ids:
+        graph = STREAM_GRAPH = StreamGraph(catalog, selected_stream_ids)
+    return graph
+
+def get_selected_family(stream_id, selected_stream_ids):
+    """
+    Return the selected streams among the stream and its descendants.
+    """
+    graph = STREAM_GRAPH
+    if graph is not None and graph.selected_stream_ids is selected_stream_ids:
+        return graph[stream_id].selected_family
+    return [family_id for family_id in STREAM_FAMILIES[stream_id] if family_id in selected_stream_ids]
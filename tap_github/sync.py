@@ -1,10 +1,18 @@
 import collections
+import time
 import singer
 from singer import bookmarks
-from tap_github.streams import STREAMS
+from tap_github.streams import REPOSITORY_STREAMS, STREAMS, get_stream_graph
+from tap_github.client import RateLimitExceeded
+from tap_github import checkpoint
+from tap_github import transform
+from tap_github import sha_index
+from tap_github import dedupe
 
 LOGGER = singer.get_logger()
 STREAM_TO_SYNC_FOR_ORGS = ['teams', 'team_members', 'team_memberships', 'repositories', 'repository_topics']
+# Number of requests of the rate limit kept unused by the rate budget planner
+DEFAULT_RATE_BUDGET_RESERVE = 100
 schemas_sent = []
 
 def get_selected_streams(catalog):
@@ -31,7 +39,7 @@ def update_currently_syncing(state, stream_name):
         del state['currently_syncing']
     else:
         singer.set_currently_syncing(state, stream_name)
-    singer.write_state(state)
+    checkpoint.write_state(state)
 
 def update_currently_syncing_repo(state, repo_path):
     """
@@ -42,7 +50,22 @@ def update_currently_syncing_repo(state, repo_path):
         del state['currently_syncing_repo']
     else:
         state['currently_syncing_repo'] = repo_path
-    singer.write_state(state)
+    checkpoint.write_state(state)
+
+def get_repository_streams(config, streams_to_sync):
+    """
+    Return the child streams synced from their repository endpoint instead of once per parent record.
+    """
+    repository_streams = set()
+    if config.get('review_comments_mode', 'pull_request') == 'repository':
+        repository_streams.add('review_comments')
+    return repository_streams.intersection(streams_to_sync)
+
+def is_top_level_stream(stream_id, repository_streams):
+    """
+    Check whether a stream is synced on its own, not as the child of a parent stream.
+    """
+    return not STREAMS[stream_id].parent or stream_id in repository_streams
 
 def get_ordered_stream_list(currently_syncing, streams_to_sync):
     """
@@ -55,10 +78,129 @@ def get_ordered_stream_list(currently_syncing, streams_to_sync):
         stream_list = stream_list[index:] + stream_list[:index]
     return stream_list
 
-def get_ordered_repos(state, repositories):
+def get_repo_sync_cost(state, repo, streams = None):
+    """
+    Get the historical cost of syncing a repository as the total duration and request count of its streams.
+    """
+    repo_stats = state.get('sync_stats', {}).get(repo, {})
+    duration, request_count = 0, 0
+    for stream_id, stream_stats in repo_stats.items():
+        if streams is None or stream_id in streams:
+            duration += stream_stats.get('duration', 0)
+            request_count += stream_stats.get('requests', 0)
+    return duration, request_count
+
+def update_sync_stats(state, repo, stream_id, duration, request_count):
+    """
+    Record the duration and the request count of the last sync of a stream for a repository.
+    """
+    state.setdefault('sync_stats', {}).setdefault(repo, {})[stream_id] = {
+        'duration': round(duration, 3),
+        'requests': request_count,
+        'last_synced': singer.utils.strftime(singer.utils.now())
+    }
+
+class RateBudget:
+    """
+    Plan the (repo, stream) units of a sync within the remaining rate limit. The most stale units are admitted first
+    with their cost estimated from the requests of their last sync. The units that do not fit are deferred to the next run.
+    """
+    def __init__(self, client, state, reserve = DEFAULT_RATE_BUDGET_RESERVE):
+        self.client = client
+        self.state = state
+        self.reserve = reserve
+        self.remaining = client.get_rate_limit().get('remaining', 0)
+        self.start_request_count = client.request_count
+        self.admitted = collections.defaultdict(set)
+        self.staleness = {}
+        self.deferred = []
+        self.exhausted = False
+
+    def get_unit_cost(self, repo, stream_id):
+        """
+        Estimate the requests of a unit from its last sync, or from the average of the stream in the other repos.
+        """
+        sync_stats = self.state.get('sync_stats', {})
+        if stream_id in sync_stats.get(repo, {}):
+            return sync_stats[repo][stream_id].get('requests', 1)
+        stream_costs = [repo_stats[stream_id].get('requests', 1) for repo_stats in sync_stats.values() if stream_id in repo_stats]
+        return round(sum(stream_costs) / len(stream_costs)) if stream_costs else 1
+
+    def get_unit_staleness(self, repo, stream_id):
+        """
+        Return the seconds since the last sync of the unit, the units never synced are the most stale.
+        """
+        last_synced = self.state.get('sync_stats', {}).get(repo, {}).get(stream_id, {}).get('last_synced')
+        if not last_synced:
+            return float('inf')
+        return (singer.utils.now() - singer.utils.strptime_to_utc(last_synced)).total_seconds()
+
+    def get_remaining(self):
+        """
+        Return the remaining requests from the last response, or counted from the rate limit at start-up.
+        """
+        if self.client.rate_limit_remaining is not None:
+            return self.client.rate_limit_remaining
+        return self.remaining - (self.client.request_count - self.start_request_count)
+
+    def plan(self, units):
+        """
+        Admit the most stale units while their estimated cost fits in the remaining requests.
+        """
+        budget = self.remaining - self.reserve
+        for repo, stream_id in units:
+            self.staleness[(repo, stream_id)] = self.get_unit_staleness(repo, stream_id)
+
+        for repo, stream_id in sorted(units, key=lambda unit: self.staleness[unit], reverse=True):
+            cost = self.get_unit_cost(repo, stream_id)
+            if cost <= budget:
+                self.admitted[repo].add(stream_id)
+                budget -= cost
+            else:
+                self.defer(repo, stream_id, "its estimated {} requests do not fit in the rate limit".format(cost))
+        LOGGER.info("Rate budget: %d requests remaining, %d units admitted, %d units deferred.",
+                    self.remaining, sum(len(streams) for streams in self.admitted.values()), len(self.deferred))
+
+    def get_repo_staleness(self, repo):
+        """
+        Return the staleness of the most stale admitted unit of the repo.
+        """
+        return max((self.staleness[(repo, stream_id)] for stream_id in self.admitted.get(repo, [])), default=0)
+
+    def can_sync(self, repo, stream_id):
+        """
+        Check that the unit is admitted and still fits in the remaining requests.
+        """
+        if self.exhausted or stream_id not in self.admitted.get(repo, set()):
+            return False
+        cost = self.get_unit_cost(repo, stream_id)
+        if cost > self.get_remaining() - self.reserve:
+            self.defer(repo, stream_id, "its estimated {} requests exceed the remaining {} requests".format(cost, self.get_remaining()))
+            return False
+        return True
+
+    def defer(self, repo, stream_id, reason):
+        """
+        Defer the unit to the next run.
+        """
+        LOGGER.warning("Deferring stream %s of %s to the next run as %s.", stream_id, repo, reason)
+        self.deferred.append((repo, stream_id))
+
+    def stop(self, repo, stream_id, err):
+        """
+        Stop the sync when the rate limit is exceeded, the state keeps the bookmarks to resume in the next run.
+        """
+        LOGGER.warning("Stopping the sync at stream %s of %s, the remaining streams are deferred to the next run: %s", stream_id, repo, err)
+        self.deferred.append((repo, stream_id))
+        self.exhausted = True
+
+def get_ordered_repos(state, repositories, streams = None, sort_key = None):
     """
     Get an ordered list of remaining repos to sync followed by synced repos.
+    The repos are ordered longest job first from the historical sync stats, the repos without stats keep their order.
     """
+    sort_key = sort_key or (lambda repo: get_repo_sync_cost(state, repo, streams))
+    repositories = sorted(repositories, key=sort_key, reverse=True)
     syncing_repo = state.get("currently_syncing_repo")
     LOGGER.info(f'Currently syncing repo from state: {syncing_repo}')
     if syncing_repo in repositories:
@@ -179,64 +321,114 @@ def sync(client, config, state, catalog):
     """
 
     start_date = config['start_date']
+    checkpoint.configure(config)
+    transform.configure(config)
 
     # Get selected streams, make sure stream dependencies are met
     selected_stream_ids = get_selected_streams(catalog)
 
     streams_to_sync = get_stream_to_sync(catalog)
     LOGGER.info('Sync stream %s', streams_to_sync)
+    # Index the streams and the catalog once, the streams look their children and catalog entries up in the graph.
+    get_stream_graph(catalog['streams'], selected_stream_ids)
 
     repositories, organizations = client.extract_repos_from_config()
 
     state = translate_state(state, catalog, repositories)
-    singer.write_state(state)
+    # The deduplicator and the SHA index read the bookmarks the run starts with in the translated format
+    sha_index.configure(config, state)
+    dedupe.configure(config, state)
+    checkpoint.write_state(state, force=True)
 
     # Sync `teams`, `team_members`and `team_memberships` streams just single time for any organization.
     streams_to_sync_for_orgs = set(streams_to_sync).intersection(STREAM_TO_SYNC_FOR_ORGS)
+    # Sync other streams for all repos
+    streams_to_sync_for_repos = set(streams_to_sync) - streams_to_sync_for_orgs
+
+    rate_budget = None
+    if selected_stream_ids and config.get('rate_budget_planner'):
+        repository_streams = get_repository_streams(config, streams_to_sync)
+        rate_budget = RateBudget(client, state, int(config.get('rate_budget_reserve', DEFAULT_RATE_BUDGET_RESERVE)))
+        rate_budget.plan([(orgs, stream_id) for orgs in sorted(organizations) for stream_id in sorted(streams_to_sync_for_orgs) if is_top_level_stream(stream_id, repository_streams)] +
+                         [(repo, stream_id) for repo in sorted(repositories) for stream_id in sorted(streams_to_sync_for_repos) if is_top_level_stream(stream_id, repository_streams)])
+
     # Loop through all organizations
     if selected_stream_ids:
         for orgs in organizations:
             LOGGER.info("Starting sync of organization: %s", orgs)
-            do_sync(catalog, streams_to_sync_for_orgs, selected_stream_ids, client, start_date, state, orgs)
+            do_sync(catalog, streams_to_sync_for_orgs, selected_stream_ids, client, start_date, state, orgs, rate_budget = rate_budget)
 
-        # Sync other streams for all repos
-        streams_to_sync_for_repos = set(streams_to_sync) - streams_to_sync_for_orgs
         # pylint: disable=too-many-nested-blocks
         # Sync repositories only if any streams are selected
-        for repo in get_ordered_repos(state, repositories):
+        # Sync the repos with the most stale units first when the rate budget is planned.
+        repo_sort_key = rate_budget.get_repo_staleness if rate_budget else None
+        for repo in get_ordered_repos(state, repositories, streams_to_sync_for_repos, repo_sort_key):
+            if rate_budget and rate_budget.exhausted:
+                break
             update_currently_syncing_repo(state, repo)
             LOGGER.info("Starting sync of repository: %s", repo)
-            do_sync(catalog, streams_to_sync_for_repos, selected_stream_ids, client, start_date, state, repo, config)
+            do_sync(catalog, streams_to_sync_for_repos, selected_stream_ids, client, start_date, state, repo, config, rate_budget)
 
             if client.not_accessible_repos:
                 # Give warning messages for a repo that is not accessible by a stream or is invalid.
                 message = "Please check the repository name \'{}\' or you do not have sufficient permissions to access this repository for following streams {}.".format(repo, ", ".join(client.not_accessible_repos))
                 LOGGER.warning(message)
                 client.not_accessible_repos = set()
-        update_currently_syncing_repo(state, None)
 
-def do_sync(catalog, streams_to_sync, selected_stream_ids, client, start_date, state, repo, config= {}):
+        if rate_budget and rate_budget.exhausted:
+            # Keep the currently syncing repo and stream, the next run resumes from them.
+            LOGGER.warning("Deferred %d units to the next run.", len(rate_budget.deferred))
+        else:
+            update_currently_syncing_repo(state, None)
+        checkpoint.flush(state)
+    sha_index.close()
+    dedupe.close()
+
+def do_sync(catalog, streams_to_sync, selected_stream_ids, client, start_date, state, repo, config= {}, rate_budget = None):
     """
     Sync all other streams except teams, team_members and team_memberships for each repo.
     """
     currently_syncing = singer.get_currently_syncing(state)
+    # The parents of the streams synced from their repository endpoint sync them neither as children nor in their bookmarks,
+    # and are only synced for their other selected children.
+    repository_streams = get_repository_streams(config, streams_to_sync)
+    parent_selected_stream_ids = selected_stream_ids
+    if repository_streams:
+        parent_selected_stream_ids = [stream_id for stream_id in selected_stream_ids if stream_id not in repository_streams]
+        streams_to_sync = [stream_id for stream_id in streams_to_sync if stream_id in repository_streams or stream_id in parent_selected_stream_ids
+                           or any(child in parent_selected_stream_ids for child in STREAMS[stream_id]().get_descendants())]
+    parent_streams_to_sync = [stream_id for stream_id in streams_to_sync if stream_id not in repository_streams]
     for stream_id in get_ordered_stream_list(currently_syncing, streams_to_sync):
-        stream_obj = STREAMS[stream_id]()
-        LOGGER.info(f'Starting stream {stream_id} for {repo}.')
+        stream_obj = REPOSITORY_STREAMS[stream_id]() if stream_id in repository_streams else STREAMS[stream_id]()
         # If it is a "sub_stream", it will be synced as part of the parent stream
         if stream_id in streams_to_sync and not stream_obj.parent:
+            if rate_budget and not rate_budget.can_sync(repo, stream_id):
+                continue
+            LOGGER.info(f'Starting stream {stream_id} for {repo}.')
             write_schemas(stream_id, catalog, selected_stream_ids)
             update_currently_syncing(state, stream_id)
 
-            state = stream_obj.sync_endpoint(client = client,
-                                              state = state,
-                                              catalog = catalog['streams'],
-                                              repo_path = repo,
-                                              start_date = start_date,
-                                              selected_stream_ids = selected_stream_ids,
-                                              stream_to_sync = streams_to_sync,
-                                              config = config,
-                                            )
-
-            singer.write_state(state)
+            start_time, start_request_count = time.monotonic(), client.request_count
+            try:
+                state = stream_obj.sync_endpoint(client = client,
+                                                  state = state,
+                                                  catalog = catalog['streams'],
+                                                  repo_path = repo,
+                                                  start_date = start_date,
+                                                  selected_stream_ids = selected_stream_ids if stream_id in repository_streams else parent_selected_stream_ids,
+                                                  stream_to_sync = parent_streams_to_sync,
+                                                  config = config,
+                                                )
+            except RateLimitExceeded as err:
+                if not rate_budget:
+                    raise
+                # The bookmarks and the page cursor written so far let the next run resume this stream.
+                rate_budget.stop(repo, stream_id, err)
+                checkpoint.write_state(state, force=True)
+                return
+            update_sync_stats(state, repo, stream_id, time.monotonic() - start_time, client.request_count - start_request_count)
+            transform.log_transform_counters([stream_id] + stream_obj.get_descendants())
+
+            # Always checkpoint the state at the end of a stream.
+            checkpoint.write_state(state, force=True)
         update_currently_syncing(state, None)
@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+import singer
+
+def is_canonical(value):
+    """
+    Check whether a timestamp has the fixed format of the GitHub API, `YYYY-MM-DDTHH:MM:SSZ`.
+    The canonical timestamps of the same format compare as strings.
+    """
+    return isinstance(value, str) and len(value) == 20 and value[10] == 'T' and value[19] == 'Z'
+
+def parse_timestamp(value):
+    """
+    Parse a timestamp into an aware UTC datetime. The canonical timestamps are parsed from their fixed positions,
+    the other formats with `singer.utils.strptime_to_utc`.
+    """
+    if is_canonical(value):
+        try:
+            return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                            int(value[11:13]), int(value[14:16]), int(value[17:19]), tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    return singer.utils.strptime_to_utc(value)
+
+def format_timestamp(value):
+    """
+    Format a datetime as a canonical timestamp.
+    """
+    return '{:04d}-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}Z'.format(value.year, value.month, value.day, value.hour, value.minute, value.second)
+
+def normalize_timestamp(value):
+    """
+    Return the canonical form of a timestamp, the canonical timestamps are returned as is.
+    """
+    if is_canonical(value):
+        return value
+    return format_timestamp(parse_timestamp(value).astimezone(timezone.utc))
+
+class BookmarkTime:
+    """
+    A bookmark parsed once to be compared with the timestamps of the records.
+    The canonical timestamps are compared as strings and the others as datetimes.
+    """
+    __slots__ = ('value', 'time', 'canonical')
+
+    def __init__(self, value):
+        self.value = value
+        self.time = parse_timestamp(value)
+        self.canonical = is_canonical(value)
+
+    def is_after(self, timestamp):
+        """
+        Check whether the bookmark is after the timestamp.
+        """
+        if self.canonical and is_canonical(timestamp):
+            return timestamp < self.value
+        return parse_timestamp(timestamp) < self.time
@@ -0,0 +1,390 @@
+import decimal
+import re
+import time
+import singer
+from singer import metadata
+from singer.transform import breadcrumb_path, string_to_datetime
+
+LOGGER = singer.get_logger()
+
+def get_selected_fields(schema, metadata_map):
+    """
+    Return the top level fields of the schema kept by the transform: the automatic fields and the fields
+    which are neither deselected nor unsupported.
+    """
+    selected_fields = set()
+    for field_name in schema.get('properties', {}):
+        field_metadata = metadata_map.get(('properties', field_name), {})
+        if field_metadata.get('inclusion') == 'automatic' or \
+                (field_metadata.get('selected') is not False and field_metadata.get('inclusion') != 'unsupported'):
+            selected_fields.add(field_name)
+    return selected_fields
+
+def _transform_untyped(data):
+    return True, data
+
+def _transform_invalid(data):
+    return False, None
+
+def _transform_null(data):
+    if data is None or data == "":
+        return True, None
+    return False, None
+
+def _transform_datetime(data):
+    if data is None or data == "":
+        return False, None
+    data = string_to_datetime(data)
+    return data is not None, data
+
+def _transform_decimal(data):
+    if isinstance(data, (str, float, int)):
+        try:
+            return True, str(decimal.Decimal(str(data)))
+        except Exception: # pylint: disable=broad-except
+            return False, None
+    if isinstance(data, decimal.Decimal):
+        try:
+            return True, 'NaN' if data.is_snan() else str(data)
+        except Exception: # pylint: disable=broad-except
+            return False, None
+    return False, None
+
+def _transform_string(data):
+    if data is None:
+        return False, None
+    try:
+        return True, str(data)
+    except Exception: # pylint: disable=broad-except
+        return False, None
+
+def _transform_integer(data):
+    if isinstance(data, str):
+        data = data.replace(",", "")
+    try:
+        return True, int(data)
+    except Exception: # pylint: disable=broad-except
+        return False, None
+
+def _transform_number(data):
+    if isinstance(data, str):
+        data = data.replace(",", "")
+    try:
+        return True, float(data)
+    except Exception: # pylint: disable=broad-except
+        return False, None
+
+def _transform_boolean(data):
+    if isinstance(data, str) and data.lower() == "false":
+        return True, False
+    try:
+        return True, bool(data)
+    except Exception: # pylint: disable=broad-except
+        return False, None
+
+def _transform_nullable_string(data):
+    # The most common type of the schemas, ["null", "string"], without the loop over the types.
+    if data is None:
+        return True, None
+    return _transform_string(data)
+
+def _transform_nullable_integer(data):
+    if data is None or data == "":
+        return True, None
+    return _transform_integer(data)
+
+SCALAR_TRANSFORMS = {
+    'string': _transform_string,
+    'integer': _transform_integer,
+    'number': _transform_number,
+    'boolean': _transform_boolean,
+}
+
+NULLABLE_SCALAR_TRANSFORMS = {
+    'string': _transform_nullable_string,
+    'integer': _transform_nullable_integer,
+}
+
+def _transform_first_match(transforms):
+    """
+    Return a transform trying the transforms in order, as for the types of a schema or the schemas of `anyOf`.
+    """
+    def transform_first_match(data):
+        for transform in transforms:
+            success, value = transform(data)
+            if success:
+                return True, value
+        return False, None
+    return transform_first_match
+
+class CompiledTransformer:
+    """
+    A transformer specialized for a schema and its metadata. The schema is walked once to build a function per node,
+    so a record is only walked along its own fields. The output is the output of `singer.Transformer` for the default
+    integer datetime parsing, and the records which do not match the schema are transformed again by `singer.Transformer`
+    to raise the same `SchemaMismatch`.
+    """
+    def __init__(self, schema, metadata_map):
+        self.schema = schema
+        self.metadata_map = metadata_map
+        self.removed = set()
+        self.filtered = set()
+        self.filter_tree = self.compile_filter(metadata_map)
+        self.transform_record = self.compile_schema(schema, [])
+
+    def compile_filter(self, metadata_map):
+        """
+        Build the tree of the breadcrumbs removed by the metadata, as `singer.Transformer.filter_data_by_metadata`.
+        """
+        automatic = {breadcrumb for breadcrumb, mdata in metadata_map.items() if breadcrumb and mdata.get('inclusion') == 'automatic'}
+        filter_tree = {}
+        for breadcrumb, mdata in sorted(metadata_map.items()):
+            if not breadcrumb or breadcrumb in automatic or \
+                    (mdata.get('selected') is not False and mdata.get('inclusion') != 'unsupported'):
+                continue
+            # The fields under an automatic field are not filtered.
+            if any(breadcrumb[:index] in automatic for index in range(2, len(breadcrumb))):
+                continue
+            node = filter_tree
+            for key in breadcrumb[:-1]:
+                node = node.setdefault(key, {})
+                if node is True:
+                    break
+            else:
+                node[breadcrumb[-1]] = True
+                self.filtered.add(breadcrumb_path(breadcrumb))
+        return filter_tree
+
+    def filter_data(self, data, filter_tree):
+        """
+        Remove the deselected and unsupported fields from the data in place.
+        """
+        if isinstance(data, dict):
+            for field_name, sub_tree in filter_tree.get('properties', {}).items():
+                if field_name in data:
+                    if sub_tree is True:
+                        del data[field_name]
+                    else:
+                        data[field_name] = self.filter_data(data[field_name], sub_tree)
+        elif isinstance(data, list) and 'items' in filter_tree:
+            data = [self.filter_data(row, filter_tree['items']) for row in data]
+        return data
+
+    def compile_schema(self, schema, path):
+        """
+        Return the transform of a schema node.
+        """
+        if 'anyOf' in schema:
+            return _transform_first_match([self.compile_schema(sub_schema, path) for sub_schema in schema['anyOf']])
+        if 'type' not in schema:
+            return _transform_untyped
+
+        types = schema['type'] if isinstance(schema['type'], list) else [schema['type']]
+        types = [typ for typ in types if typ != 'null'] + (['null'] if 'null' in types else [])
+        if len(types) == 2 and types[1] == 'null' and types[0] in NULLABLE_SCALAR_TRANSFORMS and 'format' not in schema:
+            return NULLABLE_SCALAR_TRANSFORMS[types[0]]
+
+        transforms = [self.compile_type(typ, schema, path) for typ in types]
+        return transforms[0] if len(transforms) == 1 else _transform_first_match(transforms)
+
+    def compile_type(self, typ, schema, path):
+        """
+        Return the transform of a schema node for one of its types.
+        """
+        if typ == 'null':
+            return _transform_null
+        if schema.get('format') == 'date-time':
+            return _transform_datetime
+        if schema.get('format') == 'singer.decimal':
+            return _transform_decimal
+        if typ == 'object':
+            return self.compile_object(schema.get('properties', {}), schema.get('patternProperties'), path)
+        if typ == 'array':
+            return self.compile_array(schema, path)
+        return SCALAR_TRANSFORMS.get(typ, _transform_invalid)
+
+    def compile_object(self, properties, pattern_properties, path):
+        """
+        Return the transform of an object with the transforms of its properties.
+        """
+        if properties == {} and not pattern_properties:
+            return lambda data: (isinstance(data, dict), data)
+
+        field_transforms = {key: self.compile_schema(sub_schema, path + [key]) for key, sub_schema in properties.items()}
+        patterns = [(re.compile(pattern), self.compile_schema(sub_schema, path)) for pattern, sub_schema in (pattern_properties or {}).items()]
+        removed = self.removed
+
+        def get_pattern_transform(key):
+            transforms = [transform for pattern, transform in patterns if pattern.match(key)]
+            if not transforms:
+                return None
+            return _transform_first_match(transforms)
+
+        def transform_object(data):
+            if not isinstance(data, dict):
+                return False, data
+            result = {}
+            success = True
+            for key, value in data.items():
+                transform = field_transforms.get(key)
+                if transform is None and patterns:
+                    transform = get_pattern_transform(key)
+                if transform is None:
+                    removed.add(".".join(map(str, path + [key])))
+                    continue
+                field_success, result[key] = transform(value)
+                success = success and field_success
+            return success, result
+        return transform_object
+
+    def compile_array(self, schema, path):
+        """
+        Return the transform of an array with the transform of its items.
+        """
+        transform_item = self.compile_schema(schema['items'], path + ['items'])
+
+        def transform_array(data):
+            if not isinstance(data, list):
+                return False, data
+            result = []
+            success = True
+            for row in data:
+                row_success, value = transform_item(row)
+                success = success and row_success
+                result.append(value)
+            return success, result
+        return transform_array
+
+    def transform(self, record):
+        """
+        Filter and transform a record.
+        """
+        if self.filter_tree:
+            record = self.filter_data(record, self.filter_tree)
+        success, rec = self.transform_record(record)
+        if not success:
+            # Raise the errors of the generic transformer.
+            return singer.Transformer().transform(record, self.schema, metadata=self.metadata_map)
+        return rec
+
+    def log_warning(self):
+        """
+        Log the filtered and removed paths as `singer.Transformer`.
+        """
+        if self.filtered:
+            LOGGER.debug("Filtered %s paths during transforms as they were unsupported or not selected:\n\t%s",
+                         len(self.filtered), "\n\t".join(sorted(self.filtered)))
+        if self.removed:
+            LOGGER.debug("Removed %s paths during transforms:\n\t%s", len(self.removed), "\n\t".join(sorted(self.removed)))
+
+class TransformPlan:
+    """
+    The metadata map, the selected fields and the Transformer of a stream, built once per run
+    instead of once per record, with the number of records and the time spent in the transform.
+    The compiled plans transform the records with a `CompiledTransformer` instead of `singer.Transformer`.
+    """
+    def __init__(self, stream_catalog, compiled=False):
+        self.stream_catalog = stream_catalog
+        self.tap_stream_id = stream_catalog.get('tap_stream_id')
+        self.schema = stream_catalog['schema']
+        self.metadata_map = metadata.to_map(stream_catalog['metadata'])
+        self.selected_fields = get_selected_fields(self.schema, self.metadata_map)
+        self.projection = None
+        self.compiled = compiled
+        if compiled:
+            self.transformer = CompiledTransformer(self.schema, self.metadata_map)
+        else:
+            self.transformer = singer.Transformer()
+        self.reset_counters()
+
+    def get_projection(self, required_fields):
+        """
+        Return the top level fields kept in the records of the stream: the selected fields and the fields required
+        by the sync, or None to keep all the fields when the schema does not list its properties.
+        The projection is computed on the first call of the run.
+        """
+        if self.projection is None and self.schema.get('properties'):
+            self.projection = frozenset(self.selected_fields | required_fields)
+        return self.projection
+
+    def reset_counters(self):
+        """
+        Reset the transform counters.
+        """
+        self.record_count = 0
+        self.transform_seconds = 0
+
+    def transform(self, record):
+        """
+        Transform a record with the schema and the metadata of the stream.
+        """
+        start_time = time.perf_counter()
+        if self.compiled:
+            rec = self.transformer.transform(record)
+        else:
+            # The errors of the failed `anyOf` branches are collected even when the record matches, so clear them
+            # to keep the long lived transformer from growing.
+            self.transformer.errors = []
+            rec = self.transformer.transform(record, self.schema, metadata=self.metadata_map)
+        self.transform_seconds += time.perf_counter() - start_time
+        self.record_count += 1
+        return rec
+
+    def log_counters(self):
+        """
+        Log the paths removed by the transform and the time spent in it, then reset the counters.
+        """
+        self.transformer.log_warning()
+        if self.record_count:
+            LOGGER.info("Transformed %d %s records in %.3f seconds.", self.record_count, self.tap_stream_id, self.transform_seconds)
+        self.reset_counters()
+
+def project(record, projection):
+    """
+    Return the record with the fields of the projection only, so the deselected subtrees are dropped
+    before the transform and before the records are kept for their children.
+    """
+    if projection is None or not isinstance(record, dict):
+        return record
+    return {key: value for key, value in record.items() if key in projection}
+
+TRANSFORM_PLANS = {}
+# Streams transformed with a `CompiledTransformer`
+COMPILED_STREAMS = set()
+
+def configure(config):
+    """
+    Configure the streams transformed with a compiled transformer from the config.
+    """
+    global COMPILED_STREAMS # pylint: disable=global-statement
+    compiled_streams = config.get('compiled_transform_streams', [])
+    if isinstance(compiled_streams, str):
+        compiled_streams = compiled_streams.split(',')
+    COMPILED_STREAMS = {stream_id.strip() for stream_id in compiled_streams if stream_id.strip()}
+    if COMPILED_STREAMS:
+        LOGGER.info("Using the compiled transformer for the streams: %s", ", ".join(sorted(COMPILED_STREAMS)))
+
+def get_transform_plan(stream_catalog):
+    """
+    Return the transform plan of a stream, built on the first record of the stream in the run.
+    """
+    stream_id = stream_catalog.get('tap_stream_id')
+    compiled = stream_id in COMPILED_STREAMS
+    plan = TRANSFORM_PLANS.get(stream_id)
+    if plan is None or plan.stream_catalog is not stream_catalog or plan.compiled != compiled:
+        plan = TRANSFORM_PLANS[stream_id] = TransformPlan(stream_catalog, compiled)
+    return plan
+
+def transform_record(stream_catalog, record):
+    """
+    Transform a record through the transform plan of its stream.
+    """
+    return get_transform_plan(stream_catalog).transform(record)
+
+def log_transform_counters(stream_ids):
+    """
+    Log the transform counters of the streams.
+    """
+    for stream_id in stream_ids:
+        if stream_id in TRANSFORM_PLANS:
+            TRANSFORM_PLANS[stream_id].log_counters()
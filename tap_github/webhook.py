@@ -0,0 +1,189 @@
+import hashlib
+import hmac
+import json
+import queue
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import singer
+from tap_github.daemon import Daemon
+from tap_github.streams import STREAMS, get_schema, get_stream_graph, write_record
+from tap_github.sync import write_schemas
+from tap_github.transform import transform_record
+
+LOGGER = singer.get_logger()
+
+DEFAULT_WEBHOOK_HOST = '0.0.0.0'
+DEFAULT_WEBHOOK_PORT = 8080
+# Seconds between two reconciliation polls of the streams delivered by the webhooks
+DEFAULT_RECONCILE_INTERVAL = 60 * 60
+
+# Webhook event and the key of its payload holding the record of the stream
+WEBHOOK_STREAMS = {
+    'issues': ('issues', 'issue'),
+    'pull_request': ('pull_requests', 'pull_request'),
+    'workflow_run': ('workflow_runs', 'workflow_run'),
+}
+
+def get_signature(secret, body):
+    """
+    Return the `X-Hub-Signature-256` header of a delivery signed with the secret.
+    """
+    return 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+def is_valid_signature(secret, body, signature):
+    """
+    Verify the signature of a delivery in constant time.
+    """
+    return bool(signature) and hmac.compare_digest(get_signature(secret, body), signature)
+
+class WebhookReceiver:
+    """
+    Receive the GitHub webhook deliveries on a local HTTP server and queue the verified ones.
+    The deliveries are only queued by the server threads, the records are written by the main thread.
+    """
+    def __init__(self, secret, host=DEFAULT_WEBHOOK_HOST, port=DEFAULT_WEBHOOK_PORT):
+        self.secret = secret
+        self.deliveries = queue.Queue()
+        self.server = ThreadingHTTPServer((host, port), self.get_handler())
+        self.thread = None
+
+    @property
+    def port(self):
+        """
+        Return the port of the server, useful when it is bound to a free port.
+        """
+        return self.server.server_address[1]
+
+    def get_handler(self):
+        """
+        Return the request handler class of the receiver.
+        """
+        receiver = self
+
+        class WebhookHandler(BaseHTTPRequestHandler):
+            def do_POST(self): # pylint: disable=invalid-name
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if not is_valid_signature(receiver.secret, body, self.headers.get('X-Hub-Signature-256')):
+                    LOGGER.warning("Rejected a webhook delivery with an invalid signature.")
+                    self.send_response(401)
+                    self.end_headers()
+                    return
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+                receiver.deliveries.put((self.headers.get('X-GitHub-Event'), payload))
+                self.send_response(202)
+                self.end_headers()
+
+            def log_message(self, format, *args): # pylint: disable=redefined-builtin
+                LOGGER.debug("Webhook receiver: " + format, *args)
+
+        return WebhookHandler
+
+    def start(self):
+        """
+        Serve the deliveries in a background thread.
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        LOGGER.info("Receiving the webhook deliveries on port %d.", self.port)
+
+    def stop(self):
+        """
+        Stop the server.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+class WebhookDaemon(Daemon):
+    """
+    Write the records of the webhook deliveries as they arrive and poll the streams delivered by the webhooks
+    only every `webhook_reconcile_interval` seconds to reconcile the missed deliveries.
+    The deliveries do not advance the bookmarks, so the reconciliation polls fetch every change since the last poll.
+    """
+    def __init__(self, client, config, state, catalog, receiver):
+        super().__init__(client, config, state, catalog)
+        self.receiver = receiver
+        self.reconcile_interval = float(config.get('webhook_reconcile_interval', DEFAULT_RECONCILE_INTERVAL))
+        self.webhook_stream_ids = {stream_id for stream_id, _ in WEBHOOK_STREAMS.values()}
+
+    def get_interval(self, stream_id):
+        """
+        Return the reconciliation interval of the streams delivered by the webhooks and the poll interval of the others.
+        """
+        if stream_id in self.webhook_stream_ids and stream_id not in self.stream_intervals:
+            return self.reconcile_interval
+        return super().get_interval(stream_id)
+
+    def wait(self, timeout):
+        """
+        Write the records of the deliveries until the next unit is due or the daemon is stopped.
+        """
+        deadline = time.monotonic() + max(0, timeout)
+        while not self.stop_event.is_set():
+            try:
+                event, payload = self.receiver.deliveries.get(timeout=max(0, min(1, deadline - time.monotonic())))
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    return
+                continue
+            self.write_delivery(event, payload)
+            if time.monotonic() >= deadline:
+                return
+
+    def write_delivery(self, event, payload):
+        """
+        Map the record of a delivery through the schema of its stream and write it with its children from the payload.
+        """
+        if event not in WEBHOOK_STREAMS:
+            LOGGER.debug("Ignoring the webhook event %s.", event)
+            return
+        stream_id, record_key = WEBHOOK_STREAMS[event]
+        repo_path = (payload.get('repository') or {}).get('full_name')
+        record = payload.get(record_key)
+        if not record or (repo_path, stream_id) not in self.units or stream_id not in self.streams_to_sync:
+            return
+
+        stream_obj = STREAMS[stream_id]()
+        write_schemas(stream_id, self.catalog, self.selected_stream_ids)
+        extraction_time = singer.utils.now()
+        record['_sdc_repository'] = repo_path
+        stream_obj.add_fields_at_1st_level(record = record, parent_record = None)
+        if stream_id in self.selected_stream_ids:
+            rec = transform_record(get_schema(self.catalog['streams'], stream_id), record)
+            write_record(stream_id, rec, extraction_time)
+
+        # Only the children built from the parent record are written, the others are fetched by the reconciliation polls.
+        graph = get_stream_graph(self.catalog['streams'], self.selected_stream_ids)
+        children = {child for child in stream_obj.children if STREAMS[child].no_path and child in self.streams_to_sync}
+        for child in children:
+            parent_id = graph[child].get_id(record)
+            stream_obj.get_child_records(self.client, self.catalog['streams'], child, parent_id, repo_path, self.state,
+                                         self.start_date, record.get(stream_obj.replication_keys), children,
+                                         self.selected_stream_ids, parent_record = record)
+
+    def stop(self, *_):
+        """
+        Stop the receiver and the daemon.
+        """
+        super().stop()
+        self.receiver.stop()
+
+def run_webhook(client, config, state, catalog):
+    """
+    Receive the webhook deliveries and reconcile with polls until SIGTERM or SIGINT.
+    """
+    if not config.get('webhook_secret'):
+        raise ValueError("The webhook mode requires a `webhook_secret` to verify the signature of the deliveries.")
+    receiver = WebhookReceiver(config['webhook_secret'], config.get('webhook_host', DEFAULT_WEBHOOK_HOST),
+                               int(config.get('webhook_port', DEFAULT_WEBHOOK_PORT)))
+    daemon = WebhookDaemon(client, config, state, catalog, receiver)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    receiver.start()
+    daemon.run()
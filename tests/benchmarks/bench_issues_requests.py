@@ -0,0 +1,85 @@
+"""
+Benchmark the requests of the issues and their labels and assignees synced from the REST API and from the GraphQL API,
+for a repository whose updated issues are outnumbered by its updated pull requests.
+
+    PYTHONPATH=. python tests/benchmarks/bench_issues_requests.py
+"""
+import json
+import logging
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+import requests
+from tap_github.client import GithubClient
+from tap_github.streams import Issues
+
+ISSUES = 2000
+PULL_REQUESTS = 3000
+LABELS = 30
+PER_PAGE = 100
+START_DATE = "2022-01-01T00:00:00Z"
+STREAMS = ["issues", "issue_labels", "issue_assignees"]
+
+def get_updated_at(number):
+    return "2022-{:02d}-{:02d}T00:00:00Z".format(1 + number // 1000 % 12, 1 + number % 28)
+
+def get_response(data, next_url = None):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(data).encode("utf-8") # pylint: disable=protected-access
+    response.headers["X-RateLimit-Remaining"] = "5000"
+    response.headers["X-RateLimit-Reset"] = "0"
+    if next_url:
+        response.headers["Link"] = '<{}>; rel="next"'.format(next_url)
+    return response
+
+def get_rest_issue(number):
+    """An issue of the REST API, the pull requests being listed with the issues."""
+    issue = {"id": number, "number": number, "updated_at": get_updated_at(number), "labels": [{"id": number % LABELS, "name": str(number % LABELS)}],
+             "assignees": [{"id": 1, "login": "user"}]}
+    if number >= ISSUES:
+        issue["pull_request"] = {"url": "https://api.github.com/repos/org/repo/pulls/{}".format(number)}
+    return issue
+
+def get_graphql_issue(number):
+    return {"id": "I_{}".format(number), "databaseId": number, "number": number, "updatedAt": get_updated_at(number),
+            "labels": {"nodes": [{"name": str(number % LABELS)}], "pageInfo": {"hasNextPage": False}},
+            "assignees": {"nodes": [{"login": "user", "databaseId": 1}], "pageInfo": {"hasNextPage": False}}}
+
+def fake_request(self, method, url, json = None, **kwargs): # pylint: disable=redefined-outer-name,unused-argument
+    """Answer the requests of the client from a repository of issues and pull requests."""
+    parsed = urlparse(url)
+    if method == "post":
+        page_size, cursor = json["variables"]["pageSize"], int(json["variables"]["cursor"] or 0)
+        nodes = [get_graphql_issue(number) for number in range(cursor, min(cursor + page_size, ISSUES))]
+        has_next = cursor + page_size < ISSUES
+        return get_response({"data": {"rateLimit": {"cost": 1, "remaining": 5000, "resetAt": START_DATE},
+                                      "repository": {"issues": {"nodes": nodes, "pageInfo": {"hasNextPage": has_next, "endCursor": str(cursor + page_size)}}}}})
+    page = int(parse_qs(parsed.query).get("page", ["1"])[0])
+    total = LABELS if parsed.path.endswith("/labels") else ISSUES + PULL_REQUESTS
+    if parsed.path.endswith("/labels"):
+        records = [{"id": number, "name": str(number)} for number in range((page - 1) * PER_PAGE, min(page * PER_PAGE, total))]
+    else:
+        records = [get_rest_issue(number) for number in range((page - 1) * PER_PAGE, min(page * PER_PAGE, total))]
+    next_url = "{}&page={}".format(url.split("&page=")[0], page + 1) if page * PER_PAGE < total else None
+    return get_response(records, next_url)
+
+def count_requests(config):
+    """Return the requests of a sync of the issues and the records written."""
+    client = GithubClient({"access_token": "", "repository": "org/repo"})
+    with mock.patch("requests.Session.request", fake_request), \
+         mock.patch("tap_github.streams.get_schema", return_value = {"schema": {}, "metadata": {}}), \
+         mock.patch("singer.write_record") as mock_write_record, mock.patch("singer.write_state"), mock.patch("singer.metrics.log"):
+        Issues().sync_endpoint(client, {}, [], "org/repo", START_DATE, STREAMS, STREAMS, config)
+    written = sum(1 for call in mock_write_record.call_args_list if call[0][0] == "issues")
+    return client.request_count, written
+
+def main():
+    logging.disable(logging.INFO)
+    print("{} issues and {} pull requests updated since the bookmark".format(ISSUES, PULL_REQUESTS))
+    for name, config in [("REST", {}), ("GraphQL", {"issues_backend": "graphql"})]:
+        request_count, written = count_requests(config)
+        print("{:<10} {:>6} requests {:>8} issues written".format(name, request_count, written))
+    print("The issues of the REST API include the pull requests, the GraphQL requests include the labels of the repository.")
+
+if __name__ == "__main__":
+    main()
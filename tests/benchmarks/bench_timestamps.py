@@ -0,0 +1,46 @@
+"""
+Benchmark the per record cost of the bookmark comparisons and of the date ranges.
+
+    PYTHONPATH=. python tests/benchmarks/bench_timestamps.py
+"""
+import timeit
+from datetime import datetime, timedelta
+import singer
+from tap_github.streams import DATE_FORMAT, get_date_ranges
+from tap_github.timestamps import BookmarkTime
+
+NUMBER = 100000
+UPDATED_AT = "2022-06-01T10:20:30Z"
+BOOKMARK = "2022-01-01T00:00:00Z"
+
+def get_date_ranges_strptime(start_date, end_date, date_range_window = 7):
+    """The date ranges with a round trip through `strptime` and `strftime`."""
+    start_date = datetime.strptime(start_date, DATE_FORMAT)
+    end_date = datetime.strptime(end_date, DATE_FORMAT)
+    while start_date < end_date:
+        temp_end_date = start_date + timedelta(days=date_range_window)
+        yield start_date.strftime(DATE_FORMAT), temp_end_date.strftime(DATE_FORMAT)
+        start_date = temp_end_date
+
+def report(name, seconds, number = NUMBER):
+    print("{:<45} {:>10.0f} ns per record".format(name, seconds / number * 1e9))
+
+def main():
+    bookmark_time = singer.utils.strptime_to_utc(BOOKMARK)
+    report("strptime_to_utc comparison", timeit.timeit(lambda: singer.utils.strptime_to_utc(UPDATED_AT) < bookmark_time, number = NUMBER))
+
+    bookmark = BookmarkTime(BOOKMARK)
+    report("BookmarkTime canonical comparison", timeit.timeit(lambda: bookmark.is_after(UPDATED_AT), number = NUMBER))
+
+    fraction_bookmark = BookmarkTime("2022-01-01T00:00:00.000000Z")
+    report("BookmarkTime fallback comparison", timeit.timeit(lambda: fraction_bookmark.is_after(UPDATED_AT), number = NUMBER))
+
+    # Date ranges of 10 years of weekly windows, per window
+    windows = len(list(get_date_ranges("2012-01-01T00:00:00Z", "2022-01-01T00:00:00Z")))
+    report("get_date_ranges strptime/strftime, per window",
+           timeit.timeit(lambda: list(get_date_ranges_strptime("2012-01-01T00:00:00Z", "2022-01-01T00:00:00Z")), number = 100), 100 * windows)
+    report("get_date_ranges, per window",
+           timeit.timeit(lambda: list(get_date_ranges("2012-01-01T00:00:00Z", "2022-01-01T00:00:00Z")), number = 100), 100 * windows)
+
+if __name__ == "__main__":
+    main()
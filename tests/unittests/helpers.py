@@ -0,0 +1,36 @@
+from unittest import mock
+
+class MockResponse():
+    """Mock response object class."""
+    def __init__(self, json_data, next_url=None, headers=None, last_page=None):
+        self.json_data = json_data
+        self.headers = headers or {}
+        self.links = {}
+        if next_url:
+            self.links["next"] = {"url": next_url}
+        if last_page:
+            self.links["last"] = {"url": "https://api.github.com/x?per_page=1&page={}".format(last_page)}
+
+    def json(self):
+        return self.json_data
+
+def interrupted_pages(pages):
+    """Yield the pages and raise an exception as if the sync was interrupted."""
+    yield from pages
+    raise Exception("Interrupted")
+
+def patch_sync(*targets):
+    """
+    Patch the state and the records written by a sync, the schemas of the catalog and the targets, usually the
+    requests of the client. The mocks are passed as with the decorators written in this order, the last target first.
+    """
+    patches = [mock.patch("singer.write_state"),
+               mock.patch("singer.write_record"),
+               mock.patch("tap_github.streams.get_schema", return_value = {"schema": {}, "metadata": {}})]
+    patches += [mock.patch(target) for target in targets]
+
+    def decorate(test):
+        for patch in reversed(patches):
+            test = patch(test)
+        return test
+    return decorate
@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+from tap_github import checkpoint
+from tap_github.checkpoint import StateCheckpointer
+
+@mock.patch("singer.write_state")
+class TestStateCheckpointer(unittest.TestCase):
+    """
+    Test `StateCheckpointer` coalesces the state updates according to the policy.
+    """
+
+    def test_every_update(self, mock_write_state):
+        """Verify that every state update is written with the default policy."""
+        checkpointer = StateCheckpointer()
+        for _ in range(3):
+            checkpointer.write_state({})
+
+        self.assertEqual(mock_write_state.call_count, 3)
+
+    def test_records_policy(self, mock_write_state):
+        """Verify that the state is written on the first update after the number of records."""
+        checkpointer = StateCheckpointer('records', every_records=10)
+        checkpointer.record_written(5)
+        checkpointer.write_state({"a": 1})
+        self.assertFalse(mock_write_state.called)
+
+        checkpointer.record_written(5)
+        checkpointer.write_state({"a": 2})
+        mock_write_state.assert_called_once_with({"a": 2})
+
+        # Verify the record count restarts after the checkpoint
+        checkpointer.record_written(5)
+        checkpointer.write_state({"a": 3})
+        self.assertEqual(mock_write_state.call_count, 1)
+
+    @mock.patch("time.monotonic")
+    def test_seconds_policy(self, mock_monotonic, mock_write_state):
+        """Verify that the state is written on the first update after the number of seconds."""
+        mock_monotonic.return_value = 100
+        checkpointer = StateCheckpointer('seconds', every_seconds=60)
+
+        mock_monotonic.return_value = 130
+        checkpointer.write_state({})
+        self.assertFalse(mock_write_state.called)
+
+        mock_monotonic.return_value = 160
+        checkpointer.write_state({})
+        self.assertEqual(mock_write_state.call_count, 1)
+
+    def test_stream_end_policy(self, mock_write_state):
+        """Verify that only the forced state updates are written at stream end and the pending update is flushed."""
+        checkpointer = StateCheckpointer('stream_end')
+        checkpointer.write_state({})
+        checkpointer.record_written(10000)
+        checkpointer.write_state({})
+        self.assertFalse(mock_write_state.called)
+
+        checkpointer.write_state({"end": True}, force=True)
+        mock_write_state.assert_called_once_with({"end": True})
+
+        # Verify flush writes only the pending update
+        checkpointer.flush({})
+        self.assertEqual(mock_write_state.call_count, 1)
+        checkpointer.write_state({"last": True})
+        checkpointer.flush({"last": True})
+        mock_write_state.assert_called_with({"last": True})
+
+    def test_invalid_policy(self, mock_write_state):
+        """Verify that an invalid policy raises an error."""
+        with self.assertRaises(ValueError):
+            StateCheckpointer('sometimes')
+
+    def test_configure(self, mock_write_state):
+        """Verify that the policy is configured from the config."""
+        checkpoint.configure({"state_checkpoint_policy": "records", "state_checkpoint_records": "50"})
+        self.assertEqual(checkpoint.CHECKPOINTER.policy, "records")
+        self.assertEqual(checkpoint.CHECKPOINTER.every_records, 50)
+        checkpoint.configure({})
+        self.assertEqual(checkpoint.CHECKPOINTER.policy, "every_update")
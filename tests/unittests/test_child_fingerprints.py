@@ -0,0 +1,70 @@
+import unittest
+from tap_github.client import GithubClient
+from tap_github.streams import PullRequests, get_fingerprint, prune_child_fingerprints, write_child_fingerprint
+from helpers import MockResponse, patch_sync
+
+@patch_sync("tap_github.client.GithubClient.authed_get_all_pages")
+class TestChildFingerprints(unittest.TestCase):
+    """
+    Test that the children of a pull request are only fetched again when its fingerprint moved.
+    """
+    client = GithubClient({"access_token": "", "repository": "org/repo"})
+
+    def sync_child(self, state, child, parent_record):
+        PullRequests().get_child_records(self.client, [], child, (parent_record["number"],), "org/repo", state, "2022-01-01T00:00:00Z",
+                                         None, [child], [child], parent_record = parent_record)
+
+    def test_pr_commits_skipped_for_same_head(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the commits of a pull request are fetched again only when its head moved."""
+        mock_authed_get_all_pages.side_effect = lambda *args, **kwargs: [MockResponse(
+            [{"sha": "abc", "commit": {"committer": {"date": "2022-01-02T00:00:00Z"}}}])]
+        state = {}
+        pull_request = {"id": 10, "number": 1, "head": {"sha": "abc"}, "updated_at": "2022-01-02T00:00:00Z"}
+
+        self.sync_child(state, "pr_commits", pull_request)
+        # A label changed the pull request but not its head.
+        self.sync_child(state, "pr_commits", dict(pull_request, updated_at = "2022-01-03T00:00:00Z"))
+        self.assertEqual(mock_authed_get_all_pages.call_count, 1)
+        self.assertEqual(state["child_fingerprints"]["org/repo"]["1"]["pr_commits"], get_fingerprint(pull_request, [["head", "sha"], ["commits"]]))
+
+        self.sync_child(state, "pr_commits", dict(pull_request, head = {"sha": "def"}))
+        self.assertEqual(mock_authed_get_all_pages.call_count, 2)
+
+    def test_unknown_fingerprint_fetched(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the commits are always fetched when the pull request has no head, and the review comments always."""
+        mock_authed_get_all_pages.side_effect = lambda *args, **kwargs: [MockResponse([])]
+        state = {}
+        pull_request = {"id": 10, "number": 1, "review_comments": 3}
+
+        for child in ["pr_commits", "pr_commits", "review_comments", "review_comments"]:
+            self.sync_child(state, child, pull_request)
+        self.assertEqual(mock_authed_get_all_pages.call_count, 4)
+        self.assertNotIn("child_fingerprints", state)
+
+    def test_fingerprint_not_written_on_failure(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the fingerprint is only saved once the records of the child are fetched."""
+        mock_authed_get_all_pages.side_effect = Exception("Interrupted")
+        state = {}
+        with self.assertRaises(Exception):
+            self.sync_child(state, "pr_commits", {"id": 10, "number": 1, "head": {"sha": "abc"}})
+        self.assertNotIn("child_fingerprints", state)
+
+class TestPruneChildFingerprints(unittest.TestCase):
+    """
+    Test that only the fingerprints of the pull requests updated since the bookmark are kept.
+    """
+
+    def test_prune(self):
+        """Verify that the fingerprints of the pull requests updated before the bookmark are dropped."""
+        state = {}
+        write_child_fingerprint(state, "org/repo", "1", "pr_commits", "abc", "2022-01-01T00:00:00Z")
+        write_child_fingerprint(state, "org/repo", "2", "pr_commits", "def", "2022-01-03T00:00:00Z")
+        write_child_fingerprint(state, "org/other", "1", "pr_commits", "abc", "2022-01-01T00:00:00Z")
+
+        prune_child_fingerprints(state, "org/repo", "2022-01-02T00:00:00Z")
+
+        self.assertEqual(list(state["child_fingerprints"]["org/repo"]), ["2"])
+        self.assertIn("org/other", state["child_fingerprints"])
+
+        prune_child_fingerprints(state, "org/repo", "2022-01-04T00:00:00Z")
+        self.assertNotIn("org/repo", state["child_fingerprints"])
@@ -1,7 +1,7 @@
 import unittest
 from unittest import mock
 from tap_github.sync import (update_currently_syncing_repo, update_currently_syncing,
-                             get_ordered_stream_list, get_ordered_repos)
+                             get_ordered_stream_list, get_ordered_repos, update_sync_stats)
 
 class TestGetOrderedStreamList(unittest.TestCase):
     """
@@ -70,6 +70,36 @@ class TestGetOrderedRepos(unittest.TestCase):
         # Verify with expected ordered list of repos
         self.assertEqual(final_repo_list, self.repo_list)
 
+    def test_longest_repo_first(self):
+        """Test the repos are ordered by the historical duration with the most expensive repo first."""
+        state = {}
+        update_sync_stats(state, "org/repo2", "issues", 10, 5)
+        update_sync_stats(state, "org/repo4", "issues", 50, 20)
+        update_sync_stats(state, "org/repo4", "commits", 20, 10)
+        update_sync_stats(state, "org/repo5", "commits", 30, 2)
+        final_repo_list = get_ordered_repos(state, self.repo_list)
+
+        # Verify repos with stats are ordered by duration, repos without stats keep their order
+        self.assertEqual(final_repo_list, ["org/repo4", "org/repo5", "org/repo2", "org/repo1", "org/repo3"])
+
+    def test_longest_repo_first_for_selected_streams(self):
+        """Test only the stats of the streams to sync are considered."""
+        state = {}
+        update_sync_stats(state, "org/repo2", "issues", 10, 5)
+        update_sync_stats(state, "org/repo4", "commits", 50, 20)
+        final_repo_list = get_ordered_repos(state, self.repo_list, {"issues"})
+
+        self.assertEqual(final_repo_list, ["org/repo2", "org/repo1", "org/repo3", "org/repo4", "org/repo5"])
+
+    def test_resume_with_longest_repo_first(self):
+        """Test the interrupted repo is synced first and the remaining repos follow the longest job first order."""
+        state = {"currently_syncing_repo": "org/repo3"}
+        update_sync_stats(state, "org/repo4", "issues", 50, 20)
+        update_sync_stats(state, "org/repo3", "issues", 20, 10)
+        final_repo_list = get_ordered_repos(state, self.repo_list)
+
+        self.assertEqual(final_repo_list, ["org/repo3", "org/repo1", "org/repo2", "org/repo5", "org/repo4"])
+
 @mock.patch("tap_github.sync.update_currently_syncing")
 class TestUpdateCurrentlySyncingRepo(unittest.TestCase):
 
@@ -0,0 +1,102 @@
+import unittest
+from unittest import mock
+from tap_github.client import Server5xxError
+from tap_github.daemon import Daemon
+
+def get_stream_catalog(stream_name, is_selected = False):
+    """Return catalog for stream"""
+    return {"schema": {}, "tap_stream_id": stream_name, "key_properties": [],
+            "metadata": [{"breadcrumb": [], "metadata": {"selected": is_selected}}]}
+
+def get_client(repositories, organizations = set()):
+    """Return a mock client for the repositories."""
+    client = mock.Mock()
+    client.extract_repos_from_config.return_value = (repositories, organizations)
+    client.not_accessible_repos = set()
+    client.request_count = 0
+    return client
+
+@mock.patch("singer.write_state")
+@mock.patch("tap_github.daemon.do_sync")
+class TestDaemon(unittest.TestCase):
+    """
+    Test the daemon polls the (repository, stream) units on their intervals.
+    """
+
+    catalog = {"streams": [get_stream_catalog("issues", True), get_stream_catalog("commits", True),
+                           get_stream_catalog("reviews", True), get_stream_catalog("pull_requests")]}
+
+    def get_daemon(self, client, state = {}, **config):
+        config = {"start_date": "2019-01-01T00:00:00Z", "daemon_poll_interval": 0, **config}
+        return Daemon(client, config, dict(state), self.catalog)
+
+    def get_polled_units(self, mock_do_sync):
+        return [(call[0][6], min(call[0][1] - {"reviews"})) for call in mock_do_sync.call_args_list]
+
+    def test_units_polled_in_turn(self, mock_do_sync, mock_write_state):
+        """Verify that each unit is synced with the selected children and polled again after its interval."""
+        daemon = self.get_daemon(get_client(["org/repo1", "org/repo2"]))
+        daemon.run(max_polls = 8)
+
+        units = self.get_polled_units(mock_do_sync)
+        self.assertEqual(len(units), 8)
+        # Verify all the 6 units are polled once before any unit is polled again
+        self.assertEqual(len(set(units[:6])), 6)
+        self.assertEqual(units[6:], units[:2])
+        # Verify the selected child stream is synced with its parent
+        self.assertIn("reviews", mock_do_sync.call_args_list[0][0][1])
+
+    def test_stream_interval(self, mock_do_sync, mock_write_state):
+        """Verify that a unit with a longer interval is not polled again before it is due."""
+        daemon = self.get_daemon(get_client(["org/repo1"]), daemon_stream_intervals = {"commits": 3600})
+        daemon.run(max_polls = 6)
+
+        units = self.get_polled_units(mock_do_sync)
+        self.assertEqual(units.count(("org/repo1", "commits")), 1)
+        self.assertEqual(units.count(("org/repo1", "issues")), 3)
+
+    def test_interrupted_unit_first(self, mock_do_sync, mock_write_state):
+        """Verify that the unit interrupted in the previous run is polled first."""
+        state = {"currently_syncing_repo": "org/repo2", "currently_syncing": "issues"}
+        daemon = self.get_daemon(get_client(["org/repo1", "org/repo2"]), state)
+        daemon.run(max_polls = 1)
+
+        self.assertEqual(self.get_polled_units(mock_do_sync), [("org/repo2", "issues")])
+
+    def test_removed_repository_dropped(self, mock_do_sync, mock_write_state):
+        """Verify that the units of a repository removed from the organization are not polled after the refresh."""
+        client = get_client(["org/repo1", "org/repo2"])
+        daemon = self.get_daemon(client, daemon_repo_refresh_interval = 0)
+        client.extract_repos_from_config.side_effect = [(["org/repo1", "org/repo2"], set())] + [(["org/repo1"], set())] * 10
+        daemon.run(max_polls = 6)
+
+        units = self.get_polled_units(mock_do_sync)
+        self.assertTrue(all(repo == "org/repo1" for repo, _ in units[1:]))
+        client.extract_repos_from_config.assert_called_with(refresh = True)
+
+    def test_retryable_error(self, mock_do_sync, mock_write_state):
+        """Verify that a server error does not stop the daemon and the unit is polled again."""
+        mock_do_sync.side_effect = [Server5xxError("Server error"), None, None, None]
+        daemon = self.get_daemon(get_client(["org/repo1"]), daemon_stream_intervals = {"issues": 3600, "pull_requests": 3600})
+        daemon.run(max_polls = 4)
+
+        self.assertEqual(self.get_polled_units(mock_do_sync).count(("org/repo1", "commits")), 2)
+
+    def test_stop(self, mock_do_sync, mock_write_state):
+        """Verify that the daemon stops after the unit being synced and writes the state."""
+        daemon = self.get_daemon(get_client(["org/repo1"]))
+        mock_do_sync.side_effect = lambda *args: daemon.stop()
+        daemon.run()
+
+        self.assertEqual(mock_do_sync.call_count, 1)
+        self.assertNotIn("currently_syncing_repo", mock_write_state.mock_calls[-1][1][0])
+
+    def test_repository_stream_unit(self, mock_do_sync, mock_write_state):
+        """Verify that the review comments synced from the repository endpoint are a unit of their own and not synced with the other units."""
+        catalog = {"streams": self.catalog["streams"] + [get_stream_catalog("review_comments", True)]}
+        config = {"start_date": "2019-01-01T00:00:00Z", "daemon_poll_interval": 0, "review_comments_mode": "repository"}
+        Daemon(get_client(["org/repo1"]), config, {}, catalog).run(max_polls = 4)
+
+        units = [(call[0][6], call[0][1]) for call in mock_do_sync.call_args_list]
+        self.assertIn(("org/repo1", {"review_comments", "reviews"}), units)
+        self.assertEqual(sum(1 for _, streams in units if "review_comments" in streams), 1)
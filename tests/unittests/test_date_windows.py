@@ -0,0 +1,184 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from tap_github.client import GithubClient
+from tap_github.streams import DateWindows, WorkflowRuns
+from helpers import MockResponse, patch_sync
+
+class TestDateWindows(unittest.TestCase):
+    """
+    Test the sizes of the adaptive date windows.
+    """
+
+    def test_fixed_windows(self):
+        """Verify that the windows keep their size when they are not adaptive and the last one ends at the end date."""
+        windows = DateWindows("2022-01-01T00:00:00Z", "2022-01-20T00:00:00Z", 7, adaptive = False)
+        ranges = []
+        for window in windows:
+            ranges.append(window)
+            windows.update(0)
+        self.assertEqual(ranges, [("2022-01-01T00:00:00Z", "2022-01-08T00:00:00Z"),
+                                  ("2022-01-08T00:00:00Z", "2022-01-15T00:00:00Z"),
+                                  ("2022-01-15T00:00:00Z", "2022-01-20T00:00:00Z")])
+
+    def test_sparse_windows_widened(self):
+        """Verify that the window is doubled after the sparse windows."""
+        windows = DateWindows("2022-01-01T00:00:00Z", "2022-03-01T00:00:00Z", 7, adaptive = True, target_records = 100)
+        self.assertEqual(next(windows), ("2022-01-01T00:00:00Z", "2022-01-08T00:00:00Z"))
+        windows.update(0)
+        self.assertEqual(next(windows), ("2022-01-08T00:00:00Z", "2022-01-22T00:00:00Z"))
+        windows.update(10)
+        self.assertEqual(next(windows), ("2022-01-22T00:00:00Z", "2022-02-19T00:00:00Z"))
+
+    def test_dense_windows_shrunk(self):
+        """Verify that the window is halved after the dense windows and kept for the others."""
+        windows = DateWindows("2022-01-01T00:00:00Z", "2022-03-01T00:00:00Z", 8, adaptive = True, target_records = 100)
+        self.assertEqual(next(windows), ("2022-01-01T00:00:00Z", "2022-01-09T00:00:00Z"))
+        windows.update(101)
+        self.assertEqual(next(windows), ("2022-01-09T00:00:00Z", "2022-01-13T00:00:00Z"))
+        windows.update(50)
+        self.assertEqual(next(windows), ("2022-01-13T00:00:00Z", "2022-01-17T00:00:00Z"))
+
+    def test_bisect(self):
+        """Verify that the halves of a bisected window are iterated before the next windows."""
+        windows = DateWindows("2022-01-01T00:00:00Z", "2022-01-15T00:00:00Z", 4, adaptive = False)
+        self.assertEqual(next(windows), ("2022-01-01T00:00:00Z", "2022-01-05T00:00:00Z"))
+        self.assertTrue(windows.bisect("2022-01-01T00:00:00Z", "2022-01-05T00:00:00Z"))
+        self.assertEqual(next(windows), ("2022-01-01T00:00:00Z", "2022-01-03T00:00:00Z"))
+        self.assertTrue(windows.bisect("2022-01-01T00:00:00Z", "2022-01-03T00:00:00Z"))
+        self.assertEqual(list(windows), [("2022-01-01T00:00:00Z", "2022-01-02T00:00:00Z"),
+                                         ("2022-01-02T00:00:00Z", "2022-01-03T00:00:00Z"),
+                                         ("2022-01-03T00:00:00Z", "2022-01-05T00:00:00Z"),
+                                         ("2022-01-05T00:00:00Z", "2022-01-09T00:00:00Z"),
+                                         ("2022-01-09T00:00:00Z", "2022-01-13T00:00:00Z"),
+                                         ("2022-01-13T00:00:00Z", "2022-01-15T00:00:00Z")])
+
+    def test_bisect_one_second(self):
+        """Verify that a window of one second is not bisected."""
+        windows = DateWindows("2022-01-01T00:00:00Z", "2022-01-01T00:00:01Z")
+        self.assertFalse(windows.bisect("2022-01-01T00:00:00Z", "2022-01-01T00:00:01Z"))
+
+@patch_sync("tap_github.streams.datetime", "tap_github.client.GithubClient.authed_get_all_pages")
+class TestCappedWindows(unittest.TestCase):
+    """
+    Test the bisection of the workflow runs windows reaching the result cap.
+    """
+    config = {"access_token": "", "repository": "org/repo"}
+
+    def test_capped_window_bisected(self, mock_authed_get_all_pages, mock_datetime, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that a window reporting the result cap is synced from its halves and the bookmark is written after them."""
+        mock_datetime.today.return_value.strftime.return_value = "2022-01-03T00:00:00Z"
+
+        def get_pages(source, url, headers, stream):
+            if "2022-01-01T00:00:00Z..2022-01-03T00:00:00Z" in url:
+                return iter([MockResponse({"total_count": 1000, "workflow_runs": []})])
+            start = url.split("created=")[1][:20]
+            return iter([MockResponse({"total_count": 1, "workflow_runs": [{"id": start, "created_at": start}]})])
+        mock_authed_get_all_pages.side_effect = get_pages
+
+        state = {}
+        WorkflowRuns().sync_endpoint(GithubClient(self.config), state, [], "org/repo", "2022-01-01T00:00:00Z",
+                                     ["workflow_runs"], ["workflow_runs"], {"date_range_window": 7})
+
+        urls = [call[0][1] for call in mock_authed_get_all_pages.call_args_list]
+        self.assertEqual([url.split("created=")[1] for url in urls],
+                         ["2022-01-01T00:00:00Z..2022-01-03T00:00:00Z",
+                          "2022-01-01T00:00:00Z..2022-01-02T00:00:00Z",
+                          "2022-01-02T00:00:00Z..2022-01-03T00:00:00Z"])
+        self.assertEqual(mock_write_record.call_count, 2)
+        self.assertEqual(state["bookmarks"]["org/repo"]["workflow_runs"]["since"], "2022-01-02T00:00:00Z")
+
+    @mock.patch("tap_github.streams.DateWindows", return_value = [])
+    def test_config_parsed(self, mock_date_windows, mock_authed_get_all_pages, mock_datetime, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the adaptive windows are off by default and the string values of the config are parsed."""
+        mock_datetime.today.return_value.strftime.return_value = "2022-01-03T00:00:00Z"
+        for config, adaptive, target_records in [({}, False, 500),
+                                                 ({"date_range_adaptive": "false", "date_range_target_records": "100"}, False, 100),
+                                                 ({"date_range_adaptive": "true"}, True, 500),
+                                                 ({"date_range_adaptive": True}, True, 500)]:
+            WorkflowRuns().sync_endpoint(GithubClient(self.config), {}, [], "org/repo", "2022-01-01T00:00:00Z",
+                                         ["workflow_runs"], ["workflow_runs"], config)
+            self.assertEqual(mock_date_windows.call_args[0][3:], (adaptive, target_records))
+
+def get_window_pages(source, url, headers, stream):
+    """Return a page with a run created at the start of the window, the first window is interrupted."""
+    start = url.split("created=")[1][:20]
+    if start == "2022-01-03T00:00:00Z":
+        raise Exception("Interrupted")
+    return iter([MockResponse({"total_count": 1, "workflow_runs": [{"id": start, "created_at": start}]})])
+
+@patch_sync("tap_github.streams.datetime", "tap_github.client.GithubClient.authed_get_all_pages")
+class TestConcurrentWindows(unittest.TestCase):
+    """
+    Test the date windows fetched concurrently.
+    """
+    config = {"access_token": "", "repository": "org/repo"}
+
+    def sync(self, mock_datetime, config):
+        mock_datetime.today.return_value.strftime.return_value = "2022-01-06T00:00:00Z"
+        state = {}
+        config = dict(config, date_range_window = 1, date_range_adaptive = False, date_window_workers = 3)
+        WorkflowRuns().sync_endpoint(GithubClient(self.config), state, [], "org/repo", "2022-01-01T00:00:00Z",
+                                     ["workflow_runs"], ["workflow_runs"], config)
+        return state
+
+    def test_window_order(self, mock_authed_get_all_pages, mock_datetime, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the records are written in the order of the windows."""
+        mock_authed_get_all_pages.side_effect = lambda source, url, headers, stream: iter([MockResponse(
+            {"total_count": 1, "workflow_runs": [{"id": 1, "created_at": url.split("created=")[1][:20]}]})])
+
+        state = self.sync(mock_datetime, {})
+
+        self.assertEqual([call[0][1]["created_at"] for call in mock_write_record.call_args_list],
+                         ["2022-01-01T00:00:00Z", "2022-01-02T00:00:00Z", "2022-01-03T00:00:00Z", "2022-01-04T00:00:00Z", "2022-01-05T00:00:00Z"])
+        self.assertEqual(state["bookmarks"]["org/repo"]["workflow_runs"]["since"], "2022-01-05T00:00:00Z")
+
+    def test_bookmark_stops_at_interrupted_window(self, mock_authed_get_all_pages, mock_datetime, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the bookmark only covers the windows before the interrupted window in both emit orders."""
+        for emit_order in ["window", "completion"]:
+            mock_authed_get_all_pages.side_effect = get_window_pages
+            state = {}
+            with self.assertRaises(Exception):
+                state = self.sync(mock_datetime, {"date_window_emit_order": emit_order})
+            bookmarks = [call[0][0]["bookmarks"]["org/repo"]["workflow_runs"]["since"] for call in mock_write_state.call_args_list]
+            self.assertEqual(max(bookmarks), "2022-01-02T00:00:00Z")
+            mock_write_state.reset_mock()
+
+    def test_capped_window_bisected(self, mock_authed_get_all_pages, mock_datetime, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that a capped window is fetched from its halves and its records are written in order."""
+        def get_pages(source, url, headers, stream):
+            start, end = url.split("created=")[1].split("..")
+            if (start, end) == ("2022-01-02T00:00:00Z", "2022-01-03T00:00:00Z"):
+                return iter([MockResponse({"total_count": 1000, "workflow_runs": []})])
+            return iter([MockResponse({"total_count": 1, "workflow_runs": [{"id": start, "created_at": start}]})])
+        mock_authed_get_all_pages.side_effect = get_pages
+
+        state = self.sync(mock_datetime, {})
+
+        self.assertEqual([call[0][1]["created_at"] for call in mock_write_record.call_args_list],
+                         ["2022-01-01T00:00:00Z", "2022-01-02T00:00:00Z", "2022-01-02T12:00:00Z", "2022-01-03T00:00:00Z",
+                          "2022-01-04T00:00:00Z", "2022-01-05T00:00:00Z"])
+        self.assertEqual(state["bookmarks"]["org/repo"]["workflow_runs"]["since"], "2022-01-05T00:00:00Z")
+
+class TestConcurrentRequests(unittest.TestCase):
+    """
+    Test the client shared by the threads of the concurrent windows.
+    """
+
+    @mock.patch("requests.Session.request")
+    def test_shared_client(self, mock_request):
+        """Verify that the requests of the threads are all counted and that their headers are not kept in the session."""
+        responses = [mock.Mock(status_code = 200, headers = {"X-RateLimit-Remaining": str(remaining), "X-RateLimit-Reset": "100"})
+                     for remaining in range(1, 401)]
+        mock_request.side_effect = responses
+        client = GithubClient({"access_token": "", "repository": "org/repo"})
+
+        with ThreadPoolExecutor(max_workers = 8) as executor:
+            list(executor.map(lambda _: client.authed_get("stargazers", "https://api.github.com/x", {"Accept": "application/vnd.github.v3.star+json"}),
+                              range(400)))
+
+        self.assertEqual(client.request_count, 400)
+        # The lowest remaining requests of the window is kept whatever the order of the responses.
+        self.assertEqual(client.rate_limit_remaining, 1)
+        self.assertNotEqual(client.session.headers.get("Accept"), "application/vnd.github.v3.star+json")
+        self.assertEqual(mock_request.call_args[1]["headers"], {"Accept": "application/vnd.github.v3.star+json"})
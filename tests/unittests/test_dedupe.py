@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from tap_github.client import GithubClient
+from tap_github.dedupe import RecordDeduplicator
+from tap_github.streams import Commits
+from tap_github import dedupe
+
+class TestRecordDeduplicator(unittest.TestCase):
+    """
+    Test the deduplication of the records by key and attributes.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        dedupe.configure({})
+        shutil.rmtree(self.directory)
+
+    def test_same_attributes_dropped(self):
+        """Verify that a key is written again only when its attributes change."""
+        deduplicator = RecordDeduplicator()
+        self.assertTrue(deduplicator.should_write("commit_users_emails", ["email"], {"email": "a@example.com", "name": "A"}))
+        self.assertFalse(deduplicator.should_write("commit_users_emails", ["email"], {"email": "a@example.com", "name": "A"}))
+        self.assertTrue(deduplicator.should_write("commit_users_emails", ["email"], {"email": "a@example.com", "name": "B"}))
+        self.assertTrue(deduplicator.should_write("commit_users_emails", ["email"], {"email": "b@example.com", "name": "B"}))
+
+    def test_bounded_cache(self):
+        """Verify that the least recently written keys are evicted from the cache."""
+        deduplicator = RecordDeduplicator(max_size = 2)
+        for email in ["a", "b", "a", "c"]:
+            deduplicator.should_write("commit_users_emails", ["email"], {"email": email})
+        self.assertEqual(len(deduplicator.digests), 2)
+        # "b" was evicted and is written again, "a" was kept.
+        self.assertTrue(deduplicator.should_write("commit_users_emails", ["email"], {"email": "b"}))
+        self.assertFalse(deduplicator.should_write("commit_users_emails", ["email"], {"email": "c"}))
+
+    def test_persisted_digests(self):
+        """Verify that the digests written by a run deduplicate the records of the next run once its bookmark moved past them."""
+        path = os.path.join(self.directory, "digests.db")
+        deduplicator = RecordDeduplicator(max_size = 1, path = path)
+        deduplicator.should_write("commit_users_emails", ["email"], {"email": "a", "name": "A"}, "org/repo", "2022-01-02T00:00:00Z")
+        deduplicator.should_write("commit_users_emails", ["email"], {"email": "b", "name": "B"}, "org/repo", "2022-01-02T00:00:00Z")
+        # "a" is evicted from the cache and its digest is not confirmed by the bookmark the run started with.
+        self.assertTrue(deduplicator.should_write("commit_users_emails", ["email"], {"email": "a", "name": "A"}, "org/repo", "2022-01-02T00:00:00Z"))
+        deduplicator.close()
+
+        deduplicator = RecordDeduplicator(path = path, start_bookmarks = {("org/repo", "commit_users_emails"): "2022-01-03T00:00:00Z"})
+        self.assertFalse(deduplicator.should_write("commit_users_emails", ["email"], {"email": "b", "name": "B"}))
+        self.assertTrue(deduplicator.should_write("commit_users_emails", ["email"], {"email": "b", "name": "C"}))
+        deduplicator.close()
+
+    def test_unconfirmed_digests(self):
+        """Verify that the records of a run whose state was not confirmed are written again by the next run."""
+        path = os.path.join(self.directory, "digests.db")
+        deduplicator = RecordDeduplicator(path = path, start_bookmarks = {("org/repo", "commit_users_emails"): "2022-01-01T00:00:00Z"})
+        deduplicator.should_write("commit_users_emails", ["email"], {"email": "a", "name": "A"}, "org/repo", "2022-01-02T00:00:00Z")
+        deduplicator.close()
+
+        # The next run starts from the same bookmark, the target did not persist the records.
+        dedupe.configure({"record_digest_path": path}, {"bookmarks": {"org/repo": {"commit_users_emails": {"since": "2022-01-01T00:00:00Z"}}}})
+        self.assertTrue(dedupe.should_write("commit_users_emails", ["email"], {"email": "a", "name": "A"}, "org/repo", "2022-01-02T00:00:00Z"))
+        # The email is now written by this run.
+        self.assertFalse(dedupe.should_write("commit_users_emails", ["email"], {"email": "a", "name": "A"}, "org/repo", "2022-01-02T00:00:00Z"))
+
+    @mock.patch("singer.write_record")
+    @mock.patch("tap_github.streams.get_schema", return_value = {"schema": {}, "metadata": {}})
+    def test_user_emails_deduplicated(self, mock_get_schema, mock_write_record):
+        """Verify that the email of an author of several commits is written once, and once per commit when disabled."""
+        client = GithubClient({"access_token": "", "repository": "org/repo"})
+        for config, expected_records in [({}, 1), ({"record_dedupe_size": 0}, 3)]:
+            dedupe.configure(config)
+            mock_write_record.reset_mock()
+            for sha in ["a", "b", "c"]:
+                parent_record = {"sha": sha, "author_email": "a@example.com", "author_name": "A", "author_id": 1, "author_login": "a"}
+                Commits().get_child_records(client, [], "commit_users_emails", ("a@example.com",), "org/repo", {}, "2022-01-01T00:00:00Z",
+                                            None, ["commit_users_emails"], ["commit_users_emails"], parent_record = parent_record)
+            self.assertEqual(mock_write_record.call_count, expected_records)
@@ -0,0 +1,70 @@
+import unittest
+from unittest import mock
+from tap_github.client import GithubClient, NotModifiedError
+from tap_github.streams import Events
+from helpers import MockResponse, patch_sync
+
+@patch_sync("tap_github.client.GithubClient.authed_get")
+class TestEventsPolling(unittest.TestCase):
+    """
+    Test the polling of the events with the poll interval and the ETag of the API.
+    """
+    config = {"access_token": "", "repository": "org/repo"}
+
+    def sync(self, state):
+        return Events().sync_endpoint(GithubClient(self.config), state, [], "org/repo", "2022-01-01T00:00:00Z", ["events"], ["events"], {})
+
+    def test_stop_at_bookmark(self, mock_authed_get, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the pages stop at the first event created before the bookmark and that the ETag and the poll interval are saved."""
+        mock_authed_get.side_effect = [
+            MockResponse([{"id": 3, "created_at": "2022-01-05T00:00:00Z"}, {"id": 2, "created_at": "2022-01-04T00:00:00Z"}],
+                         "https://api.github.com/repos/org/repo/events?per_page=100&page=2", {"ETag": '"abc"', "X-Poll-Interval": "120"}),
+            MockResponse([{"id": 1, "created_at": "2022-01-02T00:00:00Z"}], "https://api.github.com/repos/org/repo/events?per_page=100&page=3"),
+        ]
+        state = {"bookmarks": {"org/repo": {"events": {"since": "2022-01-03T00:00:00Z"}}}}
+
+        state = self.sync(state)
+
+        self.assertEqual([call[0][1] for call in mock_authed_get.call_args_list],
+                         ["https://api.github.com/repos/org/repo/events?per_page=100", "https://api.github.com/repos/org/repo/events?per_page=100&page=2"])
+        self.assertEqual([call[0][1]["id"] for call in mock_write_record.call_args_list], [3, 2])
+        self.assertEqual(state["bookmarks"]["org/repo"]["events"]["since"], "2022-01-05T00:00:00Z")
+        self.assertEqual(state["event_feeds"]["org/repo"]["etag"], '"abc"')
+        self.assertEqual(state["event_feeds"]["org/repo"]["poll_interval"], 120)
+
+    def test_not_modified(self, mock_authed_get, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the ETag of the last poll is sent and that an unchanged feed writes nothing."""
+        mock_authed_get.side_effect = NotModifiedError("Not modified")
+        state = {"bookmarks": {"org/repo": {"events": {"since": "2022-01-03T00:00:00Z"}}},
+                 "event_feeds": {"org/repo": {"etag": '"abc"', "poll_interval": 60, "next_poll_at": "2022-01-01T00:00:00Z"}}}
+
+        state = self.sync(state)
+
+        self.assertEqual(mock_authed_get.call_args[0][2], {"If-None-Match": '"abc"'})
+        mock_write_record.assert_not_called()
+        self.assertEqual(state["bookmarks"]["org/repo"]["events"]["since"], "2022-01-03T00:00:00Z")
+        self.assertGreater(state["event_feeds"]["org/repo"]["next_poll_at"], "2022-01-01T00:00:00Z")
+
+    def test_poll_interval(self, mock_authed_get, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the events are not requested before the poll interval of the last poll has elapsed."""
+        state = {"event_feeds": {"org/repo": {"etag": '"abc"', "poll_interval": 60, "next_poll_at": "2999-01-01T00:00:00Z"}}}
+
+        self.sync(state)
+
+        mock_authed_get.assert_not_called()
+
+class TestConditionalRequest(unittest.TestCase):
+    """
+    Test the conditional requests of the client.
+    """
+
+    @mock.patch("requests.Session.request")
+    def test_etag_header_not_kept(self, mock_request):
+        """Verify that a 304 raises a `NotModifiedError` and that the ETag is not sent with the next requests."""
+        mock_request.return_value = mock.Mock(status_code = 304, json = lambda: {})
+        client = GithubClient({"access_token": "", "repository": "org/repo"})
+
+        with self.assertRaises(NotModifiedError):
+            client.get_if_modified("events", "https://api.github.com/repos/org/repo/events", '"abc"')
+
+        self.assertNotIn("If-None-Match", client.session.headers)
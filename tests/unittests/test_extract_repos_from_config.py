@@ -63,4 +63,19 @@ class TestExtractReposFromConfig(unittest.TestCase):
         mock_warn.assert_called_with(expected_message, ['singer-io/tap-github'])
 
         # Verify that extract_repos_from_config() returns repos without duplicates
-        self.assertEqual(sorted(expected_repos), sorted(actual_repos))
\ No newline at end of file
+        self.assertEqual(sorted(expected_repos), sorted(actual_repos))
+
+    def test_organization_repos_expanded_once(self, mocked_get_all_repos, mock_verify_access):
+        """
+        Verify that the organizations are expanded only once when the repositories are extracted again in the same run.
+        """
+        config = {'repository': 'singer-io/test-repo test-org/*', "access_token": "TOKEN"}
+        test_client = GithubClient(config)
+        mocked_get_all_repos.return_value = ['test-org/repo1']
+
+        first_repos, _ = test_client.extract_repos_from_config()
+        second_repos, _ = test_client.extract_repos_from_config()
+
+        # Verify that the second call returns the same repositories without listing the organization again
+        self.assertEqual(sorted(first_repos), sorted(second_repos))
+        self.assertEqual(mocked_get_all_repos.call_count, 1)
@@ -0,0 +1,127 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+from tap_github.client import GithubClient
+from tap_github.git_mirror import GitMirror, GitMirrorError, get_web_url
+from tap_github.streams import Commits
+
+def git(repo, *args, date="2022-01-01T00:00:00+02:00"):
+    """Run a git command in the repository with fixed author and committer."""
+    env = dict(os.environ, GIT_AUTHOR_NAME="Author", GIT_AUTHOR_EMAIL="author@example.com", GIT_AUTHOR_DATE=date,
+               GIT_COMMITTER_NAME="Committer", GIT_COMMITTER_EMAIL="committer@example.com", GIT_COMMITTER_DATE=date)
+    return subprocess.run(["git", "-C", repo] + list(args), env=env, check=True, stdout=subprocess.PIPE).stdout.decode().strip()
+
+def write_file(repo, filename, content):
+    with open(os.path.join(repo, filename), "w") as file:
+        file.write(content)
+
+@unittest.skipUnless(shutil.which("git"), "git is not installed")
+class TestGitMirror(unittest.TestCase):
+    """
+    Test the commits and the files read from a mirror of a local repository.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.origin = os.path.join(self.directory, "origin")
+        os.makedirs(self.origin)
+        git(self.origin, "init", "-q", "-b", "main")
+        write_file(self.origin, "a.txt", "1\n2\n")
+        git(self.origin, "add", "-A")
+        git(self.origin, "commit", "-q", "-m", "First\n\nBody")
+        self.mirror = GitMirror(os.path.join(self.directory, "cache"), "org/repo", clone_url=self.directory + "/origin")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_commit_record(self):
+        """Verify that the commits have the fields of the API."""
+        self.mirror.update()
+        (record, files), = list(self.mirror.get_commits())
+
+        sha = git(self.origin, "rev-parse", "HEAD")
+        self.assertEqual(record["sha"], sha)
+        self.assertEqual(record["url"], "https://api.github.com/repos/org/repo/commits/" + sha)
+        self.assertEqual(record["html_url"], "https://github.com/org/repo/commit/" + sha)
+        self.assertEqual(record["commit"]["message"], "First\n\nBody")
+        self.assertEqual(record["commit"]["author"], {"name": "Author", "email": "author@example.com", "date": "2021-12-31T22:00:00Z"})
+        self.assertEqual(record["commit"]["committer"]["date"], "2021-12-31T22:00:00Z")
+        self.assertEqual(record["parents"], [])
+        self.assertEqual(files[0]["filename"], "a.txt")
+        self.assertEqual(files[0]["status"], "added")
+        self.assertEqual((files[0]["additions"], files[0]["deletions"], files[0]["changes"]), (2, 0, 2))
+
+    def test_incremental_fetch(self):
+        """Verify that the new commits are fetched into the mirror and only the commits since the bookmark are read."""
+        self.mirror.update()
+        git(self.origin, "mv", "a.txt", "b.txt")
+        write_file(self.origin, "b.txt", "1\n2\n3\n")
+        write_file(self.origin, "c d.txt", "x\n")
+        git(self.origin, "add", "-A")
+        git(self.origin, "commit", "-q", "-m", "Second", date="2022-02-01T00:00:00Z")
+        self.mirror.update()
+
+        (record, files), = list(self.mirror.get_commits("2022-01-15T00:00:00Z"))
+
+        self.assertEqual(record["commit"]["message"], "Second")
+        self.assertEqual(record["parents"][0]["sha"], git(self.origin, "rev-parse", "HEAD~1"))
+        files = {file["filename"]: file for file in files}
+        self.assertEqual(files["b.txt"]["status"], "renamed")
+        self.assertEqual(files["b.txt"]["previous_filename"], "a.txt")
+        self.assertEqual(files["b.txt"]["additions"], 1)
+        self.assertEqual(files["c d.txt"]["status"], "added")
+        self.assertEqual(files["c d.txt"]["raw_url"], "https://github.com/org/repo/raw/{}/c%20d.txt".format(record["sha"]))
+
+    def test_clone_failure(self):
+        """Verify that a failed clone raises a `GitMirrorError`."""
+        mirror = GitMirror(os.path.join(self.directory, "cache"), "org/missing", clone_url=self.directory + "/missing")
+        with self.assertRaises(GitMirrorError):
+            mirror.update()
+
+    def test_web_url(self):
+        """Verify the web url of github.com and of a GitHub Enterprise instance."""
+        self.assertEqual(get_web_url("https://api.github.com"), "https://github.com")
+        self.assertEqual(get_web_url("https://github.example.com/api/v3"), "https://github.example.com")
+
+    @mock.patch("singer.write_state")
+    @mock.patch("singer.write_record")
+    @mock.patch("tap_github.streams.get_schema", return_value = {"schema": {}, "metadata": {}})
+    @mock.patch("tap_github.client.GithubClient.authed_get_all_pages")
+    def test_sync_from_mirror(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the commits, their parents and their files are written from the mirror without API calls."""
+        git(self.origin, "rm", "-q", "a.txt")
+        git(self.origin, "commit", "-q", "-m", "Second", date="2022-02-01T00:00:00Z")
+        config = {"cache_dir": os.path.join(self.directory, "cache"), "git_clone_url": self.directory + "/origin"}
+        state = {}
+
+        Commits().sync_endpoint(GithubClient({"access_token": "", "repository": "org/repo"}), state, [], "org/repo", "2022-01-15T00:00:00Z",
+                                ["commits", "commit_parents", "commit_files"], ["commits", "commit_parents", "commit_files"], config)
+
+        mock_authed_get_all_pages.assert_not_called()
+        records = [(call[0][0], call[0][1]) for call in mock_write_record.call_args_list]
+        sha = git(self.origin, "rev-parse", "HEAD")
+        self.assertEqual([stream for stream, _ in records], ["commits", "commit_parents", "commit_files"])
+        self.assertEqual(records[0][1]["sha"], sha)
+        self.assertEqual(records[1][1]["children_sha"], sha)
+        self.assertEqual(records[2][1]["commit_sha"], sha)
+        self.assertEqual(records[2][1]["status"], "removed")
+        self.assertEqual(state["bookmarks"]["org/repo"]["commits"]["since"], "2022-02-01T00:00:00Z")
+
+    @mock.patch("singer.write_state")
+    @mock.patch("singer.write_record")
+    @mock.patch("tap_github.streams.get_schema", return_value = {"schema": {}, "metadata": {}})
+    @mock.patch("tap_github.client.GithubClient.authed_get_all_pages")
+    def test_user_emails_skipped(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the emails are not written without the GitHub accounts of the commits."""
+        config = {"cache_dir": os.path.join(self.directory, "cache"), "git_clone_url": self.directory + "/origin"}
+        streams = ["commits", "commit_users_emails"]
+
+        Commits().sync_endpoint(GithubClient({"access_token": "", "repository": "org/repo"}), {}, [], "org/repo", "2021-01-01T00:00:00Z",
+                                streams, streams, config)
+
+        records = [(call[0][0], call[0][1]) for call in mock_write_record.call_args_list]
+        self.assertEqual([stream for stream, _ in records], ["commits"])
+        self.assertIsNone(records[0][1]["author_id"])
@@ -0,0 +1,225 @@
+import unittest
+from unittest import mock
+from tap_github.client import GithubClient, GraphQLError, GraphQLResourceError, RateLimitExceeded, get_graphql_url
+from tap_github.graphql import IssueQuery, PullRequestQuery, get_pull_request
+from tap_github.streams import Issues, PullRequests
+from helpers import MockResponse, patch_sync
+
+def get_pull_request_node(number, updated_at, reviews=None, threads=None, commits=None):
+    """Return a pull request of the GraphQL API with its nested connections."""
+    return {
+        "id": "PR_{}".format(number), "databaseId": 100 + number, "number": number, "state": "MERGED", "title": "Title",
+        "url": "https://github.com/org/repo/pull/{}".format(number), "updatedAt": updated_at, "createdAt": "2022-01-01T00:00:00Z",
+        "headRefName": "feature", "headRefOid": "abc", "headRepositoryOwner": {"login": "fork"},
+        "baseRefName": "main", "baseRefOid": "def", "baseRepository": {"nameWithOwner": "org/repo", "owner": {"login": "org"}},
+        "author": {"__typename": "User", "login": "user", "id": "U_1", "databaseId": 1},
+        "reviews": reviews or {"nodes": [], "pageInfo": {"hasNextPage": False}},
+        "reviewThreads": threads or {"nodes": [], "pageInfo": {"hasNextPage": False}},
+        "commits": commits or {"totalCount": 0, "nodes": [], "pageInfo": {"hasNextPage": False}},
+    }
+
+def get_issue_node(number, updated_at, labels=(), assignees=()):
+    """Return an issue of the GraphQL API with its labels and assignees."""
+    return {
+        "id": "I_{}".format(number), "databaseId": 200 + number, "number": number, "state": "OPEN", "title": "Title",
+        "url": "https://github.com/org/repo/issues/{}".format(number), "updatedAt": updated_at, "comments": {"totalCount": 2},
+        "labels": {"nodes": [{"name": name} for name in labels], "pageInfo": {"hasNextPage": False}},
+        "assignees": {"nodes": [{"__typename": "User", "login": login, "databaseId": 1} for login in assignees], "pageInfo": {"hasNextPage": False}},
+    }
+
+def get_page(nodes, end_cursor=None, connection="pullRequests"):
+    """Return the data of a page of pull requests or issues."""
+    return {"rateLimit": {"cost": 1, "remaining": 4999, "resetAt": "2022-01-01T01:00:00Z"},
+            "repository": {connection: {"nodes": nodes, "pageInfo": {"hasNextPage": end_cursor is not None, "endCursor": end_cursor}}}}
+
+class TestGraphQLClient(unittest.TestCase):
+    """
+    Test the GraphQL requests of the client.
+    """
+
+    def test_graphql_url(self):
+        """Verify the url of the GraphQL API of github.com and of the enterprise servers."""
+        self.assertEqual(get_graphql_url("https://api.github.com"), "https://api.github.com/graphql")
+        self.assertEqual(get_graphql_url("https://github.example.com/api/v3/"), "https://github.example.com/api/graphql")
+
+    @mock.patch("requests.Session.request")
+    def test_errors(self, mock_request):
+        """Verify that the errors of a response are raised with the type of the error."""
+        client = GithubClient({"access_token": "", "repository": "org/repo"})
+        mock_request.return_value = mock.Mock(status_code = 200, json = lambda: {"errors": [{"type": "MAX_NODE_LIMIT_EXCEEDED", "message": "Too many nodes"}]})
+        with self.assertRaises(GraphQLResourceError):
+            client.authed_graphql("pull_requests", "query")
+        mock_request.return_value = mock.Mock(status_code = 200, json = lambda: {"errors": [{"type": "RATE_LIMITED", "message": "Limited"}]})
+        with self.assertRaises(RateLimitExceeded):
+            client.authed_graphql("pull_requests", "query")
+        mock_request.return_value = mock.Mock(status_code = 200, json = lambda: {"errors": [{"type": "NOT_FOUND", "message": "Not found"}]})
+        with self.assertRaises(GraphQLError):
+            client.authed_graphql("pull_requests", "query")
+
+    @mock.patch("time.sleep")
+    @mock.patch("tap_github.client.calculate_seconds", return_value = 30)
+    def test_wait_for_points(self, mock_calculate_seconds, mock_sleep):
+        """Verify that the client sleeps until the reset when the remaining points do not cover a query, and fails past the maximum sleep."""
+        client = GithubClient({"access_token": "", "repository": "org/repo", "max_sleep_seconds": 60})
+        client.graphql_rate_limit = {"cost": 10, "remaining": 20, "resetAt": "2022-01-01T01:00:00Z"}
+        client.wait_for_graphql_points(10)
+        mock_sleep.assert_not_called()
+        client.wait_for_graphql_points(30)
+        mock_sleep.assert_called_once_with(30)
+
+        client.max_sleep_seconds = 10
+        client.graphql_rate_limit = {"cost": 10, "remaining": 0, "resetAt": "2022-01-01T01:00:00Z"}
+        with self.assertRaises(RateLimitExceeded):
+            client.wait_for_graphql_points(10)
+
+class TestPullRequestQuery(unittest.TestCase):
+    """
+    Test the pages of pull requests of the GraphQL API.
+    """
+
+    def test_pull_request_record(self):
+        """Verify that a pull request is mapped to the fields of the REST API."""
+        record = get_pull_request(get_pull_request_node(1, "2022-01-02T00:00:00Z"), "org/repo", "https://api.github.com")
+        self.assertEqual(record["id"], 101)
+        self.assertEqual(record["state"], "closed")
+        self.assertEqual(record["head"]["label"], "fork:feature")
+        self.assertEqual(record["base"]["user"]["login"], "org")
+        self.assertEqual(record["user"], {"login": "user", "id": 1, "node_id": "U_1", "avatar_url": None, "html_url": None,
+                                          "url": "https://api.github.com/users/user", "type": "User"})
+        self.assertEqual(record["url"], "https://api.github.com/repos/org/repo/pulls/1")
+        self.assertEqual(record["diff_url"], "https://github.com/org/repo/pull/1.diff")
+
+    @mock.patch("tap_github.client.GithubClient.authed_graphql")
+    def test_nested_pages(self, mock_authed_graphql):
+        """Verify that the nodes of a nested connection after its first page are fetched by the id of the pull request."""
+        reviews = {"nodes": [{"databaseId": 1, "submittedAt": "2022-01-02T00:00:00Z"}], "pageInfo": {"hasNextPage": True, "endCursor": "R1"}}
+        thread = {"id": "T_1", "diffSide": "RIGHT", "comments": {"nodes": [{"databaseId": 10, "updatedAt": "2022-01-02T00:00:00Z"}],
+                                                                 "pageInfo": {"hasNextPage": False}}}
+        threads = {"nodes": [thread], "pageInfo": {"hasNextPage": False}}
+        mock_authed_graphql.side_effect = [
+            get_page([get_pull_request_node(1, "2022-01-03T00:00:00Z", reviews, threads)]),
+            {"node": {"reviews": {"nodes": [{"databaseId": 2, "submittedAt": "2022-01-03T00:00:00Z"}], "pageInfo": {"hasNextPage": False}}}},
+        ]
+        client = GithubClient({"access_token": "", "repository": "org/repo"})
+
+        pages = list(PullRequestQuery(client, "org/repo", ["reviews", "review_comments"]).get_pages())
+
+        self.assertEqual(len(pages), 1)
+        [(record, child_records)], next_cursor = pages[0]
+        self.assertIsNone(next_cursor)
+        self.assertEqual([review["id"] for review in child_records["reviews"]], [1, 2])
+        self.assertEqual(child_records["review_comments"][0]["side"], "RIGHT")
+        self.assertEqual(record["review_comments"], 1)
+        self.assertEqual(mock_authed_graphql.call_args[0][2], {"id": "PR_1", "pageSize": 100, "cursor": "R1"})
+        # The connections of the children that are not synced are not requested.
+        self.assertNotIn("commits(first", mock_authed_graphql.call_args_list[0][0][1])
+
+    @mock.patch("tap_github.client.GithubClient.authed_graphql")
+    def test_halve_page_size(self, mock_authed_graphql):
+        """Verify that a page exceeding the limits of the API is requested again with half the pull requests."""
+        mock_authed_graphql.side_effect = [GraphQLResourceError("Too many nodes"), get_page([])]
+        client = GithubClient({"access_token": "", "repository": "org/repo"})
+
+        list(PullRequestQuery(client, "org/repo", [], 20).get_pages())
+
+        self.assertEqual([call[0][2]["pageSize"] for call in mock_authed_graphql.call_args_list], [20, 10])
+
+@patch_sync("tap_github.client.GithubClient.authed_graphql")
+class TestGraphQLBackend(unittest.TestCase):
+    """
+    Test the sync of the pull requests with the GraphQL backend.
+    """
+    config = {"pull_requests_backend": "graphql"}
+
+    def test_stop_at_bookmark(self, mock_authed_graphql, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the pages stop at the first pull request updated before the bookmark and that the bookmark is the latest update."""
+        commits = {"totalCount": 1, "pageInfo": {"hasNextPage": False}, "nodes": [{"commit": {
+            "oid": "abc", "url": "https://github.com/org/repo/commit/abc", "parents": {"nodes": []},
+            "author": {"name": "a", "email": "a@example.com", "date": "2022-01-02T01:00:00+01:00"},
+            "committer": {"name": "a", "email": "a@example.com", "date": "2022-01-02T01:00:00+01:00"}}}]}
+        mock_authed_graphql.side_effect = [
+            get_page([get_pull_request_node(3, "2022-01-04T00:00:00Z", commits = commits)], "C1"),
+            get_page([get_pull_request_node(2, "2022-01-03T00:00:00Z"), get_pull_request_node(1, "2021-12-01T00:00:00Z")], "C2"),
+        ]
+        state = {"bookmarks": {"org/repo": {"pull_requests": {"since": "2022-01-01T00:00:00Z"}, "pr_commits": {"since": "2022-01-01T00:00:00Z"}}}}
+
+        state = PullRequests().sync_endpoint(GithubClient({"access_token": "", "repository": "org/repo"}), state, [], "org/repo",
+                                             "2021-01-01T00:00:00Z", ["pull_requests", "pr_commits"], ["pull_requests", "pr_commits"], self.config)
+
+        self.assertEqual(mock_authed_graphql.call_count, 2)
+        written = [(call[0][0], call[0][1]["id"]) for call in mock_write_record.call_args_list]
+        self.assertEqual(written, [("pull_requests", 103), ("pr_commits", "103-abc"), ("pull_requests", 102)])
+        self.assertEqual(mock_write_record.call_args_list[1][0][1]["updated_at"], "2022-01-02T00:00:00Z")
+        self.assertEqual(state["bookmarks"]["org/repo"]["pull_requests"]["since"], "2022-01-04T00:00:00Z")
+        self.assertEqual(state["bookmarks"]["org/repo"]["pr_commits"]["since"], "2022-01-04T00:00:00Z")
+        self.assertNotIn("page_cursor", state)
+
+    @mock.patch("tap_github.streams.PullRequests.get_child_records")
+    @mock.patch("tap_github.client.GithubClient.authed_get_all_pages", return_value = [])
+    def test_rest_backend(self, mock_authed_get_all_pages, mock_get_child_records, mock_authed_graphql, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the pull requests are synced from the REST API without the GraphQL backend."""
+        PullRequests().sync_endpoint(GithubClient({"access_token": "", "repository": "org/repo"}), {}, [], "org/repo",
+                                     "2021-01-01T00:00:00Z", ["pull_requests"], ["pull_requests"], {})
+
+        mock_authed_get_all_pages.assert_called_once()
+        mock_authed_graphql.assert_not_called()
+
+@patch_sync("tap_github.client.GithubClient.authed_get_all_pages", "tap_github.client.GithubClient.authed_graphql")
+class TestGraphQLIssues(unittest.TestCase):
+    """
+    Test the sync of the issues with the GraphQL backend.
+    """
+    config = {"issues_backend": "graphql"}
+
+    def test_issues_with_labels_and_assignees(self, mock_authed_graphql, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the labels are mapped by name to the labels of the repository and that the bookmark moves after each page."""
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 7, "name": "bug", "color": "f00"}])]
+        mock_authed_graphql.side_effect = [
+            get_page([get_issue_node(1, "2022-01-02T00:00:00Z", ["bug"], ["user"])], "C1", "issues"),
+            get_page([get_issue_node(2, "2022-01-03T00:00:00Z", ["bug", "removed"])], None, "issues"),
+        ]
+        state = {"bookmarks": {"org/repo": {"issues": {"since": "2022-01-01T00:00:00Z"}}}}
+        streams = ["issues", "issue_labels", "issue_assignees"]
+
+        state = Issues().sync_endpoint(GithubClient({"access_token": "", "repository": "org/repo"}), state, [], "org/repo",
+                                       "2021-01-01T00:00:00Z", streams, streams, self.config)
+
+        written = [(call[0][0], call[0][1].get("issue_id"), call[0][1].get("id")) for call in mock_write_record.call_args_list]
+        self.assertEqual(written, [("issues", None, 201), ("issue_assignees", 201, 1), ("issue_labels", 201, 7),
+                                   ("issues", None, 202), ("issue_labels", 202, 7)])
+        self.assertEqual(mock_write_record.call_args_list[0][0][1]["comments"], 2)
+        # The labels of the repository are listed again once for the missing label, the issues are requested since the earliest bookmark.
+        self.assertEqual(mock_authed_get_all_pages.call_count, 2)
+        self.assertEqual(mock_authed_graphql.call_args_list[0][0][2]["since"], "2021-01-01T00:00:00Z")
+        self.assertEqual(mock_authed_graphql.call_args_list[1][0][2]["cursor"], "C1")
+        # The state is written after each page.
+        self.assertEqual(mock_write_state.call_count, 2)
+        self.assertEqual(state["bookmarks"]["org/repo"]["issues"]["since"], "2022-01-03T00:00:00Z")
+
+    def test_label_created_after_listing(self, mock_authed_graphql, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that a label missing from the listed labels is found by listing them again once."""
+        mock_authed_get_all_pages.side_effect = [
+            [MockResponse([{"id": 7, "name": "bug"}])],
+            [MockResponse([{"id": 7, "name": "bug"}, {"id": 8, "name": "new"}])],
+        ]
+        mock_authed_graphql.return_value = get_page([get_issue_node(1, "2022-01-02T00:00:00Z", ["new"]),
+                                                     get_issue_node(2, "2022-01-03T00:00:00Z", ["other"])], None, "issues")
+        streams = ["issues", "issue_labels"]
+
+        Issues().sync_endpoint(GithubClient({"access_token": "", "repository": "org/repo"}), {}, [], "org/repo",
+                               "2021-01-01T00:00:00Z", streams, streams, self.config)
+
+        written = [(call[0][1]["issue_id"], call[0][1]["id"]) for call in mock_write_record.call_args_list if call[0][0] == "issue_labels"]
+        self.assertEqual(written, [(201, 8)])
+        self.assertEqual(mock_authed_get_all_pages.call_count, 2)
+
+    def test_labels_not_requested(self, mock_authed_graphql, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the labels are neither queried nor listed when their stream is not synced."""
+        mock_authed_graphql.return_value = get_page([get_issue_node(1, "2022-01-02T00:00:00Z")], None, "issues")
+
+        Issues().sync_endpoint(GithubClient({"access_token": "", "repository": "org/repo"}), {}, [], "org/repo",
+                               "2021-01-01T00:00:00Z", ["issues"], ["issues"], self.config)
+
+        mock_authed_get_all_pages.assert_not_called()
+        self.assertNotIn("labels(first", mock_authed_graphql.call_args[0][1])
+        self.assertIsNone(IssueQuery(None, "org/repo", None, []).labels)
@@ -1,3 +1,4 @@
+import sys
 import unittest
 from unittest import mock
 from tap_github import main
@@ -81,6 +82,84 @@ class TestSyncMode(unittest.TestCase):
         # Verify `_sync` is called with expected arguments
         mock_sync.assert_called_with("mock_client", self.mock_config, mock_state, self.mock_catalog)
 
+@mock.patch("tap_github.GithubClient")
+@mock.patch("singer.utils.parse_args")
+@mock.patch("tap_github._sync")
+@mock.patch("tap_github.do_plan")
+class TestPlanMode(unittest.TestCase):
+    """
+    Test main function for plan mode
+    """
+
+    mock_config = {"start_date": "", "access_token": ""}
+    mock_catalog = {"streams": [{"stream": "teams", "schema": {}, "metadata": {}}]}
+
+    @mock.patch("sys.argv", ["tap-github", "--config", "config.json", "--plan"])
+    def test_plan_with_properties(self, mock_plan, mock_sync, mock_args, mock_client):
+        """Test the plan mode estimates the sync cost without syncing"""
+        mock_client.return_value = "mock_client"
+        singer_argv = []
+        def parse_singer_args(required_config_keys):
+            singer_argv.extend(sys.argv)
+            return MockArgs(config=self.mock_config, properties=self.mock_catalog)
+        mock_args.side_effect = parse_singer_args
+        main()
+
+        # Verify `do_plan` is called instead of `_sync` and the flag is only removed while parsing the Singer args
+        mock_plan.assert_called_with("mock_client", self.mock_config, {}, self.mock_catalog)
+        self.assertFalse(mock_sync.called)
+        self.assertEqual(singer_argv, ["tap-github", "--config", "config.json"])
+        self.assertEqual(sys.argv, ["tap-github", "--config", "config.json", "--plan"])
+
+    @mock.patch("sys.argv", ["tap-github", "--config", "config.json"])
+    def test_sync_without_plan_flag(self, mock_plan, mock_sync, mock_args, mock_client):
+        """Test the sync mode is run without the plan flag"""
+        mock_args.return_value = MockArgs(config=self.mock_config, properties=self.mock_catalog)
+        main()
+
+        self.assertFalse(mock_plan.called)
+        self.assertTrue(mock_sync.called)
+
+@mock.patch("tap_github.GithubClient")
+@mock.patch("singer.utils.parse_args")
+@mock.patch("tap_github._sync")
+@mock.patch("tap_github._run_daemon")
+class TestDaemonMode(unittest.TestCase):
+    """
+    Test main function for daemon mode
+    """
+
+    mock_config = {"start_date": "", "access_token": ""}
+    mock_catalog = {"streams": [{"stream": "teams", "schema": {}, "metadata": {}}]}
+
+    @mock.patch("sys.argv", ["tap-github", "--config", "config.json", "--daemon"])
+    def test_daemon_with_properties(self, mock_daemon, mock_sync, mock_args, mock_client):
+        """Test the daemon mode polls the streams instead of a single sync"""
+        mock_client.return_value = "mock_client"
+        singer_argv = []
+        def parse_singer_args(required_config_keys):
+            singer_argv.extend(sys.argv)
+            return MockArgs(config=self.mock_config, properties=self.mock_catalog)
+        mock_args.side_effect = parse_singer_args
+        main()
+
+        mock_daemon.assert_called_with("mock_client", self.mock_config, {}, self.mock_catalog)
+        self.assertFalse(mock_sync.called)
+        self.assertEqual(singer_argv, ["tap-github", "--config", "config.json"])
+        self.assertEqual(sys.argv, ["tap-github", "--config", "config.json", "--daemon"])
+
+    @mock.patch("tap_github._run_webhook")
+    @mock.patch("sys.argv", ["tap-github", "--config", "config.json", "--webhook"])
+    def test_webhook_with_properties(self, mock_webhook, mock_daemon, mock_sync, mock_args, mock_client):
+        """Test the webhook mode receives the deliveries instead of a single sync"""
+        mock_client.return_value = "mock_client"
+        mock_args.return_value = MockArgs(config=self.mock_config, properties=self.mock_catalog)
+        main()
+
+        mock_webhook.assert_called_with("mock_client", self.mock_config, {}, self.mock_catalog)
+        self.assertFalse(mock_daemon.called)
+        self.assertFalse(mock_sync.called)
+
 @mock.patch("tap_github.GithubClient")
 class TestDiscover(unittest.TestCase):
     """Test `discover` function."""
@@ -0,0 +1,110 @@
+import unittest
+from unittest import mock
+from datetime import datetime
+import pytz
+from tap_github.client import GithubClient
+from tap_github.streams import IssueEvents, StarGazers, get_page_cursor, write_page_cursor
+from helpers import MockResponse, interrupted_pages, patch_sync
+
+@patch_sync("tap_github.client.GithubClient.authed_get_all_pages")
+class TestPageCursor(unittest.TestCase):
+    """
+    Test the resumable page cursor of `FullTableStream` and `IncrementalOrderedStream`.
+    """
+    config = {"access_token": "", "repository": "org/repo"}
+    start_url = "https://api.github.com/repos/org/repo/issues/events?sort=created_at&direction=desc&per_page100"
+
+    def test_cursor_written_at_page_boundary(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the next page and the bookmarks of the stream are saved after each page."""
+        state = {"bookmarks": {"org/repo": {"issue_events": {"since": "2019-01-01T00:00:00Z"}}}}
+        mock_authed_get_all_pages.return_value = interrupted_pages([
+            MockResponse([{"id": 2, "created_at": "2019-01-03T00:00:00Z"}, {"id": 1, "created_at": "2019-01-02T00:00:00Z"}], "next_page_url")])
+
+        with self.assertRaises(Exception):
+            IssueEvents().sync_endpoint(GithubClient(self.config), state, [], "org/repo", "2018-01-01T00:00:00Z", ["issue_events"], ["issue_events"], {})
+
+        cursor = state["page_cursor"]
+        self.assertEqual(cursor["next_url"], "next_page_url")
+        self.assertEqual(cursor["start_url"], self.start_url)
+        self.assertEqual(cursor["bookmark"], "2019-01-03T00:00:00Z")
+        # Verify the snapshot holds the bookmark the stream started with
+        self.assertEqual(cursor["bookmarks"], {"issue_events": {"since": "2019-01-01T00:00:00Z"}})
+
+    def test_resume_from_cursor(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the interrupted stream resumes from the saved page with the bookmark it started with."""
+        state = {"bookmarks": {"org/repo": {"issue_events": {"since": "2019-01-03T00:00:00Z"}}}}
+        write_page_cursor(state, "org/repo", "issue_events", self.start_url, "next_page_url",
+                          "2019-01-03T00:00:00Z", {"issue_events": {"since": "2019-01-01T00:00:00Z"}})
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 0, "created_at": "2019-01-01T12:00:00Z"}])]
+
+        final_state = IssueEvents().sync_endpoint(GithubClient(self.config), state, [], "org/repo", "2018-01-01T00:00:00Z", ["issue_events"], ["issue_events"], {})
+
+        # Verify the sync resumed from the saved page
+        mock_authed_get_all_pages.assert_called_with(mock.ANY, "next_page_url", stream = "issue_events")
+        # Verify the record after the original bookmark is written
+        self.assertEqual(mock_write_record.call_count, 1)
+        # Verify the bookmark of the first record of the interrupted sync is kept and the cursor is removed
+        self.assertEqual(final_state, {"bookmarks": {"org/repo": {"issue_events": {"since": "2019-01-03T00:00:00Z"}}}})
+
+    def test_string_max_age(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the maximum age of the cursor is read from a string config value."""
+        state = {"bookmarks": {"org/repo": {"issue_events": {"since": "2019-01-03T00:00:00Z"}}}}
+        write_page_cursor(state, "org/repo", "issue_events", self.start_url, "next_page_url", "2019-01-03T00:00:00Z", {})
+        mock_authed_get_all_pages.return_value = [MockResponse([])]
+
+        IssueEvents().sync_endpoint(GithubClient(self.config), state, [], "org/repo", "2018-01-01T00:00:00Z", ["issue_events"], ["issue_events"],
+                                    {"page_cursor_max_age": "86400"})
+
+        mock_authed_get_all_pages.assert_called_with(mock.ANY, "next_page_url", stream = "issue_events")
+
+    def test_cursor_with_different_url_discarded(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that a cursor saved for another first page restarts the stream from the bookmarks it started with."""
+        state = {"bookmarks": {"org/repo": {"issue_events": {"since": "2019-01-03T00:00:00Z"}}}}
+        write_page_cursor(state, "org/repo", "issue_events", "old_url", "next_page_url",
+                          "2019-01-03T00:00:00Z", {"issue_events": {"since": "2019-01-01T00:00:00Z"}})
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 0, "created_at": "2019-01-02T00:00:00Z"}])]
+
+        final_state = IssueEvents().sync_endpoint(GithubClient(self.config), state, [], "org/repo", "2018-01-01T00:00:00Z", ["issue_events"], ["issue_events"], {})
+
+        mock_authed_get_all_pages.assert_called_with(mock.ANY, self.start_url, stream = "issue_events")
+        # Verify the record after the restored bookmark is written
+        self.assertEqual(mock_write_record.call_count, 1)
+        self.assertEqual(final_state, {"bookmarks": {"org/repo": {"issue_events": {"since": "2019-01-02T00:00:00Z"}}}})
+
+    def test_full_table_resume(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that a full table stream resumes from the saved page and removes the cursor at the end."""
+        state = {}
+        start_url = "https://api.github.com/repos/org/repo/stargazers?per_page100"
+        write_page_cursor(state, "org/repo", "stargazers", start_url, "next_page_url", None, {})
+        mock_authed_get_all_pages.return_value = [MockResponse([{"user": {"id": 1}}])]
+
+        final_state = StarGazers().sync_endpoint(GithubClient(self.config), state, [], "org/repo", "", ["stargazers"], ["stargazers"], {})
+
+        mock_authed_get_all_pages.assert_called_with(mock.ANY, "next_page_url", mock.ANY, stream = "stargazers")
+        self.assertNotIn("page_cursor", final_state)
+
+class TestGetPageCursor(unittest.TestCase):
+    """
+    Test `get_page_cursor` invalidates the stale cursors.
+    """
+
+    def test_cursor_of_other_stream_kept(self):
+        """Verify that the cursor of another stream is neither returned nor removed."""
+        state = {}
+        write_page_cursor(state, "org/repo", "issues", "url", "next_url", None, {})
+
+        self.assertIsNone(get_page_cursor(state, "org/repo", "comments"))
+        self.assertIsNone(get_page_cursor(state, "org/other", "issues"))
+        self.assertIn("page_cursor", state)
+
+    @mock.patch("singer.utils.now")
+    def test_expired_cursor_discarded(self, mock_now):
+        """Verify that an expired cursor is removed and the bookmarks of its snapshot are restored."""
+        state = {"bookmarks": {"org/repo": {"issues": {"since": "2019-01-05T00:00:00Z"}}}}
+        mock_now.return_value = datetime(2019, 1, 5, tzinfo=pytz.utc)
+        write_page_cursor(state, "org/repo", "issues", "url", "next_url", None, {"issues": None})
+        mock_now.return_value = datetime(2019, 1, 7, tzinfo=pytz.utc)
+
+        self.assertIsNone(get_page_cursor(state, "org/repo", "issues"))
+        # Verify the bookmark written by the interrupted sync is removed as the stream had no bookmark
+        self.assertEqual(state, {"bookmarks": {"org/repo": {}}})
@@ -0,0 +1,111 @@
+import time
+import unittest
+from unittest import mock
+from tap_github.plan import Planner, get_page_size, get_probe_url, get_record_count
+from helpers import MockResponse
+
+def get_stream_catalog(stream_name, is_selected = False):
+    """Return catalog for stream"""
+    return {"schema": {}, "tap_stream_id": stream_name, "key_properties": [],
+            "metadata": [{"breadcrumb": [], "metadata": {"selected": is_selected}}]}
+
+class TestProbeHelpers(unittest.TestCase):
+    """
+    Test the helpers that build the probe urls and read the number of records.
+    """
+
+    def test_probe_url(self):
+        """Verify that the probe url requests a single record per page and keeps the other parameters."""
+        url = "https://api.github.com/repos/org/repo/issues?since=2019-01-01T00:00:00Z&state=all&per_page=100"
+        self.assertEqual(get_probe_url(url), "https://api.github.com/repos/org/repo/issues?since=2019-01-01T00%3A00%3A00Z&state=all&per_page=1")
+
+    def test_page_size(self):
+        """Verify the page size of the url and the default page size of the API."""
+        self.assertEqual(get_page_size("https://api.github.com/x?per_page=100"), 100)
+        self.assertEqual(get_page_size("https://api.github.com/x?per_page100"), 30)
+
+    def test_record_count_from_last_link(self):
+        """Verify that the number of records is the last page of the probe."""
+        self.assertEqual(get_record_count(MockResponse([{"id": 1}], last_page=250), ""), (250, {"id": 1}))
+        self.assertEqual(get_record_count(MockResponse([{"id": 1}]), ""), (1, {"id": 1}))
+        self.assertEqual(get_record_count(MockResponse([]), ""), (0, None))
+
+    def test_record_count_from_total_count(self):
+        """Verify that the number of records is the total count of the response for the streams with a result path."""
+        response = MockResponse({"total_count": 1200, "workflow_runs": [{"id": 1}]})
+        self.assertEqual(get_record_count(response, "workflow_runs"), (1200, {"id": 1}))
+
+class TestPlanner(unittest.TestCase):
+    """
+    Test `Planner` estimates the requests per repository and stream with the child fan-out.
+    """
+
+    def get_client(self, responses, rate_limit):
+        client = mock.Mock()
+        client.base_url = "https://api.github.com"
+        client.extract_repos_from_config.return_value = (["org/repo"], {"org"})
+        client.authed_get.side_effect = responses
+        client.get_rate_limit.return_value = rate_limit
+        return client
+
+    def test_plan_with_child_fan_out(self):
+        """Verify the requests of a parent stream and the requests of its child from a sample parent."""
+        catalog = {"streams": [get_stream_catalog("pull_requests", True), get_stream_catalog("reviews", True)]}
+        reset = time.time() + 1000
+        client = self.get_client([
+            MockResponse([{"id": 10, "number": 7}], last_page=250),
+            MockResponse([{"id": 1}], last_page=3)
+        ], {"limit": 5000, "remaining": 4000, "reset": reset})
+
+        report = Planner(client, {"start_date": "2019-01-01T00:00:00Z"}, {}, catalog).plan()
+
+        # Verify the probes request a single record
+        self.assertIn("per_page=1", client.authed_get.mock_calls[0][1][1])
+        self.assertEqual(client.authed_get.mock_calls[1][1][1], "https://api.github.com/repos/org/repo/pulls/7/reviews?per_page=1")
+
+        # The pulls are listed with the default page size and each pull request needs a page of reviews
+        self.assertEqual(report["repositories"]["org/repo"]["pull_requests"],
+                         {"records": 250, "requests": 9 + 250, "child_requests": {"reviews": 250}})
+        self.assertEqual(report["total_requests"], 259)
+        self.assertEqual(report["probe_requests"], 2)
+        self.assertTrue(report["fits_in_remaining_quota"])
+
+    def test_plan_exceeding_quota(self):
+        """Verify the estimated duration waits for the rate limit resets when the requests do not fit."""
+        catalog = {"streams": [get_stream_catalog("issues", True)]}
+        reset = time.time() + 1000
+        client = self.get_client([
+            MockResponse([{"id": 10}], last_page=1000000)
+        ], {"limit": 5000, "remaining": 1000, "reset": reset})
+
+        report = Planner(client, {"start_date": "2019-01-01T00:00:00Z"}, {}, catalog).plan()
+
+        self.assertEqual(report["total_requests"], 10000)
+        self.assertFalse(report["fits_in_remaining_quota"])
+        # 9000 requests after the remaining quota need 2 windows: the wait for the reset and one more hour
+        self.assertAlmostEqual(report["estimated_duration_seconds"], 1000 + 3600, delta=5)
+
+    def test_plan_uses_bookmark(self):
+        """Verify the probe starts at the bookmark of the stream."""
+        catalog = {"streams": [get_stream_catalog("issues", True)]}
+        state = {"bookmarks": {"org/repo": {"issues": {"since": "2022-05-01T00:00:00Z"}}}}
+        client = self.get_client([MockResponse([])], {"limit": 5000, "remaining": 5000})
+
+        report = Planner(client, {"start_date": "2019-01-01T00:00:00Z"}, state, catalog).plan()
+
+        self.assertIn("since=2022-05-01T00%3A00%3A00Z", client.authed_get.mock_calls[0][1][1])
+        self.assertEqual(report["repositories"]["org/repo"]["issues"]["requests"], 1)
+
+    def test_plan_repository_stream(self):
+        """Verify that the review comments synced from the repository endpoint are estimated on their own and not per pull request."""
+        catalog = {"streams": [get_stream_catalog("pull_requests", True), get_stream_catalog("review_comments", True)]}
+        client = self.get_client([
+            MockResponse([{"id": 10, "number": 7}], last_page=250),
+            MockResponse([{"id": 1}], last_page=400)
+        ], {"limit": 5000, "remaining": 5000})
+
+        report = Planner(client, {"start_date": "2019-01-01T00:00:00Z", "review_comments_mode": "repository"}, {}, catalog).plan()
+
+        self.assertEqual(report["repositories"]["org/repo"]["pull_requests"]["child_requests"], {})
+        self.assertIn("/repos/org/repo/pulls/comments?", client.authed_get.mock_calls[1][1][1])
+        self.assertEqual(report["repositories"]["org/repo"]["review_comments"]["requests"], 4)
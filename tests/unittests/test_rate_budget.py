@@ -0,0 +1,104 @@
+import unittest
+from unittest import mock
+from tap_github.client import RateLimitExceeded
+from tap_github.sync import RateBudget, sync
+
+def get_stream_catalog(stream_name, is_selected = False):
+    """Return catalog for stream"""
+    return {"schema": {}, "tap_stream_id": stream_name, "key_properties": [],
+            "metadata": [{"breadcrumb": [], "metadata": {"selected": is_selected}}]}
+
+def get_client(remaining, repositories = ["org/repo1"]):
+    """Return a mock client with the remaining requests of the rate limit."""
+    client = mock.Mock()
+    client.get_rate_limit.return_value = {"limit": 5000, "remaining": remaining}
+    client.request_count = 0
+    client.rate_limit_remaining = None
+    client.extract_repos_from_config.return_value = (repositories, set())
+    client.not_accessible_repos = {}
+    return client
+
+def get_stats(requests, last_synced):
+    return {"duration": 1, "requests": requests, "last_synced": last_synced}
+
+class TestRateBudget(unittest.TestCase):
+    """
+    Test `RateBudget` admits the most stale units that fit in the remaining rate limit.
+    """
+
+    state = {"sync_stats": {
+        "org/repo1": {"issues": get_stats(300, "2022-01-03T00:00:00.000000Z"), "commits": get_stats(500, "2022-01-01T00:00:00.000000Z")},
+        "org/repo2": {"issues": get_stats(100, "2022-01-02T00:00:00.000000Z")}
+    }}
+
+    def test_most_stale_units_admitted(self):
+        """Verify that the most stale units are admitted first and the units that do not fit are deferred."""
+        rate_budget = RateBudget(get_client(1000), self.state, reserve = 100)
+        rate_budget.plan([("org/repo1", "issues"), ("org/repo1", "commits"), ("org/repo2", "issues"), ("org/repo2", "commits")])
+
+        # Never synced `org/repo2` commits (average cost 500) is admitted first, `org/repo1` commits (500) does not fit
+        # in the 400 requests left and the less stale units fill the rest of the 900 requests
+        self.assertEqual(dict(rate_budget.admitted), {"org/repo1": {"issues"}, "org/repo2": {"commits", "issues"}})
+        self.assertEqual(rate_budget.deferred, [("org/repo1", "commits")])
+
+    def test_unit_cost(self):
+        """Verify the cost of a unit from its last sync, the average of the stream or a single request."""
+        rate_budget = RateBudget(get_client(1000), self.state)
+
+        self.assertEqual(rate_budget.get_unit_cost("org/repo1", "issues"), 300)
+        self.assertEqual(rate_budget.get_unit_cost("org/repo3", "issues"), 200)
+        self.assertEqual(rate_budget.get_unit_cost("org/repo3", "events"), 1)
+
+    def test_can_sync_with_live_remaining(self):
+        """Verify that an admitted unit is deferred when the remaining requests dropped below its cost."""
+        client = get_client(5000)
+        rate_budget = RateBudget(client, self.state, reserve = 100)
+        rate_budget.plan([("org/repo1", "issues")])
+        self.assertTrue(rate_budget.can_sync("org/repo1", "issues"))
+
+        client.rate_limit_remaining = 350
+        self.assertFalse(rate_budget.can_sync("org/repo1", "issues"))
+        self.assertEqual(rate_budget.deferred, [("org/repo1", "issues")])
+
+@mock.patch("singer.write_state")
+@mock.patch("tap_github.sync.write_schemas")
+class TestSyncWithRateBudget(unittest.TestCase):
+    """
+    Test `sync` stops cleanly and keeps the state when the rate limit is exceeded.
+    """
+
+    catalog = {"streams": [get_stream_catalog("issues", True)]}
+    config = {"start_date": "2019-01-01T00:00:00Z", "rate_budget_planner": True}
+
+    @mock.patch("tap_github.streams.IncrementalOrderedStream.sync_endpoint")
+    def test_stop_on_rate_limit_exceeded(self, mock_sync_endpoint, mock_write_schemas, mock_write_state):
+        """Verify that the sync stops without failing and keeps the currently syncing repo and stream."""
+        client = get_client(5000, ["org/repo1", "org/repo2", "org/repo3"])
+        synced_repos = []
+
+        def sync_endpoint(**kwargs):
+            synced_repos.append(kwargs["repo_path"])
+            if len(synced_repos) == 2:
+                raise RateLimitExceeded("API rate limit exceeded")
+            return kwargs["state"]
+
+        mock_sync_endpoint.side_effect = sync_endpoint
+        state = {"bookmarks": {"org/repo1": {"issues": {"since": "2019-01-01T00:00:00Z"}}}}
+
+        sync(client, self.config, state, self.catalog)
+
+        # Verify the third repo is not synced
+        self.assertEqual(len(synced_repos), 2)
+        # Verify the last written state resumes from the stopped repo and stream
+        last_state = mock_write_state.mock_calls[-1][1][0]
+        self.assertEqual(last_state["currently_syncing_repo"], synced_repos[1])
+        self.assertEqual(last_state["currently_syncing"], "issues")
+
+    @mock.patch("tap_github.streams.IncrementalOrderedStream.sync_endpoint")
+    def test_rate_limit_exceeded_without_planner(self, mock_sync_endpoint, mock_write_schemas, mock_write_state):
+        """Verify that the exception is raised when the rate budget planner is not enabled."""
+        client = get_client(5000)
+        mock_sync_endpoint.side_effect = RateLimitExceeded("API rate limit exceeded")
+
+        with self.assertRaises(RateLimitExceeded):
+            sync(client, {"start_date": "2019-01-01T00:00:00Z"}, {}, self.catalog)
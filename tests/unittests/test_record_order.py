@@ -0,0 +1,90 @@
+import unittest
+from tap_github.client import GithubClient
+from tap_github.streams import CommitComments, Events, RecordOrder
+from helpers import MockResponse, patch_sync
+
+class NewestFirstComments(CommitComments):
+    sort_direction = "desc"
+
+class TestRecordOrder(unittest.TestCase):
+    """
+    Test the verification of the declared order of the records.
+    """
+
+    def test_descending(self):
+        """Verify that decreasing and equal values keep the descending order."""
+        record_order = RecordOrder("events", "created_at", "desc")
+        for value in ["2022-01-03T00:00:00Z", "2022-01-02T00:00:00Z", "2022-01-02T00:00:00Z", "2022-01-01T00:00:00Z"]:
+            self.assertTrue(record_order.check(value))
+
+    def test_out_of_order(self):
+        """Verify that an increasing value breaks the descending order for the next values."""
+        record_order = RecordOrder("events", "created_at", "desc")
+        record_order.check("2022-01-02T00:00:00Z")
+        with self.assertLogs(level = "WARNING") as logs:
+            self.assertFalse(record_order.check("2022-01-03T00:00:00Z"))
+        self.assertFalse(record_order.check("2022-01-01T00:00:00Z"))
+        # Verify the warning names the replication key
+        self.assertIn("the desc order of created_at", logs.output[0])
+
+    def test_undeclared(self):
+        """Verify that a stream without a declared order is never in order."""
+        self.assertFalse(RecordOrder("commit_comments", "updated_at", None).check("2022-01-01T00:00:00Z"))
+
+@patch_sync("tap_github.client.GithubClient.authed_get_all_pages")
+class TestDescendingIncrementalStream(unittest.TestCase):
+    """
+    Test the early stop of the pages of an incremental stream declared in descending order.
+    """
+    config = {"access_token": "", "repository": "org/repo"}
+    state = {"bookmarks": {"org/repo": {"commit_comments": {"since": "2022-01-03T00:00:00Z"}}}}
+
+    def sync(self, stream):
+        return stream.sync_endpoint(GithubClient(self.config), self.state, [], "org/repo", "2022-01-01T00:00:00Z",
+                                    ["commit_comments"], ["commit_comments"], {})
+
+    def test_stop_after_bookmark(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the pages stop after the page reaching the bookmark."""
+        pages = iter([
+            MockResponse([{"id": 3, "updated_at": "2022-01-05T00:00:00Z"}, {"id": 2, "updated_at": "2022-01-02T00:00:00Z"}]),
+            MockResponse([{"id": 1, "updated_at": "2022-01-01T00:00:00Z"}]),
+        ])
+        mock_authed_get_all_pages.return_value = pages
+
+        state = self.sync(NewestFirstComments())
+
+        self.assertEqual(len(list(pages)), 1)
+        self.assertEqual([call[0][1]["id"] for call in mock_write_record.call_args_list], [3])
+        self.assertEqual(state["bookmarks"]["org/repo"]["commit_comments"]["since"], "2022-01-05T00:00:00Z")
+
+    def test_out_of_order_full_scan(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that all the pages are read once the records are found out of order."""
+        mock_authed_get_all_pages.return_value = iter([
+            MockResponse([{"id": 3, "updated_at": "2022-01-02T00:00:00Z"}, {"id": 2, "updated_at": "2022-01-05T00:00:00Z"}]),
+            MockResponse([{"id": 1, "updated_at": "2022-01-04T00:00:00Z"}]),
+        ])
+
+        self.sync(NewestFirstComments())
+
+        self.assertEqual([call[0][1]["id"] for call in mock_write_record.call_args_list], [2, 1])
+
+@patch_sync("tap_github.client.GithubClient.authed_get")
+class TestEventsOrder(unittest.TestCase):
+    """
+    Test the pages of the events found out of order.
+    """
+
+    def test_out_of_order_full_scan(self, mock_authed_get, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the events after an older event of the page are written and the next pages read."""
+        mock_authed_get.side_effect = [
+            MockResponse([{"id": 3, "created_at": "2022-01-05T00:00:00Z"}, {"id": 1, "created_at": "2022-01-02T00:00:00Z"},
+                          {"id": 4, "created_at": "2022-01-06T00:00:00Z"}], "https://api.github.com/repos/org/repo/events?page=2"),
+            MockResponse([{"id": 2, "created_at": "2022-01-04T00:00:00Z"}]),
+        ]
+        state = {"bookmarks": {"org/repo": {"events": {"since": "2022-01-03T00:00:00Z"}}}}
+
+        state = Events().sync_endpoint(GithubClient({"access_token": "", "repository": "org/repo"}), state, [], "org/repo",
+                                       "2022-01-01T00:00:00Z", ["events"], ["events"], {})
+
+        self.assertEqual([call[0][1]["id"] for call in mock_write_record.call_args_list], [3, 4, 2])
+        self.assertEqual(state["bookmarks"]["org/repo"]["events"]["since"], "2022-01-06T00:00:00Z")
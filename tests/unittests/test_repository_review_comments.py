@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+from tap_github.client import GithubClient
+from tap_github.streams import PULL_REQUEST_IDS, PullRequests, RepositoryReviewComments
+from tap_github.sync import do_sync
+from helpers import MockResponse, patch_sync
+
+@patch_sync("tap_github.client.GithubClient.authed_get", "tap_github.client.GithubClient.authed_get_all_pages")
+class TestRepositoryReviewComments(unittest.TestCase):
+    """
+    Test the review comments synced from the repository endpoint.
+    """
+    config = {"access_token": "", "repository": "org/repo"}
+
+    def setUp(self):
+        PULL_REQUEST_IDS.clear()
+
+    def sync(self, mock_authed_get_all_pages, comments, pull_requests):
+        """Sync the review comments with the pages of the comments and of the listing of the pull requests."""
+        def get_all_pages(source, url, *args, **kwargs):
+            return [MockResponse(comments if "/pulls/comments" in url else pull_requests)]
+        mock_authed_get_all_pages.side_effect = get_all_pages
+        RepositoryReviewComments().sync_endpoint(GithubClient(self.config), {}, [], "org/repo", "2022-01-01T00:00:00Z",
+                                                 ["review_comments"], ["review_comments"], {})
+
+    def test_pr_id_from_index(self, mock_authed_get_all_pages, mock_authed_get, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the pull request ids are read from the index of the synced pull requests, and listed once otherwise."""
+        PullRequests().add_fields_at_1st_level({"_sdc_repository": "org/repo", "number": 1, "id": 100})
+        self.sync(mock_authed_get_all_pages, [
+            {"id": 1, "updated_at": "2022-01-02T00:00:00Z", "pull_request_url": "https://api.github.com/repos/org/repo/pulls/1"},
+            {"id": 2, "updated_at": "2022-01-03T00:00:00Z", "pull_request_url": "https://api.github.com/repos/org/repo/pulls/2"},
+            {"id": 3, "updated_at": "2022-01-04T00:00:00Z", "pull_request_url": "https://api.github.com/repos/org/repo/pulls/3"}],
+            [{"id": 200, "number": 2}, {"id": 300, "number": 3}])
+
+        urls = [call[0][1] for call in mock_authed_get_all_pages.call_args_list]
+        self.assertEqual(urls, ["https://api.github.com/repos/org/repo/pulls/comments?since=2022-01-01T00:00:00Z&sort=updated&direction=asc&per_page=100",
+                                "https://api.github.com/repos/org/repo/pulls?state=all&per_page=100"])
+        self.assertEqual([call[0][1]["pr_id"] for call in mock_write_record.call_args_list], [100, 200, 300])
+        mock_authed_get.assert_not_called()
+        # The index is dropped once the review comments of the repository are synced.
+        self.assertEqual(PULL_REQUEST_IDS, {})
+
+    def test_pr_opened_after_listing(self, mock_authed_get_all_pages, mock_authed_get, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that a pull request missing from the listing is requested on its own."""
+        mock_authed_get.return_value = MockResponse({"id": 200, "number": 2})
+        self.sync(mock_authed_get_all_pages, [
+            {"id": 1, "updated_at": "2022-01-02T00:00:00Z", "pull_request_url": "https://api.github.com/repos/org/repo/pulls/1"},
+            {"id": 2, "updated_at": "2022-01-03T00:00:00Z", "pull_request_url": "https://api.github.com/repos/org/repo/pulls/2"}],
+            [{"id": 100, "number": 1}])
+
+        self.assertEqual([call[0][1]["pr_id"] for call in mock_write_record.call_args_list], [100, 200])
+        mock_authed_get.assert_called_once_with("review_comments", "https://api.github.com/repos/org/repo/pulls/2")
+
+@mock.patch("tap_github.sync.write_schemas")
+@mock.patch("tap_github.streams.RepositoryReviewComments.sync_endpoint", return_value = {})
+@mock.patch("tap_github.streams.PullRequests.sync_endpoint", return_value = {})
+class TestRepositoryMode(unittest.TestCase):
+    """
+    Test the sync of the review comments in the repository mode.
+    """
+
+    def test_repository_mode(self, mock_pull_requests, mock_review_comments, mock_write_schemas):
+        """Verify that the review comments are synced on their own and not as the children of the pull requests."""
+        do_sync({"streams": []}, ["pull_requests", "review_comments", "reviews"], ["pull_requests", "review_comments", "reviews"],
+                GithubClient({"access_token": "", "repository": "org/repo"}), "2022-01-01T00:00:00Z", {}, "org/repo",
+                {"review_comments_mode": "repository"})
+
+        self.assertEqual(mock_pull_requests.call_args[1]["stream_to_sync"], ["pull_requests", "reviews"])
+        self.assertEqual(mock_pull_requests.call_args[1]["selected_stream_ids"], ["pull_requests", "reviews"])
+        self.assertEqual(mock_review_comments.call_args[1]["selected_stream_ids"], ["pull_requests", "review_comments", "reviews"])
+
+    def test_parent_not_synced_for_repository_stream(self, mock_pull_requests, mock_review_comments, mock_write_schemas):
+        """Verify that the pull requests are not synced when only the review comments are selected."""
+        do_sync({"streams": []}, ["pull_requests", "review_comments"], ["review_comments"],
+                GithubClient({"access_token": "", "repository": "org/repo"}), "2022-01-01T00:00:00Z", {}, "org/repo",
+                {"review_comments_mode": "repository"})
+
+        mock_pull_requests.assert_not_called()
+        mock_review_comments.assert_called_once()
@@ -0,0 +1,127 @@
+import os
+import shutil
+import tempfile
+import unittest
+from tap_github.client import GithubClient
+from tap_github.sha_index import BloomFilter, ShaIndex
+from tap_github.streams import Commits
+from tap_github import sha_index
+from helpers import MockResponse, patch_sync
+
+class TestShaIndex(unittest.TestCase):
+    """
+    Test the Bloom filter and the persistence of the SHA index.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "sha_index.db")
+
+    def tearDown(self):
+        sha_index.close()
+        shutil.rmtree(self.directory)
+
+    def test_bloom_filter(self):
+        """Verify that the added keys are in the Bloom filter."""
+        bloom = BloomFilter(1000, 3)
+        bloom.add("commit_files:abc")
+        self.assertIn("commit_files:abc", bloom)
+        self.assertNotIn("commit_files:abd", bloom)
+
+    def test_persisted(self):
+        """Verify that the SHAs added by a run are found by the next run."""
+        index = ShaIndex(self.path, "replay")
+        self.assertIsNone(index.get("commit_files", "abc"))
+        index.add("commit_files", "abc", [{"filename": "a.txt"}])
+        index.close()
+
+        index = ShaIndex(self.path, "replay")
+        self.assertEqual(index.get("commit_files", "abc"), [{"filename": "a.txt"}])
+        self.assertIsNone(index.get("commit_pull_request", "abc"))
+        index.close()
+
+    def test_rebuilt_bloom_filter(self):
+        """Verify that the Bloom filter is rebuilt from the store when its size changes."""
+        index = ShaIndex(self.path)
+        index.add("commit_files", "abc", [], "org/repo", "2022-01-01T00:00:00Z")
+        index.close()
+
+        index = ShaIndex(self.path, bloom_bits = 1000, start_bookmarks = {("org/repo", "commit_files"): "2022-01-02T00:00:00Z"})
+        self.assertEqual(index.get("commit_files", "abc"), [])
+        index.close()
+
+    def test_skip_mode_sha_replayed_after_fetch(self):
+        """Verify that a SHA indexed without its records is fetched again in the `replay` mode."""
+        index = ShaIndex(self.path, "skip")
+        index.add("commit_files", "abc", [{"filename": "a.txt"}])
+        index.close()
+
+        index = ShaIndex(self.path, "replay")
+        self.assertIsNone(index.get("commit_files", "abc"))
+        index.close()
+
+    def test_unconfirmed_sha_fetched(self):
+        """Verify that a SHA of a previous run is only skipped once the bookmark of its repository moved past it."""
+        index = ShaIndex(self.path)
+        index.add("commit_files", "abc", [], "org/repo", "2022-01-02T00:00:00Z")
+        # Verify the SHA is skipped for the other repositories of the run
+        self.assertEqual(index.get("commit_files", "abc"), [])
+        index.close()
+
+        for start_bookmark, expected in [("2022-01-01T00:00:00Z", None), ("2022-01-02T00:00:00Z", None), ("2022-01-03T00:00:00Z", [])]:
+            index = ShaIndex(self.path, start_bookmarks = {("org/repo", "commit_files"): start_bookmark})
+            self.assertEqual(index.get("commit_files", "abc"), expected)
+            index.close()
+
+    @patch_sync("tap_github.client.GithubClient.authed_get_all_pages")
+    def test_interrupted_run_rerun(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the files written by an interrupted run are written again by the rerun from the old bookmark."""
+        mock_authed_get_all_pages.side_effect = lambda *args, **kwargs: [MockResponse({"files": [{"filename": "a.txt"}]})]
+        client = GithubClient({"access_token": "", "repository": "org/repo"})
+        state = {"bookmarks": {"org/repo": {"commit_files": {"since": "2022-01-01T00:00:00Z"}}}}
+        config = {"sha_index_path": self.path}
+
+        # The run is interrupted before the target confirmed a state past the commit, the rerun starts from the same state
+        for _ in range(2):
+            sha_index.configure(config, state)
+            Commits().get_child_records(client, [], "commit_files", ("abc",), "org/repo", state, "2022-01-01T00:00:00Z", "2022-01-02T00:00:00Z",
+                                        ["commit_files"], ["commit_files"], parent_record = {"sha": "abc", "_sdc_repository": "org/repo"})
+            sha_index.close()
+        self.assertEqual(mock_write_record.call_count, 2)
+
+        # Verify the SHA is skipped once the run starts past the commit
+        state["bookmarks"]["org/repo"]["commit_files"]["since"] = "2022-01-03T00:00:00Z"
+        sha_index.configure(config, state)
+        Commits().get_child_records(client, [], "commit_files", ("abc",), "org/repo", state, "2022-01-01T00:00:00Z", "2022-01-04T00:00:00Z",
+                                    ["commit_files"], ["commit_files"], parent_record = {"sha": "abc", "_sdc_repository": "org/repo"})
+        self.assertEqual(mock_write_record.call_count, 2)
+
+    def test_invalid_mode(self):
+        """Verify that an invalid mode raises an error."""
+        with self.assertRaises(ValueError):
+            ShaIndex(self.path, "other")
+
+    @patch_sync("tap_github.client.GithubClient.authed_get_all_pages")
+    def test_child_fetch_deduplicated(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the files of a SHA are fetched once and replayed for another repository."""
+        mock_authed_get_all_pages.side_effect = lambda *args, **kwargs: [MockResponse({"files": [
+            {"filename": "a.txt", "blob_url": "https://github.com/org/repo/blob/abc/a.txt",
+             "contents_url": "https://api.github.com/repos/org/repo/contents/a.txt?ref=abc"}]})]
+        client = GithubClient({"access_token": "", "repository": "org/repo"})
+
+        for mode, replayed in [("skip", 0), ("replay", 1)]:
+            sha_index.configure({"sha_index_path": os.path.join(self.directory, mode + ".db"), "sha_index_mode": mode})
+            mock_authed_get_all_pages.reset_mock()
+            mock_write_record.reset_mock()
+            for repo in ["org/repo", "org/fork"]:
+                Commits().get_child_records(client, [], "commit_files", ("abc",), repo, {}, "2022-01-01T00:00:00Z", None,
+                                            ["commit_files"], ["commit_files"], parent_record = {"sha": "abc", "_sdc_repository": repo})
+
+            self.assertEqual(mock_authed_get_all_pages.call_count, 1)
+            records = [call[0][1] for call in mock_write_record.call_args_list]
+            self.assertEqual(len(records), 1 + replayed)
+            self.assertEqual(records[0]["_sdc_repository"], "org/repo")
+            if mode == "replay":
+                self.assertEqual(records[1], dict(records[0], _sdc_repository = "org/fork",
+                                                  blob_url = "https://github.com/org/fork/blob/abc/a.txt",
+                                                  contents_url = "https://api.github.com/repos/org/fork/contents/a.txt?ref=abc"))
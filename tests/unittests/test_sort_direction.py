@@ -0,0 +1,119 @@
+import re
+import unittest
+from unittest import mock
+from tap_github.client import GithubClient
+from tap_github.streams import STREAMS, Comments, IncrementalOrderedStream, IssueEvents, PullRequests
+from helpers import MockResponse, interrupted_pages, patch_sync
+
+class TestDeclaredDirection(unittest.TestCase):
+    """
+    Test the sort direction declared by the ordered streams.
+    """
+
+    def test_direction_requested(self):
+        """Verify that each ordered stream requests the direction it declares."""
+        for stream_id, stream in STREAMS.items():
+            if not issubclass(stream, IncrementalOrderedStream):
+                continue
+            direction = re.search(r"direction=(\w+)", stream.since_filter_param or stream.additional_filters or "")
+            if direction:
+                self.assertEqual(direction.group(1), stream.sort_direction, stream_id)
+
+@patch_sync("tap_github.client.GithubClient.authed_get_all_pages")
+class TestSortDirection(unittest.TestCase):
+    """
+    Test the sync of the ordered streams in their declared direction.
+    """
+    config = {"access_token": "", "repository": "org/repo"}
+
+    def sync(self, stream, state):
+        stream_id = stream.tap_stream_id
+        return stream.sync_endpoint(GithubClient(self.config), state, [], "org/repo", "2022-01-01T00:00:00Z", [stream_id], [stream_id], {})
+
+    def test_descending_stop(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that a descending stream stops at the first record created before the bookmark."""
+        pages = iter([
+            MockResponse([{"id": 3, "created_at": "2022-01-05T00:00:00Z"}, {"id": 2, "created_at": "2022-01-02T00:00:00Z"}], "next_page_url"),
+            MockResponse([{"id": 1, "created_at": "2022-01-01T00:00:00Z"}]),
+        ])
+        mock_authed_get_all_pages.return_value = pages
+        state = {"bookmarks": {"org/repo": {"issue_events": {"since": "2022-01-03T00:00:00Z"}}}}
+
+        state = self.sync(IssueEvents(), state)
+
+        self.assertEqual(len(list(pages)), 1)
+        self.assertEqual([call[0][1]["id"] for call in mock_write_record.call_args_list], [3])
+        self.assertEqual(state["bookmarks"]["org/repo"]["issue_events"]["since"], "2022-01-05T00:00:00Z")
+
+    def test_descending_out_of_order(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that all the pages of a descending stream are read once its records are found out of order."""
+        mock_authed_get_all_pages.return_value = [
+            MockResponse([{"id": 3, "created_at": "2022-01-04T00:00:00Z"}, {"id": 2, "created_at": "2022-01-05T00:00:00Z"},
+                          {"id": 1, "created_at": "2022-01-01T00:00:00Z"}], "next_page_url"),
+            MockResponse([{"id": 4, "created_at": "2022-01-06T00:00:00Z"}]),
+        ]
+        state = {"bookmarks": {"org/repo": {"issue_events": {"since": "2022-01-03T00:00:00Z"}}}}
+
+        state = self.sync(IssueEvents(), state)
+
+        self.assertEqual([call[0][1]["id"] for call in mock_write_record.call_args_list], [3, 2, 4])
+        self.assertEqual(state["bookmarks"]["org/repo"]["issue_events"]["since"], "2022-01-06T00:00:00Z")
+
+    def test_ascending_bookmark(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that an ascending stream is listed from its bookmark and keeps the last record as bookmark."""
+        mock_authed_get_all_pages.return_value = [
+            MockResponse([{"id": 1, "updated_at": "2022-01-03T00:00:00Z"}, {"id": 2, "updated_at": "2022-01-04T00:00:00Z"}], "next_page_url"),
+            MockResponse([{"id": 3, "updated_at": "2022-01-05T00:00:00Z"}]),
+        ]
+        state = {"bookmarks": {"org/repo": {"comments": {"since": "2022-01-03T00:00:00Z"}}}}
+
+        state = self.sync(Comments(), state)
+
+        mock_authed_get_all_pages.assert_called_with(
+            mock.ANY, "https://api.github.com/repos/org/repo/issues/comments?since=2022-01-03T00:00:00Z&sort=updated&direction=asc&per_page=100",
+            stream = "comments")
+        self.assertEqual([call[0][1]["id"] for call in mock_write_record.call_args_list], [1, 2, 3])
+        self.assertEqual(state["bookmarks"]["org/repo"]["comments"]["since"], "2022-01-05T00:00:00Z")
+
+    def test_ascending_resume_from_last_seen(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that an interrupted ascending stream saves the last record seen as bookmark and no page cursor."""
+        mock_authed_get_all_pages.return_value = interrupted_pages([
+            MockResponse([{"id": 1, "updated_at": "2022-01-03T00:00:00Z"}, {"id": 2, "updated_at": "2022-01-04T00:00:00Z"}], "next_page_url")])
+        state = {"bookmarks": {"org/repo": {"comments": {"since": "2022-01-02T00:00:00Z"}}}}
+
+        with self.assertRaises(Exception):
+            self.sync(Comments(), state)
+
+        self.assertNotIn("page_cursor", state)
+        self.assertEqual(state["bookmarks"]["org/repo"]["comments"]["since"], "2022-01-04T00:00:00Z")
+        self.assertEqual(mock_write_state.call_args[0][0]["bookmarks"]["org/repo"]["comments"]["since"], "2022-01-04T00:00:00Z")
+
+    def test_child_since(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the review comments of a pull request are listed from their bookmark."""
+        mock_authed_get_all_pages.return_value = [MockResponse([])]
+        state = {"bookmarks": {"org/repo": {"review_comments": {"since": "2022-01-03T00:00:00Z"}}}}
+
+        PullRequests().get_child_records(GithubClient(self.config), [], "review_comments", [1], "org/repo", state, "2022-01-01T00:00:00Z",
+                                         "2022-01-04T00:00:00Z", ["review_comments"], ["review_comments"], parent_record = {"id": 10})
+
+        mock_authed_get_all_pages.assert_called_with(
+            mock.ANY, "https://api.github.com/repos/org/repo/pulls/1/comments?since=2022-01-03T00:00:00Z&sort=updated&direction=asc&per_page=100",
+            stream = "review_comments")
+
+    def test_children_bookmark_kept(self, mock_authed_get_all_pages, mock_get_schema, mock_write_record, mock_write_state):
+        """Verify that the children of each record are synced with the bookmark they started with."""
+        mock_authed_get_all_pages.return_value = [MockResponse([{"id": 2, "number": 2, "updated_at": "2022-01-05T00:00:00Z"},
+                                                                {"id": 1, "number": 1, "updated_at": "2022-01-04T00:00:00Z"}])]
+        state = {"bookmarks": {"org/repo": {"pull_requests": {"since": "2022-01-03T00:00:00Z"},
+                                            "review_comments": {"since": "2022-01-03T00:00:00Z"}}}}
+        child_bookmarks = []
+
+        def get_child_records(*args, **kwargs):
+            child_bookmarks.append(state["bookmarks"]["org/repo"]["review_comments"]["since"])
+
+        with mock.patch.object(PullRequests, "get_child_records", side_effect = get_child_records):
+            state = PullRequests().sync_endpoint(GithubClient(self.config), state, [], "org/repo", "2022-01-01T00:00:00Z",
+                                                 ["pull_requests", "review_comments"], ["pull_requests", "review_comments"], {})
+
+        self.assertEqual(child_bookmarks, ["2022-01-03T00:00:00Z", "2022-01-03T00:00:00Z"])
+        self.assertEqual(state["bookmarks"]["org/repo"]["review_comments"]["since"], "2022-01-05T00:00:00Z")
@@ -0,0 +1,68 @@
+import unittest
+from tap_github.streams import PullRequests, StreamGraph, get_schema, get_selected_family, get_stream_graph
+
+def get_stream_catalog(stream_name):
+    """Return catalog for stream"""
+    return {"schema": {}, "tap_stream_id": stream_name, "key_properties": [], "metadata": []}
+
+class TestStreamGraph(unittest.TestCase):
+    """
+    Test the stream graph indexes the streams, their children and the catalog.
+    """
+
+    catalog = [get_stream_catalog("pull_requests"), get_stream_catalog("reviews"), get_stream_catalog("review_comments")]
+    selected_stream_ids = ["pull_requests", "review_comments", "pr_commits"]
+
+    def test_descriptor(self):
+        """Verify the children, the family in depth first order and the selected family of a stream."""
+        descriptor = StreamGraph(self.catalog, self.selected_stream_ids)["pull_requests"]
+
+        self.assertEqual(descriptor.children, ("reviews", "review_comments", "pr_commits"))
+        self.assertEqual(descriptor.family, ("pull_requests", "reviews", "review_comments", "pr_commits"))
+        self.assertEqual(descriptor.selected_family, ("pull_requests", "review_comments", "pr_commits"))
+        self.assertIsInstance(descriptor.stream, PullRequests)
+
+    def test_descriptor_immutable(self):
+        """Verify that a stream descriptor can not be modified."""
+        descriptor = StreamGraph(self.catalog, self.selected_stream_ids)["reviews"]
+
+        with self.assertRaises(AttributeError):
+            descriptor.children = ()
+        with self.assertRaises(AttributeError):
+            descriptor.extra = True
+
+    def test_id_extractor(self):
+        """Verify that the id extractor returns the tuple of the `id_keys` values."""
+        graph = StreamGraph(self.catalog, self.selected_stream_ids)
+
+        self.assertEqual(graph["reviews"].get_id({"number": 5, "id": 1}), (5,))
+        self.assertEqual(graph["project_cards"].get_id({"id": 7}), (7,))
+        self.assertEqual(graph["reviews"].get_id({}), (None,))
+
+    def test_catalog_entry(self):
+        """Verify that `get_schema` looks the catalog entry up in the graph of the catalog."""
+        graph = get_stream_graph(self.catalog, self.selected_stream_ids)
+
+        self.assertIs(get_schema(self.catalog, "reviews"), self.catalog[1])
+        self.assertIs(graph.get_catalog_entry("review_comments"), self.catalog[2])
+        # Verify the graph is built once for the catalog and the selected streams
+        self.assertIs(get_stream_graph(self.catalog, self.selected_stream_ids), graph)
+        self.assertIsNot(get_stream_graph(list(self.catalog), self.selected_stream_ids), graph)
+
+    def test_selected_family_without_graph(self):
+        """Verify the selected family for selected streams which are not the ones of the graph."""
+        get_stream_graph(self.catalog, self.selected_stream_ids)
+
+        self.assertEqual(list(get_selected_family("pull_requests", ["reviews", "pr_commits"])), ["reviews", "pr_commits"])
+        self.assertEqual(list(get_selected_family("pull_requests", self.selected_stream_ids)), ["pull_requests", "review_comments", "pr_commits"])
+
+    def test_bookmarks_of_selected_family(self):
+        """Verify that the bookmarks are written and read for the selected streams of the family only."""
+        state = {"bookmarks": {"org/repo": {"review_comments": {"since": "2020-01-01T00:00:00Z"}}}}
+        stream = PullRequests()
+
+        min_bookmark = stream.get_min_bookmark("pull_requests", self.selected_stream_ids, "2022-01-01T00:00:00Z", "org/repo", "2021-01-01T00:00:00Z", state)
+        self.assertEqual(min_bookmark, "2020-01-01T00:00:00Z")
+
+        stream.write_bookmarks("pull_requests", self.selected_stream_ids, "2022-01-01T00:00:00Z", "org/repo", state)
+        self.assertEqual(sorted(state["bookmarks"]["org/repo"]), ["pr_commits", "pull_requests", "review_comments"])
@@ -44,6 +44,7 @@ class TestSyncFunctions(unittest.TestCase):
         client.extract_repos_from_config.return_value = (["test-repo"], set())
         client.authed_get_all_pages.return_value = []
         client.not_accessible_repos = {}
+        client.request_count = 0
 
         sync(client, {'start_date': ""}, {}, mock_catalog)
 
@@ -71,6 +72,7 @@ class TestSyncFunctions(unittest.TestCase):
         client.extract_repos_from_config.return_value = (["test-repo"], {"org"})
         client.authed_get_all_pages.return_value = []
         client.not_accessible_repos = {}
+        client.request_count = 0
 
         sync(client, {'start_date': "2019-01-01T00:00:00Z"}, {}, mock_catalog)
 
@@ -99,6 +101,7 @@ class TestSyncFunctions(unittest.TestCase):
         client.extract_repos_from_config.return_value = (["test-repo"], {"org"})
         client.authed_get_all_pages.return_value = []
         client.not_accessible_repos = {}
+        client.request_count = 0
 
         sync(client, {'start_date': ""}, {}, mock_catalog)
 
@@ -108,6 +111,27 @@ class TestSyncFunctions(unittest.TestCase):
         self.assertEqual(mock_write_schemas.mock_calls[0], mock.call("teams", mock.ANY, mock.ANY))
         self.assertEqual(mock_write_schemas.mock_calls[1], mock.call("projects", mock.ANY, mock.ANY))
 
+    @mock.patch("tap_github.sync.dedupe.configure")
+    @mock.patch("tap_github.streams.IncrementalOrderedStream.sync_endpoint")
+    def test_dedupe_translated_state(self, mock_inc_ordered, mock_dedupe_configure, mock_incremental, mock_write_schemas, mock_write_state):
+        """
+        Test the deduplicator is configured with the bookmarks of the translated state
+        """
+
+        mock_catalog = {"streams": [get_stream_catalog("issues", True)]}
+
+        client = mock.Mock()
+        client.extract_repos_from_config.return_value = (["test-repo"], set())
+        client.not_accessible_repos = {}
+        client.request_count = 0
+
+        state = {"bookmarks": {"issues": {"since": "2019-01-01T00:00:00Z"}}}
+        sync(client, {'start_date': ""}, state, mock_catalog)
+
+        # Verify the older format bookmark is read under the repository
+        state = mock_dedupe_configure.call_args[0][1]
+        self.assertEqual(state["bookmarks"]["test-repo"]["issues"], {"since": "2019-01-01T00:00:00Z"})
+
     @mock.patch("tap_github.sync.get_stream_to_sync", return_value = [])
     @mock.patch("tap_github.sync.get_selected_streams", return_value = [])
     @mock.patch("tap_github.sync.update_currently_syncing_repo")
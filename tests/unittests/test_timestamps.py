@@ -0,0 +1,42 @@
+import unittest
+from datetime import datetime, timezone
+from tap_github.streams import get_date_ranges
+from tap_github.timestamps import BookmarkTime, format_timestamp, is_canonical, normalize_timestamp, parse_timestamp
+
+class TestTimestamps(unittest.TestCase):
+    """
+    Test the parsing and the comparisons of the timestamps.
+    """
+
+    def test_parse_canonical(self):
+        """Verify that a canonical timestamp is parsed into an aware UTC datetime."""
+        self.assertEqual(parse_timestamp("2022-03-04T05:06:07Z"), datetime(2022, 3, 4, 5, 6, 7, tzinfo=timezone.utc))
+
+    def test_parse_fallback(self):
+        """Verify that the other formats are parsed by the fallback parser."""
+        self.assertFalse(is_canonical("2022-03-04T05:06:07.123456Z"))
+        self.assertEqual(parse_timestamp("2022-03-04T07:06:07+02:00"), datetime(2022, 3, 4, 5, 6, 7, tzinfo=timezone.utc))
+        self.assertEqual(parse_timestamp("2022-03-04T05:06:07.500000Z"), datetime(2022, 3, 4, 5, 6, 7, 500000, tzinfo=timezone.utc))
+
+    def test_normalize(self):
+        """Verify the canonical form of the timestamps."""
+        self.assertEqual(normalize_timestamp("2022-03-04T05:06:07Z"), "2022-03-04T05:06:07Z")
+        self.assertEqual(normalize_timestamp("2022-03-04T07:06:07+02:00"), "2022-03-04T05:06:07Z")
+        self.assertEqual(format_timestamp(datetime(2022, 3, 4)), "2022-03-04T00:00:00Z")
+
+    def test_bookmark_is_after(self):
+        """Verify the comparisons of canonical and non canonical bookmarks and timestamps."""
+        canonical_bookmark = BookmarkTime("2022-01-01T00:00:00Z")
+        self.assertTrue(canonical_bookmark.is_after("2021-12-31T23:59:59Z"))
+        self.assertFalse(canonical_bookmark.is_after("2022-01-01T00:00:00Z"))
+        self.assertFalse(canonical_bookmark.is_after("2022-01-01T00:00:00.500000Z"))
+        self.assertTrue(canonical_bookmark.is_after("2022-01-01T01:00:00+02:00"))
+
+        bookmark = BookmarkTime("2022-01-01T00:00:00.500000Z")
+        self.assertTrue(bookmark.is_after("2022-01-01T00:00:00Z"))
+        self.assertFalse(bookmark.is_after("2022-01-01T00:00:01Z"))
+
+    def test_date_ranges(self):
+        """Verify the date ranges between two timestamps."""
+        self.assertEqual(list(get_date_ranges("2022-01-01T00:00:00Z", "2022-01-10T00:00:00Z", 7)),
+                         [("2022-01-01T00:00:00Z", "2022-01-08T00:00:00Z"), ("2022-01-08T00:00:00Z", "2022-01-15T00:00:00Z")])
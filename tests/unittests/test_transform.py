@@ -0,0 +1,206 @@
+import copy
+import random
+import unittest
+from unittest import mock
+import singer
+from singer.transform import SchemaMismatch
+from tap_github.schema import get_schemas, load_schema_references
+from tap_github.streams import Commits, PullRequests
+from tap_github.transform import (TRANSFORM_PLANS, CompiledTransformer, configure, get_selected_fields, get_transform_plan,
+                                  log_transform_counters, project, transform_record)
+
+def get_stream_catalog(stream_name):
+    """Return catalog for stream with a deselected field"""
+    return {"tap_stream_id": stream_name,
+            "schema": {"type": "object", "properties": {"id": {"type": ["null", "integer"]},
+                                                        "title": {"type": ["null", "string"]},
+                                                        "body": {"type": ["null", "string"]},
+                                                        "updated_at": {"type": ["null", "string"], "format": "date-time"}}},
+            "metadata": [{"breadcrumb": [], "metadata": {"selected": True}},
+                         {"breadcrumb": ["properties", "id"], "metadata": {"inclusion": "automatic", "selected": False}},
+                         {"breadcrumb": ["properties", "body"], "metadata": {"inclusion": "available", "selected": False}}]}
+
+class TestTransformPlan(unittest.TestCase):
+    """
+    Test the transform plan is built once per stream and transforms as `singer.Transformer`.
+    """
+
+    def setUp(self):
+        TRANSFORM_PLANS.clear()
+
+    def test_same_output_as_transformer(self):
+        """Verify that the records are transformed as with a new `singer.Transformer` per record."""
+        stream_catalog = get_stream_catalog("issues")
+        record = {"id": "1", "title": 2, "body": "text", "updated_at": "2022-01-01T00:00:00Z", "extra": 1}
+
+        with singer.Transformer() as transformer:
+            expected = transformer.transform(dict(record), stream_catalog["schema"], metadata=singer.metadata.to_map(stream_catalog["metadata"]))
+
+        self.assertEqual(transform_record(stream_catalog, dict(record)), expected)
+        self.assertEqual(transform_record(stream_catalog, dict(record)), expected)
+
+    @mock.patch("singer.metadata.to_map", side_effect = singer.metadata.to_map)
+    def test_plan_built_once(self, mock_to_map):
+        """Verify that the metadata map is built for the first record of the stream only."""
+        stream_catalog = get_stream_catalog("issues")
+        for _ in range(3):
+            transform_record(stream_catalog, {"id": 1})
+
+        self.assertEqual(mock_to_map.call_count, 1)
+        self.assertEqual(get_transform_plan(stream_catalog).record_count, 3)
+
+    def test_plan_rebuilt_for_new_catalog(self):
+        """Verify that the plan is built again for another catalog of the stream."""
+        plan = get_transform_plan(get_stream_catalog("issues"))
+        self.assertIsNot(get_transform_plan(get_stream_catalog("issues")), plan)
+
+    def test_selected_fields(self):
+        """Verify that the automatic fields and the fields not deselected are selected."""
+        stream_catalog = get_stream_catalog("issues")
+        metadata_map = singer.metadata.to_map(stream_catalog["metadata"])
+
+        self.assertEqual(get_selected_fields(stream_catalog["schema"], metadata_map), {"id", "title", "updated_at"})
+
+    def test_counters_reset_after_logging(self):
+        """Verify that the transform counters are reset when they are logged."""
+        stream_catalog = get_stream_catalog("issues")
+        transform_record(stream_catalog, {"id": 1})
+        log_transform_counters(["issues", "comments"])
+
+        self.assertEqual(get_transform_plan(stream_catalog).record_count, 0)
+        self.assertEqual(get_transform_plan(stream_catalog).transform_seconds, 0)
+
+def generate_value(schema, rng, depth = 0):
+    """Return a value for the schema, of the schema type or of an other type to cover the coercions and the errors."""
+    types = schema.get("type", ["null", "string"])
+    types = types if isinstance(types, list) else [types]
+    typ = "wrong" if rng.random() < 0.01 else rng.choice(types)
+    if typ == "object" and depth < 4:
+        value = {key: generate_value(sub_schema, rng, depth + 1) for key, sub_schema in schema.get("properties", {}).items() if rng.random() < 0.7}
+        if rng.random() < 0.1:
+            value["unknown_field"] = "value"
+        return value
+    if typ == "array" and depth < 4:
+        return [generate_value(schema.get("items", {}), rng, depth + 1) for _ in range(rng.randint(0, 2))]
+    if schema.get("format") == "date-time" and typ != "wrong":
+        return rng.choice(["2022-01-01T10:20:30Z", "2022-01-01T10:20:30.123+02:00", "", "not a date"])
+    return rng.choice({
+        "null": [None, ""],
+        "string": ["text", "", "1,000"],
+        "integer": [1, "1,000", "12", 1.5],
+        "number": [1.5, "2,000.5", 3],
+        "boolean": [True, "false", "False", 0],
+    }.get(typ, [None, "text", 7, 2.5, True, {"nested": 1}, [1]]))
+
+class TestCompiledTransformer(unittest.TestCase):
+    """
+    Differential test of the compiled transformer against `singer.Transformer` on the schemas of the tap.
+    """
+
+    def transform_both(self, schema, metadata_map, record):
+        """Return the result of both transformers, the transformed record or the exception, and the filtered input."""
+        results = []
+        for transformer in [singer.Transformer(), CompiledTransformer(copy.deepcopy(schema), metadata_map)]:
+            data = copy.deepcopy(record)
+            try:
+                if isinstance(transformer, CompiledTransformer):
+                    result = transformer.transform(data)
+                else:
+                    result = transformer.transform(data, copy.deepcopy(schema), metadata=metadata_map)
+            except SchemaMismatch as err:
+                result = ("SchemaMismatch", str(err))
+            results.append((result, data))
+        return results
+
+    def test_same_output_as_transformer(self):
+        """Verify that the compiled transformer returns the output of `singer.Transformer` for random records."""
+        rng = random.Random(1234)
+        schemas, field_metadata = get_schemas()
+        for stream_name in ["pull_requests", "issues", "events", "commits", "workflow_runs", "review_comments"]:
+            schema = singer.resolve_schema_references(schemas[stream_name], load_schema_references())
+            metadata_map = singer.metadata.to_map(field_metadata[stream_name])
+            # Deselect a few fields to cover the filter
+            for field_name in list(schema["properties"])[::5]:
+                metadata_map.setdefault(("properties", field_name), {})["selected"] = False
+            for _ in range(200):
+                record = generate_value({"type": "object", "properties": schema["properties"]}, rng)
+                singer_result, compiled_result = self.transform_both(schema, metadata_map, record)
+                self.assertEqual(compiled_result, singer_result, "{}: {}".format(stream_name, record))
+
+    def test_nested_filter_and_pattern_properties(self):
+        """Verify the nested deselected fields, the automatic fields and the pattern properties."""
+        schema = {"type": "object", "properties": {
+            "id": {"type": ["null", "integer"]},
+            "user": {"type": ["null", "object"], "properties": {"login": {"type": ["null", "string"]}, "email": {"type": ["null", "string"]}}},
+            "labels": {"type": ["null", "array"], "items": {"type": "object", "properties": {"name": {"type": "string"}, "color": {"type": "string"}}}},
+            "counts": {"type": "object", "patternProperties": {"^c_": {"type": "integer"}}},
+            "amount": {"type": ["null", "string"], "format": "singer.decimal"},
+            "any": {"anyOf": [{"type": "integer"}, {"type": "string", "format": "date-time"}]}}}
+        metadata_map = {(): {"selected": True},
+                        ("properties", "id"): {"inclusion": "automatic", "selected": False},
+                        ("properties", "user", "properties", "email"): {"selected": False},
+                        ("properties", "labels", "items", "properties", "color"): {"inclusion": "unsupported"}}
+        record = {"id": "1,234", "user": {"login": 5, "email": "a@b.c"}, "labels": [{"name": "bug", "color": "red"}],
+                  "counts": {"c_open": "3", "other": 1}, "amount": 1.10, "any": "2022-01-01T00:00:00Z", "extra": True}
+
+        singer_result, compiled_result = self.transform_both(schema, metadata_map, record)
+        self.assertEqual(compiled_result, singer_result)
+        self.assertEqual(compiled_result[0], {"id": 1234, "user": {"login": "5"}, "labels": [{"name": "bug"}],
+                                              "counts": {"c_open": 3}, "amount": "1.1", "any": "2022-01-01T00:00:00.000000Z"})
+
+    def test_schema_mismatch(self):
+        """Verify that a record which does not match the schema raises the errors of `singer.Transformer`."""
+        schema = {"type": "object", "properties": {"id": {"type": "integer"}}}
+
+        singer_result, compiled_result = self.transform_both(schema, {}, {"id": "one"})
+        self.assertEqual(compiled_result, singer_result)
+        self.assertEqual(compiled_result[0][0], "SchemaMismatch")
+
+    def test_selectable_per_stream(self):
+        """Verify that only the streams of the config are transformed with the compiled transformer."""
+        TRANSFORM_PLANS.clear()
+        configure({"compiled_transform_streams": "issues, events"})
+        try:
+            self.assertIsInstance(get_transform_plan(get_stream_catalog("issues")).transformer, CompiledTransformer)
+            self.assertIsInstance(get_transform_plan(get_stream_catalog("comments")).transformer, singer.Transformer)
+        finally:
+            configure({})
+
+class TestProjection(unittest.TestCase):
+    """
+    Test the projection drops the deselected fields and keeps the fields required by the sync.
+    """
+
+    def setUp(self):
+        TRANSFORM_PLANS.clear()
+
+    def test_required_fields(self):
+        """Verify the keys, the replication key and the parent fields read by the children are required."""
+        self.assertEqual(Commits().get_required_fields(),
+                         {"_sdc_repository", "sha", "updated_at", "author_email", "author_id", "author_name", "author_login", "parents"})
+        self.assertTrue({"id", "number", "updated_at"} <= PullRequests().get_required_fields())
+
+    def test_same_output_with_projection(self):
+        """Verify that the projected record is transformed as the whole record and keeps the required fields."""
+        schemas, field_metadata = get_schemas()
+        schema = singer.resolve_schema_references(schemas["pull_requests"], load_schema_references())
+        stream_catalog = {"tap_stream_id": "pull_requests", "schema": schema, "metadata": copy.deepcopy(field_metadata["pull_requests"])}
+        for entry in stream_catalog["metadata"]:
+            if list(entry["breadcrumb"]) in [["properties", "body"], ["properties", "number"], ["properties", "user"]]:
+                entry["metadata"]["selected"] = False
+        record = {"id": 1, "number": 2, "updated_at": "2022-01-01T00:00:00Z", "body": "text", "title": "title",
+                  "user": {"id": 3}, "unknown_field": {"self": {"href": "url"}}, "_sdc_repository": "org/repo"}
+
+        projection = get_transform_plan(stream_catalog).get_projection(PullRequests().get_required_fields())
+        projected_record = project(record, projection)
+
+        # Verify the deselected and unknown fields are dropped but the number read by the children is kept
+        self.assertEqual(set(projected_record), {"id", "number", "updated_at", "title", "_sdc_repository"})
+        self.assertEqual(transform_record(stream_catalog, projected_record), transform_record(stream_catalog, dict(record)))
+
+    def test_no_projection_without_properties(self):
+        """Verify that the records are kept whole when the schema does not list its properties."""
+        projection = get_transform_plan({"schema": {}, "metadata": []}).get_projection(frozenset(["id"]))
+
+        self.assertIsNone(projection)
+        self.assertEqual(project({"id": 1, "other": 2}, projection), {"id": 1, "other": 2})
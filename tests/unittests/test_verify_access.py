@@ -60,3 +60,65 @@ class TestCredentials(unittest.TestCase):
 
         # Verify error with proper message
         self.assertEqual(str(e.exception), "HTTP-error-code: 401, Error: {}".format(json))
+
+@mock.patch("tap_github.client.GithubClient.verify_repo_access")
+class TestVerifyAccessForRepo(unittest.TestCase):
+    """
+    Test `verify_access_for_repo` verifies all the repositories and reports all the failures together.
+    """
+
+    config = {"access_token": "", "repository": "org/repo1 org/repo2 org/repo3", "verify_access_workers": 2}
+
+    def test_all_repos_verified(self, mock_verify_repo_access):
+        """Verify that the access is checked for every repository in the config."""
+        mock_verify_repo_access.return_value = get_response(200)
+        test_client = GithubClient(self.config)
+
+        test_client.verify_access_for_repo()
+
+        # Verify `verify_repo_access` is called for each repository
+        verified_repos = sorted(call[0][1] for call in mock_verify_repo_access.call_args_list)
+        self.assertEqual(verified_repos, ["org/repo1", "org/repo2", "org/repo3"])
+        self.assertEqual(test_client.verified_repos, {"org/repo1", "org/repo2", "org/repo3"})
+
+    def test_verified_repos_are_not_checked_again(self, mock_verify_repo_access):
+        """Verify that the sync in the same process reuses the verification done in the discovery."""
+        mock_verify_repo_access.return_value = get_response(200)
+        test_client = GithubClient(self.config)
+
+        test_client.verify_access_for_repo()
+        test_client.verify_access_for_repo()
+
+        # Verify each repository is verified only once
+        self.assertEqual(mock_verify_repo_access.call_count, 3)
+
+    def test_failures_aggregated(self, mock_verify_repo_access):
+        """Verify that the failures of all the repositories are raised in a single exception."""
+        def verify(url, repo, should_skip_404):
+            if repo == "org/repo2":
+                return get_response(200)
+            raise tap_github.client.NotFoundException("Not found {}".format(repo))
+
+        mock_verify_repo_access.side_effect = verify
+        test_client = GithubClient(self.config)
+
+        with self.assertRaises(tap_github.client.NotFoundException) as e:
+            test_client.verify_access_for_repo()
+
+        # Verify the message reports every failed repository
+        self.assertEqual(str(e.exception), "Access verification failed for 2 repositories: org/repo1: Not found org/repo1; org/repo3: Not found org/repo3")
+
+    def test_single_failure_raised_as_is(self, mock_verify_repo_access):
+        """Verify that a single failure is raised with its original message."""
+        def verify(url, repo, should_skip_404):
+            if repo == "org/repo1":
+                raise tap_github.client.BadCredentialsException("Bad credentials")
+            return get_response(200)
+
+        mock_verify_repo_access.side_effect = verify
+        test_client = GithubClient(self.config)
+
+        with self.assertRaises(tap_github.client.BadCredentialsException) as e:
+            test_client.verify_access_for_repo()
+
+        self.assertEqual(str(e.exception), "Bad credentials")
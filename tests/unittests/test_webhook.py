@@ -0,0 +1,108 @@
+import json
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+from tap_github.webhook import WebhookDaemon, WebhookReceiver, get_signature
+
+SECRET = "webhook-secret"
+
+def get_stream_catalog(stream_name, is_selected = False):
+    """Return catalog for stream"""
+    return {"schema": {"type": "object", "properties": {"id": {"type": ["null", "integer"]},
+                                                        "_sdc_repository": {"type": ["null", "string"]},
+                                                        "issue_id": {"type": ["null", "integer"]},
+                                                        "updated_at": {"type": ["null", "string"]}}},
+            "tap_stream_id": stream_name, "key_properties": ["id"],
+            "metadata": [{"breadcrumb": [], "metadata": {"selected": is_selected}}]}
+
+def get_client(repositories):
+    """Return a mock client for the repositories."""
+    client = mock.Mock()
+    client.base_url = "https://api.github.com"
+    client.extract_repos_from_config.return_value = (repositories, set())
+    client.not_accessible_repos = set()
+    return client
+
+# Recorded `issues` delivery, trimmed to the fields of the test schema
+ISSUES_PAYLOAD = {
+    "action": "assigned",
+    "issue": {"id": 1, "number": 10, "updated_at": "2022-01-01T00:00:00Z", "assignees": [{"id": 21}, {"id": 22}]},
+    "repository": {"full_name": "org/repo1"}
+}
+
+class TestWebhookReceiver(unittest.TestCase):
+    """
+    Test the receiver queues only the deliveries with a valid signature.
+    """
+
+    def setUp(self):
+        self.receiver = WebhookReceiver(SECRET, "127.0.0.1", 0)
+        self.receiver.start()
+
+    def tearDown(self):
+        self.receiver.stop()
+
+    def post(self, payload, signature = None, event = "issues"):
+        body = json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request("http://127.0.0.1:{}/".format(self.receiver.port), data = body, method = "POST", headers = {
+            "X-GitHub-Event": event, "X-Hub-Signature-256": signature or get_signature(SECRET, body), "Content-Type": "application/json"})
+        try:
+            return urllib.request.urlopen(request).status
+        except urllib.error.HTTPError as err:
+            return err.code
+
+    def test_valid_signature(self):
+        """Verify that a signed delivery is accepted and queued."""
+        self.assertEqual(self.post(ISSUES_PAYLOAD), 202)
+        self.assertEqual(self.receiver.deliveries.get(timeout = 1), ("issues", ISSUES_PAYLOAD))
+
+    def test_invalid_signature(self):
+        """Verify that a delivery with an invalid signature is rejected."""
+        self.assertEqual(self.post(ISSUES_PAYLOAD, signature = get_signature("other-secret", b"{}")), 401)
+        self.assertTrue(self.receiver.deliveries.empty())
+
+@mock.patch("singer.write_record")
+@mock.patch("singer.write_schema")
+class TestWebhookDaemon(unittest.TestCase):
+    """
+    Test the deliveries are written as records of their streams.
+    """
+
+    catalog = {"streams": [get_stream_catalog("issues", True), get_stream_catalog("issue_assignees", True),
+                           get_stream_catalog("pull_requests")]}
+
+    def get_daemon(self, **config):
+        config = {"start_date": "2019-01-01T00:00:00Z", **config}
+        daemon = WebhookDaemon(get_client(["org/repo1"]), config, {}, self.catalog, mock.Mock())
+        daemon.refresh_units()
+        return daemon
+
+    def test_delivery_written(self, mock_write_schema, mock_write_record):
+        """Verify that the record of the delivery and its children from the payload are written without a bookmark."""
+        daemon = self.get_daemon()
+        daemon.write_delivery("issues", json.loads(json.dumps(ISSUES_PAYLOAD)))
+
+        records = [(call[0][0], call[0][1]) for call in mock_write_record.call_args_list]
+        self.assertIn(("issues", {"id": 1, "_sdc_repository": "org/repo1", "updated_at": "2022-01-01T00:00:00Z"}), records)
+        self.assertIn(("issue_assignees", {"id": 21, "issue_id": 1, "_sdc_repository": "org/repo1"}), records)
+        self.assertIn(("issue_assignees", {"id": 22, "issue_id": 1, "_sdc_repository": "org/repo1"}), records)
+        self.assertNotIn("bookmarks", daemon.state)
+        # Verify the delivery does not request the API
+        self.assertFalse(daemon.client.authed_get_all_pages.called)
+
+    def test_delivery_ignored(self, mock_write_schema, mock_write_record):
+        """Verify that the deliveries of other repositories, unselected streams and other events are not written."""
+        daemon = self.get_daemon()
+        daemon.write_delivery("issues", {**ISSUES_PAYLOAD, "repository": {"full_name": "org/repo2"}})
+        daemon.write_delivery("pull_request", {"pull_request": {"id": 2}, "repository": {"full_name": "org/repo1"}})
+        daemon.write_delivery("push", {"repository": {"full_name": "org/repo1"}})
+
+        self.assertFalse(mock_write_record.called)
+
+    def test_reconcile_interval(self, mock_write_schema, mock_write_record):
+        """Verify that the streams delivered by the webhooks are polled on the reconciliation interval."""
+        daemon = self.get_daemon(daemon_poll_interval = 60, webhook_reconcile_interval = 7200)
+
+        self.assertEqual(daemon.get_interval("issues"), 7200)
+        self.assertEqual(daemon.get_interval("events"), 60)